@@ -0,0 +1,75 @@
+# benchmarks/bench_active_paging.py
+"""
+OFFSET vs keyset paging over the active_members template, at increasing depth.
+
+Walks --pages pages of --batch-size rows with both strategies against the configured Oracle
+instance and prints per-page latency. OFFSET latency grows with the page number because
+Oracle re-sorts and skips all earlier rows; keyset latency should stay flat.
+
+Usage:
+    python -m benchmarks.bench_active_paging --member-type accum --pages 50 --batch-size 200
+"""
+import argparse
+import time
+
+from src.app import CONFIG, OWNER, ORACLE_TABLE, ORDER_BY, EMAIL_PATTERN, ACTIVE_BIND_NAMES, ACTIVE_KEY_COLUMN
+from src.connectors.oracle_connector import OracleConnector
+from src.query_generators.paged_query_compiler import compile_paged_query
+from src.query_generators.keyset_pager import compile_keyset_statements, KeysetPager
+
+def _run(conn, sql, binds):
+    cur = conn.cursor()
+    try:
+        start = time.perf_counter()
+        cur.execute(sql, binds)
+        cols = [c[0] for c in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+        return rows, time.perf_counter() - start
+    finally:
+        cur.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--member-type", required=True)
+    parser.add_argument("--email-pattern", default=EMAIL_PATTERN)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--report-every", type=int, default=5)
+    args = parser.parse_args()
+
+    template = CONFIG["queries"]["active_members"]
+    subs = {"OWNER": OWNER, "TABLE": ORACLE_TABLE, "ORDER_BY": ORDER_BY}
+    offset_q = compile_paged_query(template, subs, ACTIVE_BIND_NAMES, use_llm=False)
+    keyset_stmts = compile_keyset_statements(template, subs, ACTIVE_BIND_NAMES, ORDER_BY, key_column=ACTIVE_KEY_COLUMN)
+    if keyset_stmts is None:
+        print("[bench] ORDER_BY_COLUMN cannot be used for keyset paging")
+        return
+    pager = KeysetPager(keyset_stmts)
+
+    oc = OracleConnector()
+    conn = oc.get_connection()
+    totals = {"offset": 0.0, "keyset": 0.0}
+    print(f"{'page':>6} {'offset_ms':>12} {'keyset_ms':>12} {'rows':>6}")
+    try:
+        for page in range(args.pages):
+            binds = offset_q.binds(member_type=args.member_type, email_pattern=args.email_pattern,
+                                   page_offset=page * args.batch_size, page_limit=args.batch_size)
+            off_rows, off_s = _run(conn, offset_q.sql, binds)
+
+            sql, kbinds = pager.next_statement(args.batch_size, member_type=args.member_type, email_pattern=args.email_pattern)
+            key_rows, key_s = _run(conn, sql, kbinds)
+            pager.advance(key_rows, args.batch_size)
+
+            totals["offset"] += off_s
+            totals["keyset"] += key_s
+            if page == 0 or (page + 1) % args.report_every == 0 or pager.exhausted:
+                print(f"{page + 1:>6} {off_s * 1000:>12.2f} {key_s * 1000:>12.2f} {len(key_rows):>6}")
+            if pager.exhausted or not off_rows:
+                break
+    finally:
+        oc.release_connection(conn)
+
+    print(f"[bench] total offset={totals['offset']:.3f}s keyset={totals['keyset']:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_output_formats.py
+"""
+Write / read time and file size per RESULT_FORMAT (json, parquet, arrow).
+
+Generates a synthetic DWH-style result (BIGINT id, DECIMAL(12,2) amounts, short strings, dates)
+with a pyodbc-like cursor.description and writes it through save_cursor_rows() in every format.
+Reads are timed twice: as a typed table (what a columnar consumer loads; json has to parse every
+object) and as row dicts via load_records(). No database connection is needed.
+
+Usage:
+    python -m benchmarks.bench_output_formats --rows 200000 --repeat 3
+"""
+import os
+import json
+import random
+import argparse
+import datetime
+import decimal
+import shutil
+import tempfile
+import time
+
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+
+from src.utils.result_writer import RESULT_FORMATS, save_cursor_rows, load_records
+
+DESCRIPTION = [
+    ("MEMBER_ID", int, None, 19, 19, 0, False),
+    ("DEATH_COVER", decimal.Decimal, None, 12, 12, 2, True),
+    ("TPD_COVER", decimal.Decimal, None, 12, 12, 2, True),
+    ("COVERAGE_TYPE", str, None, 20, 20, 0, True),
+    ("FUND_CODE", str, None, 10, 10, 0, True),
+    ("START_DATE", datetime.date, None, 10, 10, 0, True),
+    ("LAST_UPDATED", datetime.datetime, None, 23, 23, 3, True),
+]
+
+def generate_rows(n: int, seed: int = 11) -> list:
+    rnd = random.Random(seed)
+    base = datetime.datetime(2020, 1, 1)
+    return [(
+        1_000_000 + i,
+        decimal.Decimal(rnd.randrange(0, 50_000_000)) / 100,
+        None if rnd.random() < 0.3 else decimal.Decimal(rnd.randrange(0, 20_000_000)) / 100,
+        rnd.choice(["Basic", "Additional"]),
+        rnd.choice(["ST100", "ST101", "ST200", "PT100"]),
+        (base + datetime.timedelta(days=rnd.randrange(0, 3000))).date(),
+        base + datetime.timedelta(seconds=rnd.randrange(0, 10**8)),
+    ) for i in range(n)]
+
+def read_table(path: str, fmt: str):
+    if fmt == "parquet":
+        return pq.read_table(path)
+    if fmt == "arrow":
+        with pa_ipc.open_file(path) as reader:
+            return reader.read_all()
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows)
+    out_dir = tempfile.mkdtemp(prefix="bench_formats_")
+    try:
+        print(f"{args.rows} rows x {len(DESCRIPTION)} columns")
+        print(f"{'format':8} {'write ms':>10} {'read ms':>10} {'to dicts ms':>12} {'size KiB':>10}")
+        for fmt in RESULT_FORMATS:
+            base = os.path.join(out_dir, "result")
+            write_s = _best(lambda: save_cursor_rows(rows, DESCRIPTION, base, fmt), args.repeat)
+            path = save_cursor_rows(rows, DESCRIPTION, base, fmt)
+            read_s = _best(lambda: read_table(path, fmt), args.repeat)
+            dicts_s = _best(lambda: load_records(path), args.repeat)
+            size_kib = os.path.getsize(path) / 1024
+            print(f"{fmt:8} {write_s * 1000:10.1f} {read_s * 1000:10.1f} {dicts_s * 1000:12.1f} {size_kib:10.1f}")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_rule_engine.py
+"""
+Columnar rules.json criterion evaluation vs a per-row Python filter.
+
+Generates a synthetic DWH result (MEMBER_ID, DEATH_COVER, TPD_COVER, COVERAGE_TYPE, DB_CODE,
+FUND_CODE) and selects DESIRED_COUNT members meeting the accum/basic_insurance criterion from
+rules.json four ways: a straightforward loop over the row dicts, select_members() on the row
+dicts (including the dicts -> columns pivot), select_members() on the executors' columns_out (the
+fetched tuples transposed with rows_to_columns, what the app passes) and select_members() on typed
+columns. The former app path (tuples -> rows_to_records dicts -> columns) is timed as well. No
+database connection is needed.
+
+Usage:
+    python -m benchmarks.bench_rule_engine --rows 300000 --repeat 3
+"""
+import random
+import argparse
+import time
+
+import numpy as np
+
+from src.utils.io_utils import load_json_file
+from src.services.rule_engine import ColumnTable, select_members
+from src.utils.result_writer import rows_to_records
+from src.utils.row_converter import rows_to_columns
+
+def generate_rows(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    funds = ["ST100", "ST101", "ST200", "ST201", "PT100", "XX999"]
+    return [{
+        "MEMBER_ID": i,
+        "DEATH_COVER": rnd.choice([0, 0.0, 150000.0, 250000.0]),
+        "TPD_COVER": rnd.choice([None, 0, 100000.0]),
+        "COVERAGE_TYPE": rnd.choice(["Basic", "Additional"]),
+        "DB_CODE": "ST000",
+        "FUND_CODE": rnd.choice(funds),
+    } for i in range(n)]
+
+def row_filter(rows: list, criterion: dict, pairs: list, limit: int) -> list:
+    allowed = {(p["db_code"], f) for p in pairs for f in p["fund_codes"]}
+    out = []
+    for r in rows:
+        if str(r["COVERAGE_TYPE"]).upper() != criterion["coverage_type"].upper():
+            continue
+        if (r["DB_CODE"], r["FUND_CODE"]) not in allowed:
+            continue
+        if all(r.get(f"{c.upper()}_COVER") for c in criterion["required_covers"]):
+            out.append(str(r["MEMBER_ID"]))
+            if len(out) >= limit:
+                break
+    return out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rules = load_json_file("rules.json")
+    accum = rules["accum"]
+    criterion = accum["criteria"]["basic_insurance"]
+    rows = generate_rows(args.rows)
+    # the loop is timed over every row (limit = all) so both sides do the same amount of work
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        expected = row_filter(rows, criterion, accum["db_fund_pairs"], len(rows))
+    loop_s = (time.perf_counter() - start) / args.repeat
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        table = ColumnTable.from_rows(rows)
+    build_s = (time.perf_counter() - start) / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        selected = select_members(ColumnTable.from_rows(rows), rules, "accum", "basic_insurance", len(rows))
+    columnar_s = (time.perf_counter() - start) / args.repeat
+
+    names = list(rows[0].keys())
+    description = [(n, None) for n in names]
+    tuples = [tuple(r.values()) for r in rows]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        cursor_selected = select_members(rows_to_columns(description, tuples), rules, "accum", "basic_insurance",
+                                         len(rows))
+    cursor_s = (time.perf_counter() - start) / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        select_members(rows_to_records(description, tuples), rules, "accum", "basic_insurance", len(rows))
+    dicts_s = (time.perf_counter() - start) / args.repeat
+
+    typed = {name: np.array(values, dtype=np.float64 if name.endswith("_COVER") else
+                            np.int64 if name == "MEMBER_ID" else object)
+             for name, values in table.columns.items()}
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        typed_selected = select_members(ColumnTable(typed, len(rows)), rules, "accum", "basic_insurance", len(rows))
+    typed_s = (time.perf_counter() - start) / args.repeat
+
+    assert selected == expected == cursor_selected == typed_selected, "columnar and row filters disagree"
+    print(f"{args.rows} rows, {len(selected)} members meet accum/basic_insurance")
+    print(f"per-row loop          : {loop_s * 1000:9.1f} ms")
+    print(f"columnar (row dicts)  : {columnar_s * 1000:9.1f} ms  ({loop_s / columnar_s:5.1f}x)")
+    print(f"  of which pivot      : {build_s * 1000:9.1f} ms (row dicts -> columns)")
+    print(f"columnar (cursor rows): {cursor_s * 1000:9.1f} ms  ({loop_s / cursor_s:5.1f}x)  <- app path")
+    print(f"  former app path     : {dicts_s * 1000:9.1f} ms (cursor rows -> dicts -> columns)")
+    print(f"columnar (typed cols) : {typed_s * 1000:9.1f} ms  ({loop_s / typed_s:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
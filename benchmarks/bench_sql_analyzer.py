@@ -0,0 +1,72 @@
+# benchmarks/bench_sql_analyzer.py
+"""
+Single-pass analyze_sql() vs the previous regex + sqlparse validator path.
+
+Generates a large SELECT (many joined tables, qualified columns and string literals) and times
+the work the validators did before: forbidden-keyword regexes, sqlparse.parse for the first
+keyword, and the extract_table_names / extract_alias_mapping / extract_qualified_columns passes.
+analyze_sql() is timed both uncached (first sight of a statement) and cached (re-validation).
+No database connection is needed.
+
+Usage:
+    python -m benchmarks.bench_sql_analyzer --tables 40 --columns 400 --repeat 20
+"""
+import re
+import argparse
+import time
+
+import sqlparse
+
+from src.utils.sql_utils import extract_table_names, extract_alias_mapping, extract_qualified_columns
+from src.utils.sql_analyzer import FORBIDDEN_KEYWORDS, analyze_sql, clear_sql_analysis_cache
+
+def generate_sql(tables: int, columns: int) -> str:
+    cols = [f"t{i % tables}.COL_{i} AS C{i}" for i in range(columns)]
+    joins = [f"LEFT JOIN OWNER.TABLE_{i} t{i} ON t{i}.MEMBER_ID = t0.MEMBER_ID" for i in range(1, tables)]
+    preds = [f"t{i % tables}.STATUS_{i} <> 'DELETED; value {i}'" for i in range(columns // 4)]
+    return (
+        "SELECT " + ",\n       ".join(cols) +
+        "\nFROM OWNER.TABLE_0 t0\n" + "\n".join(joins) +
+        "\nWHERE " + "\n  AND ".join(preds) +
+        "\nORDER BY t0.MEMBER_ID"
+    )
+
+def legacy_analyze(sql: str):
+    s = sql.upper()
+    forbidden = [kw for kw in FORBIDDEN_KEYWORDS if re.search(r'\b' + re.escape(kw) + r'\b', s)]
+    stmt = sqlparse.parse(sql)[0]
+    first = next(tok for tok in stmt.tokens if not tok.is_whitespace)
+    return (forbidden, first.normalized, extract_table_names(sql), extract_alias_mapping(sql),
+            extract_qualified_columns(sql))
+
+def _time(fn, sql, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(sql)
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--columns", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sql = generate_sql(args.tables, args.columns)
+    print(f"SQL size: {len(sql)} chars, {args.tables} tables, {args.columns} columns")
+
+    legacy = _time(legacy_analyze, sql, args.repeat)
+    uncached = _time(lambda q: analyze_sql(q, use_cache=False), sql, args.repeat)
+    clear_sql_analysis_cache()
+    analyze_sql(sql)
+    cached = _time(analyze_sql, sql, args.repeat)
+
+    analysis = analyze_sql(sql)
+    print(f"analysis: {len(analysis.tables)} tables, {len(analysis.aliases)} aliases, "
+          f"{len(analysis.qualified_columns)} qualified columns")
+    print(f"regex + sqlparse  : {legacy * 1000:9.3f} ms/statement")
+    print(f"analyze (no cache): {uncached * 1000:9.3f} ms/statement  ({legacy / uncached:6.1f}x)")
+    print(f"analyze (cached)  : {cached * 1000:9.3f} ms/statement  ({legacy / cached:6.1f}x)")
+
+if __name__ == "__main__":
+    main()
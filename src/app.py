@@ -2,20 +2,44 @@
 import os
 import argparse
 import datetime
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 from src.parsers.feature_parser import parse_examples
-from src.utils.io_utils import load_json_file, append_history, save_json_file
-from src.schema_extractors.oracle_schema_extractor import extract_oracle_schema
-from src.schema_extractors.dwh_schema_extractor import extract_dwh_schema
+from src.utils.io_utils import load_json_file, append_history
+from src.utils.result_writer import RESULT_FORMATS, save_records, set_result_format
+from src.utils.row_converter import columns_from_rows
+from src.schema_extractors.oracle_schema_extractor import extract_oracle_schema, refresh_oracle_schema
+from src.schema_extractors.dwh_schema_extractor import extract_dwh_schema, refresh_dwh_schema
 from src.executors.oracle_executor import execute_oracle_and_save
-from src.executors.dwh_executor import execute_dwh_and_save, dwh_execute_with_temp_table
+from src.executors.dwh_executor import (RESULT_STREAMING, execute_dwh_and_save, execute_dwh_batches_and_save,
+                                        dwh_execute_with_temp_table, stream_dwh_with_temp_table)
 from src.validators.oracle_query_validator import validate_oracle_sql
 from src.validators.dwh_query_validator import validate_dwh_sql
-from src.services.llm_client import call_llm
-
-from src.connectors.oracle_connector import OracleConnector
+from src.services.llm_client import call_llm, llm_cache_stats, llm_usage_stats
+from src.services.registered_users import get_registered_users
+from src.services.rule_engine import compile_criterion, select_members, member_keys, rules_available
+from src.services.correlation import CORRELATION_ENABLED, correlate_and_save
+from src.utils.sql_utils import strip_sql_comments, extract_bind_names
+from src.utils.sql_analyzer import analyze_sql
+from src.utils.schema_utils import SchemaIndex, load_schema_index
+from src.utils.bind_batching import plan_in_batches, run_batches, can_bind_in_list, make_bind_in_sql, make_list_marker_sql
+from src.query_generators.paged_query_compiler import CompiledQuery, compile_paged_query, paged_base_sql, register_compiled_query
+from src.query_generators.template_batch_compiler import TemplateSpec, compile_templates_batch
+from src.query_generators.sql_rewriter import (
+    add_paging, add_where_predicate, deterministic_first, sql_literal, to_literal_in, to_temp_table_semi_join,
+    main_table_ref, to_correlated_exists,
+)
+from src.query_generators.query_plan import plan_key, plan_path, save_plan, load_plan
+from src.query_generators.keyset_pager import compile_keyset_statements, KeysetPager
+
+from src.connectors.oracle_connector import OracleConnector, close_oracle_pools
 from src.connectors.dwh_connector import DWHConnector
+from src.connectors.dwh_session import dwh_session_stats, close_dwh_sessions
 
 load_dotenv()
 
@@ -24,16 +48,48 @@ CONFIG_PATH = os.getenv("CONFIG_PATH", "config.json")
 RULES_PATH = os.getenv("RULES_PATH", "rules.json")
 ORACLE_SCHEMA_PATH = os.getenv("ORACLE_SCHEMA_PATH", "schema/oracle_schema.json")
 DWH_SCHEMA_PATH = os.getenv("DWH_SCHEMA_PATH", "schema/dwh_schema.json")
-HISTORY_PATH = os.getenv("HISTORY_PATH", "history/query_history.json")
+# "missing" (extract only when a snapshot is absent) or "incremental" (DDL-timestamp refresh before every run)
+SCHEMA_REFRESH_MODE = os.getenv("SCHEMA_REFRESH_MODE", "missing").lower()
+HISTORY_PATH = os.getenv("HISTORY_PATH", "history/query_history.jsonl")
 ORACLE_OUT = os.getenv("OUTPUT_ORACLE", "output/oracle")
 DWH_OUT = os.getenv("OUTPUT_DWH", "output/dwh")
 
 # Adaptive batching defaults from env (with safe defaults)
 DESIRED_COUNT = int(os.getenv("DESIRED_COUNT", "20"))
+# apply the Examples row's rules.json criterion to the DWH result; the Oracle step then collects
+# RULE_CANDIDATE_POOL members so DESIRED_COUNT can still be met after filtering
+RULES_ENGINE = os.getenv("RULES_ENGINE", "true").lower() in ("yes", "true", "1")
+if RULES_ENGINE and not rules_available():
+    print("[app] numpy not installed; rules.json criteria not applied")
+    RULES_ENGINE = False
+RULE_CANDIDATE_POOL = int(os.getenv("RULE_CANDIDATE_POOL", str(DESIRED_COUNT * 5)))
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "200"))
 MAX_BATCHES = int(os.getenv("MAX_BATCHES", "10"))
 EMAIL_PATTERN = os.getenv("EMAIL_PATTERN", "%@keyword.com%")
 ORDER_BY = os.getenv("ORDER_BY_COLUMN", "NVL(LAST_UPDATED, CREATED_DATE) DESC")
+# "offset" (OFFSET/FETCH) or "keyset" (seek after last ORDER_BY value + ACTIVE_KEY_COLUMN)
+ACTIVE_PAGING_MODE = os.getenv("ACTIVE_PAGING_MODE", "offset").lower()
+ACTIVE_KEY_COLUMN = os.getenv("ACTIVE_KEY_COLUMN", "MEMBER_ID")
+# number of active batches fetched ahead of the registration check (0 = strictly serial)
+ACTIVE_PREFETCH_DEPTH = int(os.getenv("ACTIVE_PREFETCH_DEPTH", "1"))
+# seconds to wait for a cancelled prefetch to return its session
+ACTIVE_PREFETCH_JOIN_TIMEOUT = float(os.getenv("ACTIVE_PREFETCH_JOIN_TIMEOUT", "30"))
+# "bind" (bucketed bind-variable IN-lists, chunked), "temp_table" (DWH ids loaded into #members and
+# semi-joined, Oracle uses bind) or "llm" (LLM batch transform, literal IN fallback)
+IN_LIST_MODE = os.getenv("IN_LIST_MODE", "bind").lower()
+IN_LIST_PARALLEL = int(os.getenv("IN_LIST_PARALLEL", "1"))
+# "two_step" (active batches, then a registration IN-list check per batch) or "fused" (one EXISTS
+# semi-join of active_members and registered_members; two_step is used when the owners differ)
+REGISTRATION_CHECK_MODE = os.getenv("REGISTRATION_CHECK_MODE", "two_step").lower()
+# "query" (ask Oracle per batch), "set" (preloaded exact USER_NO set) or "bloom" (preloaded Bloom
+# filter; only positives are confirmed against Oracle)
+REGISTERED_LOOKUP_MODE = os.getenv("REGISTERED_LOOKUP_MODE", "query").lower()
+# "per_call" (transform templates as they are needed) or "batch" (all templates in one LLM request per run)
+TEMPLATE_COMPILE_MODE = os.getenv("TEMPLATE_COMPILE_MODE", "per_call").lower()
+# ahead-of-time query plans (--compile-plan): "auto" uses a matching plan when present,
+# "require" fails without one (CI), "off" ignores plans
+QUERY_PLAN_MODE = os.getenv("QUERY_PLAN_MODE", "auto").lower()
+QUERY_PLAN_DIR = os.getenv("QUERY_PLAN_DIR", "plans")
 
 # Okta/registration table info
 OKTA_OWNER = os.getenv("OKTA_OWNER", "")
@@ -45,6 +101,25 @@ OKTA_REGISTERED_FLAG_VALUE = os.getenv("OKTA_REGISTERED_FLAG_VALUE", "Y")
 OWNER = os.getenv("SCHEMA_OWNER", "")
 ORACLE_TABLE = os.getenv("ORACLE_TABLE", "MEMBER_MASTER")
 
+# placeholders of the active_members template that become bind variables
+ACTIVE_BIND_NAMES = ("member_type", "email_pattern")
+
+# ${VAR} substitutions per template
+ACTIVE_SUBS = {"OWNER": OWNER, "TABLE": ORACLE_TABLE, "ORDER_BY": ORDER_BY}
+REGISTERED_SUBS = {
+    "OKTA_OWNER": OKTA_OWNER,
+    "OKTA_TABLE": OKTA_TABLE,
+    "OKTA_REGISTERED_FLAG_COL": OKTA_REGISTERED_FLAG_COL,
+    "OKTA_REGISTERED_FLAG_VALUE": OKTA_REGISTERED_FLAG_VALUE
+}
+DWH_SUBS = {"OWNER": OWNER, "TABLE": ORACLE_TABLE}
+
+# templates batched over one placeholder: (name, subs, placeholder, dialect)
+IN_LIST_TEMPLATES = (
+    ("registered_members", REGISTERED_SUBS, "user_no", "Oracle"),
+    ("dwh_query", DWH_SUBS, "member_id", "SQLServer"),
+)
+
 # load config and rules
 CONFIG = {}
 try:
@@ -62,17 +137,15 @@ def render_template(sql_template: str, subs: dict):
     """
     Replace ${VAR} tokens and {placeholders} in the template.
     ${OWNER} style used for env tokens; {member_type} style for placeholders.
+    Placeholders without a value in subs (e.g. {user_no}) are left as-is.
     """
     out = sql_template
     # first replace ${VAR}
     for k, v in subs.items():
         out = out.replace("${" + k + "}", str(v))
-    # then format {} placeholders (safe)
-    try:
-        out = out.format(**subs)
-    except Exception:
-        # If formatting fails, leave as-is
-        pass
+    # then fill {} placeholders that we have values for
+    for k, v in subs.items():
+        out = out.replace("{" + k + "}", str(v))
     return out
 
 def call_llm_batch_transform(single_member_sql: str, dialect: str, param_name: str, sample_values: list):
@@ -105,94 +178,190 @@ Return exactly one SQL statement only (no commentary).
 
 def fallback_make_in_clause(single_member_sql: str, param_placeholder: str, values: list):
     """
-    Naive fallback: replace placeholder like '{user_no}' or :user_no with IN list.
-    """
-    sql = single_member_sql
-    import re
-    pattern1 = re.compile(r"([A-Za-z0-9_\.\"]+)\s*=\s*['\"]?\{?" + re.escape(param_placeholder) + r"\}['\"]?", re.IGNORECASE)
-    m = pattern1.search(sql)
-    if m:
-        col = m.group(1)
-        vals = []
-        for v in values:
-            if isinstance(v, (int, float)):
-                vals.append(str(v))
-            else:
-                sv = str(v).replace("'", "''")
-                vals.append(f"'{sv}'")
-        in_list = ", ".join(vals)
-        sql_new = pattern1.sub(f"{col} IN ({in_list})", sql)
-        return sql_new
-    vals = []
-    for v in values:
-        if isinstance(v, (int, float)):
-            vals.append(str(v))
-        else:
-            sv = str(v).replace("'", "''")
-            vals.append(f"'{sv}'")
-    in_list = ", ".join(vals)
-    return sql + f" WHERE {param_placeholder} IN ({in_list})"
-
-def fetch_active_batch(conn: OracleConnector, active_template: str, member_type: str, email_pattern: str, offset: int, limit: int):
-    """
-    Use the single-member template to produce a paged query (by calling LLM to create a batch/offset version),
-    else fallback to constructing OFFSET/FETCH version by substituting ORDER_BY and using OFFSET ... FETCH.
-    """
-    subs = {
-        "OWNER": OWNER,
-        "TABLE": ORACLE_TABLE,
-        "member_type": member_type,
-        "email_pattern": email_pattern,
-        "ORDER_BY": ORDER_BY
-    }
-    single_sql = render_template(active_template, subs)
+    Literal IN(...) fallback: `col = {param}` becomes `col IN (...)`; without such a predicate
+    `param IN (...)` is merged into the existing WHERE clause (see sql_rewriter.to_literal_in).
+    """
+    sql = to_literal_in(single_member_sql, param_placeholder, values)
+    if sql is not None:
+        return sql
+    # statement shape the rewriter does not handle (e.g. UNION): last-resort append
+    in_list = ", ".join(sql_literal(v) for v in values)
+    return single_member_sql + f" WHERE {param_placeholder} IN ({in_list})"
+
+def new_active_pager(active_template: str):
+    """
+    Return a KeysetPager for the active_members template when ACTIVE_PAGING_MODE=keyset and the
+    template can be rewritten; None means OFFSET paging.
+    """
+    if ACTIVE_PAGING_MODE != "keyset":
+        return None
+    stmts = compile_keyset_statements(active_template, ACTIVE_SUBS, ACTIVE_BIND_NAMES, ORDER_BY, key_column=ACTIVE_KEY_COLUMN)
+    return KeysetPager(stmts) if stmts is not None else None
+
+def fetch_active_batch(conn: OracleConnector, active_template: str, member_type: str, email_pattern: str, offset: int, limit: int,
+                       pager: KeysetPager = None, inflight: dict = None):
+    """
+    Execute the compiled paged form of the active_members template for one offset/limit window.
+    The template is compiled (LLM once, else OFFSET/FETCH fallback) into a single statement with
+    :member_type/:email_pattern/:page_offset/:page_limit binds, so later batches only re-execute it.
+    With a KeysetPager the offset is ignored and the page starts strictly after the pager's last row.
+    inflight, when given, holds the session under "conn" while the query runs so it can be cancelled;
+    its "lock" guards setting, clearing and releasing the session against a concurrent cancel().
+    """
+    if pager is not None:
+        sql, binds = pager.next_statement(limit, member_type=member_type, email_pattern=email_pattern)
+    else:
+        compiled = compile_paged_query(active_template, ACTIVE_SUBS, ACTIVE_BIND_NAMES, dialect="Oracle")
+        sql = compiled.sql
+        binds = compiled.binds(member_type=member_type, email_pattern=email_pattern, page_offset=offset, page_limit=limit)
 
-    # Try LLM to create a paginated/batched SQL for this offset/limit
-    dialect = "Oracle"
+    conn_obj = conn.get_connection()
+    if inflight is not None:
+        with inflight["lock"]:
+            inflight["conn"] = conn_obj
+    cur = conn_obj.cursor()
     try:
-        prompt = f"""You are an SQL assistant for Oracle. Convert the following SQL template into a paginated/batched SQL that returns rows between offset {offset} and limit {limit}. Use ORDER BY if required. Return only one SQL statement.
+        cur.execute(sql, binds)
+        cols = [c[0] for c in cur.description] if cur.description else []
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+    finally:
+        if inflight is not None:
+            # cleared and released under the lock so a cancel can never reach the session once
+            # another thread may have acquired it from the pool
+            with inflight["lock"]:
+                inflight.pop("conn", None)
+                cur.close()
+                conn.release_connection(conn_obj)
+        else:
+            cur.close()
+            conn.release_connection(conn_obj)
+    if pager is not None:
+        rows = pager.advance(rows, limit)
+    return rows
 
-Template:
-{single_sql}
+def iter_active_batches(conn: OracleConnector, active_template: str, member_type: str, pager: KeysetPager = None,
+                        prefetch_depth: int = None):
+    """
+    Yield up to MAX_BATCHES non-empty active batches.
+    With prefetch_depth > 0 a background thread fetches ahead into a bounded queue so the next
+    batch is already on its way while the caller checks registration for the current one.
+    Closing the generator (or breaking out of the loop and calling close()) stops the prefetcher:
+    a query still in flight is cancelled (connection.cancel()) and the thread is joined, so its
+    pooled session is back in the pool when close() returns.
+    """
+    depth = ACTIVE_PREFETCH_DEPTH if prefetch_depth is None else prefetch_depth
 
-Add paging: OFFSET {offset} ROWS FETCH NEXT {limit} ROWS ONLY.
-"""
-        paged_sql = call_llm(prompt)
-        if paged_sql:
-            paged_sql = paged_sql.strip().strip("`")
-    except Exception:
-        paged_sql = None
+    inflight = {"lock": threading.Lock()}
 
-    # Fallback: try offset/fetch substitution
-    if not paged_sql:
-        base_sql = single_sql
-        paged_sql = f"{base_sql} OFFSET {offset} ROWS FETCH NEXT {limit} ROWS ONLY"
+    def fetch(batch_idx):
+        rows = fetch_active_batch(conn, active_template, member_type, EMAIL_PATTERN, batch_idx * BATCH_SIZE, BATCH_SIZE,
+                                  pager=pager, inflight=inflight)
+        last = not rows or (pager is not None and pager.exhausted)
+        return rows, last
 
+    if depth <= 0:
+        for batch_idx in range(MAX_BATCHES):
+            rows, last = fetch(batch_idx)
+            if rows:
+                yield rows
+            if last:
+                return
+        return
+
+    done = object()
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            for batch_idx in range(MAX_BATCHES):
+                if stop.is_set():
+                    return
+                rows, last = fetch(batch_idx)
+                if rows and not put(rows):
+                    return
+                if last:
+                    break
+        except Exception as e:
+            if not stop.is_set():
+                put(e)
+            return
+        put(done)
+
+    worker = threading.Thread(target=producer, name=f"active-prefetch-{member_type}", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        with inflight["lock"]:
+            # only a session this iterator still holds; released ones are gone from inflight
+            conn_obj = inflight.get("conn")
+            if conn_obj is not None:
+                try:
+                    conn_obj.cancel()
+                except Exception as e:
+                    print(f"[active_prefetch] cancel failed: {e}")
+        worker.join(ACTIVE_PREFETCH_JOIN_TIMEOUT)
+        if worker.is_alive():
+            print(f"[active_prefetch] prefetch for {member_type} still running after {ACTIVE_PREFETCH_JOIN_TIMEOUT}s")
+
+def _fetch_first_column(conn: OracleConnector, sql: str, binds=None) -> set:
     conn_obj = conn.get_connection()
     cur = conn_obj.cursor()
     try:
-        cur.execute(paged_sql)
-        cols = [c[0] for c in cur.description] if cur.description else []
-        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+        if binds:
+            cur.execute(sql, binds)
+        else:
+            cur.execute(sql)
+        return {r[0] for r in cur.fetchall()}
     finally:
         cur.close()
-        conn_obj.close()
-    return rows
+        conn.release_connection(conn_obj)
 
-def check_registered_batch(conn: OracleConnector, registered_template: str, user_nos: list):
+def check_registered_batch(conn: OracleConnector, registered_template: str, user_nos: list, batch_template: str = None):
     """
-    Ask LLM to convert registered_template for a single user_no into a batch version, else fallback to IN(...) batch.
+    Check which user_nos are registered.
+    A batch_template from compile_run_templates() (`USER_NO IN ({user_no_list})`) is expanded into bind
+    IN-lists directly. REGISTERED_LOOKUP_MODE=set/bloom filters against a preloaded snapshot first
+    (Bloom positives are still confirmed below). IN_LIST_MODE=bind rewrites the single-user predicate into bucketed bind IN-lists (chunked at
+    Oracle's 1000-element limit); otherwise, or when the template has no `col = {user_no}` predicate,
+    ask the LLM for a batch version, else fall back to a literal IN(...) batch.
     """
     if not user_nos:
         return set()
 
-    subs = {
-        "OKTA_OWNER": OKTA_OWNER,
-        "OKTA_TABLE": OKTA_TABLE,
-        "OKTA_REGISTERED_FLAG_COL": OKTA_REGISTERED_FLAG_COL,
-        "OKTA_REGISTERED_FLAG_VALUE": OKTA_REGISTERED_FLAG_VALUE
-    }
-    single_sql = render_template(registered_template, subs)
+    single_sql = strip_sql_comments(render_template(registered_template, REGISTERED_SUBS))
+
+    if REGISTERED_LOOKUP_MODE in ("set", "bloom"):
+        registered = get_registered_users(conn, single_sql, REGISTERED_LOOKUP_MODE)
+        if registered is not None:
+            candidates = registered.candidates(user_nos)
+            if registered.exact or not candidates:
+                return set(candidates)
+            # Bloom positives may be false: confirm just those against Oracle
+            user_nos = candidates
+
+    if batch_template is not None or IN_LIST_MODE in ("bind", "temp_table"):
+        statements = plan_in_batches(batch_template or single_sql, "user_no", user_nos, "Oracle")
+        if statements is not None:
+            chunks = run_batches(statements, lambda sql, binds: _fetch_first_column(conn, sql, binds), IN_LIST_PARALLEL)
+            return set().union(*chunks)
 
     try:
         batch_sql = call_llm_batch_transform(single_sql, "Oracle", "user_no", user_nos)
@@ -202,16 +371,368 @@ def check_registered_batch(conn: OracleConnector, registered_template: str, user
     if not batch_sql:
         batch_sql = fallback_make_in_clause(single_sql, "user_no", user_nos)
 
+    return _fetch_first_column(conn, batch_sql)
+
+def load_templates() -> dict:
+    if "queries" not in CONFIG:
+        raise RuntimeError("config.json must include a 'queries' object with active_members and registered_members and dwh_query")
+    templates = {name: CONFIG["queries"].get(name) for name in ("active_members", "registered_members", "dwh_query")}
+    if any(t is None for t in templates.values()):
+        raise RuntimeError("config.json queries must include active_members, registered_members and dwh_query")
+    return templates
+
+def _dialect_validator(oracle_schema: SchemaIndex, dwh_schema: SchemaIndex):
+    def validate(dialect, sql):
+        if dialect == "Oracle":
+            return validate_oracle_sql(sql, oracle_schema)
+        return validate_dwh_sql(sql, dwh_schema)
+    return validate
+
+def compile_run_templates(templates: dict, oracle_schema: SchemaIndex, dwh_schema: SchemaIndex) -> dict:
+    """
+    TEMPLATE_COMPILE_MODE=batch: transform active_members, registered_members and dwh_query in ONE
+    LLM request. The paged active_members statement is seeded into the paged query cache; the batch
+    registered/dwh templates are returned as {"registered_members_batch": ..., "dwh_query_batch": ...}
+    for process_example. Templates that fail validation keep their per-call path.
+    """
+    validate = _dialect_validator(oracle_schema, dwh_schema)
+    out = {}
+    specs = []
+    active_base = paged_base_sql(templates["active_members"], ACTIVE_SUBS, ACTIVE_BIND_NAMES)
+    # deterministic mode: the rewriter covers what it can, only the rest goes to the LLM
+    if not (deterministic_first() and add_paging(active_base, "Oracle")):
+        specs.append(TemplateSpec("active_members", active_base, "Oracle", "paged"))
+    for name, subs, param, dialect in IN_LIST_TEMPLATES:
+        single_sql = strip_sql_comments(render_template(templates[name], subs))
+        marker = make_list_marker_sql(single_sql, param) if deterministic_first() else None
+        if marker and validate(dialect, make_bind_in_sql(marker, param, 1, dialect))[0]:
+            out[f"{name}_batch"] = marker
+        else:
+            specs.append(TemplateSpec(name, single_sql, dialect, "in_list", param=param))
+    extra = [k for k in CONFIG.get("queries", {}) if k not in templates]
+    if extra:
+        print(f"[app] batch compile: no spec for templates {', '.join(extra)}; skipped")
+
+    compiled = compile_templates_batch(specs, validate) if specs else {}
+    if "active_members" in compiled:
+        register_compiled_query(templates["active_members"], ACTIVE_SUBS, ACTIVE_BIND_NAMES, compiled["active_members"],
+                                dialect="Oracle", source="llm-batch")
+    if "registered_members" in compiled:
+        out["registered_members_batch"] = compiled["registered_members"]
+    if "dwh_query" in compiled:
+        out["dwh_query_batch"] = compiled["dwh_query"]
+    return out
+
+def current_plan_key() -> str:
+    """
+    Hash of config.json, both schema snapshots and the env tokens rendered into the templates.
+    """
+    env_tokens = {
+        "active": ACTIVE_SUBS,
+        "registered": REGISTERED_SUBS,
+        "dwh": DWH_SUBS,
+        "active_binds": ACTIVE_BIND_NAMES,
+    }
+    return plan_key(CONFIG, (ORACLE_SCHEMA_PATH, DWH_SCHEMA_PATH), env_tokens)
+
+def compile_query_plan(templates: dict, oracle_schema: SchemaIndex, dwh_schema: SchemaIndex) -> str:
+    """
+    --compile-plan: compile and validate every template once and write the plan artifact.
+    active_members uses the paged compiler (LLM, else OFFSET/FETCH fallback); registered_members and
+    dwh_query use the batch LLM result when TEMPLATE_COMPILE_MODE=batch, else the deterministic
+    `IN ({param_list})` rewrite. Returns the plan path.
+    """
+    validate = _dialect_validator(oracle_schema, dwh_schema)
+    batch = compile_run_templates(templates, oracle_schema, dwh_schema) if TEMPLATE_COMPILE_MODE == "batch" else {}
+    queries = {}
+    validation = {}
+
+    msg = "no candidate"
+    for use_llm in (True, False):
+        compiled = compile_paged_query(templates["active_members"], ACTIVE_SUBS, ACTIVE_BIND_NAMES, dialect="Oracle",
+                                       use_llm=use_llm)
+        ok, msg = validate("Oracle", compiled.sql)
+        if ok:
+            queries["active_members"] = {"sql": compiled.sql, "bind_names": list(compiled.bind_names), "source": compiled.source}
+            break
+    validation["active_members"] = msg
+
+    for name, subs, param, dialect in IN_LIST_TEMPLATES:
+        single_sql = strip_sql_comments(render_template(templates[name], subs))
+        candidates = [batch.get(f"{name}_batch"), make_list_marker_sql(single_sql, param)]
+        msg = f"no `col = {{{param}}}` predicate to batch"
+        for sql in [c for c in candidates if c]:
+            ok, msg = validate(dialect, make_bind_in_sql(sql, param, 1, dialect))
+            if ok:
+                queries[f"{name}_batch"] = sql
+                break
+        validation[name] = msg
+
+    path = save_plan(QUERY_PLAN_DIR, current_plan_key(), queries, validation)
+    for name, msg in validation.items():
+        print(f"[compile-plan] {name}: {msg}")
+    print(f"[compile-plan] wrote {len(queries)} compiled queries to {path}")
+    return path
+
+def apply_query_plan(plan: dict, templates: dict) -> dict:
+    """
+    Seed the paged query cache and the batch templates from a loaded plan (no LLM, no validation).
+    """
+    queries = plan.get("queries", {})
+    active = queries.get("active_members")
+    if active:
+        register_compiled_query(templates["active_members"], ACTIVE_SUBS, ACTIVE_BIND_NAMES, active["sql"],
+                                dialect="Oracle", source="plan")
+    templates.update({k: v for k, v in queries.items() if k.endswith("_batch") and v})
+    return templates
+
+_FUSED: Dict[str, Optional[CompiledQuery]] = {}
+_FUSED_LOCK = threading.Lock()
+
+def compile_fused_query(active_template: str, registered_template: str) -> Optional[CompiledQuery]:
+    """
+    One Oracle statement returning only registered active members: the registered_members check is
+    correlated on the active row's USER_NO and ANDed into active_members as EXISTS (...), paged with
+    :page_offset / :page_limit. None (two-step path) when the owners differ or the templates cannot
+    be rewritten.
+    """
+    key = hashlib.sha256(f"{active_template}\x00{registered_template}".encode("utf-8")).hexdigest()
+    with _FUSED_LOCK:
+        if key in _FUSED:
+            return _FUSED[key]
+        compiled = None
+        reason = None
+        if (OKTA_OWNER or "").strip().upper() != (OWNER or "").strip().upper():
+            reason = f"owners differ ({OWNER or '<default>'} vs {OKTA_OWNER or '<default>'})"
+        else:
+            active_sql = paged_base_sql(active_template, ACTIVE_SUBS, ACTIVE_BIND_NAMES)
+            registered_sql = strip_sql_comments(render_template(registered_template, REGISTERED_SUBS))
+            outer = main_table_ref(active_sql)
+            if outer is None:
+                reason = "active_members is not a single-table query"
+            elif outer.strip('"').split(".")[-1].upper() in analyze_sql(registered_sql).tables:
+                reason = "both templates query the same table"
+            else:
+                exists = to_correlated_exists(registered_sql, "user_no", f"{outer}.USER_NO")
+                fused = add_where_predicate(active_sql, exists) if exists else None
+                paged = add_paging(fused, "Oracle") if fused else None
+                if paged is None:
+                    reason = "templates cannot be rewritten"
+                else:
+                    compiled = CompiledQuery(paged, extract_bind_names(paged), "fused")
+        if compiled is None:
+            print(f"[app] fused registration query unavailable: {reason}; using two-step check")
+        _FUSED[key] = compiled
+        return compiled
+
+def fetch_registered_fused(conn: OracleConnector, active_template: str, registered_template: str, member_type: str,
+                           limit: int = None):
+    """
+    Registered active members (at most limit, default DESIRED_COUNT) in one round trip, or None
+    when fused mode is not possible for these templates.
+    """
+    fused = compile_fused_query(active_template, registered_template)
+    if fused is None:
+        return None
+    binds = fused.binds(member_type=member_type, email_pattern=EMAIL_PATTERN, page_offset=0,
+                        page_limit=limit or DESIRED_COUNT)
     conn_obj = conn.get_connection()
     cur = conn_obj.cursor()
     try:
-        cur.execute(batch_sql)
-        rows = cur.fetchall()
-        registered = {r[0] for r in rows}
+        cur.execute(fused.sql, binds)
+        cols = [c[0] for c in cur.description] if cur.description else []
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
     finally:
         cur.close()
-        conn_obj.close()
-    return registered
+        conn.release_connection(conn_obj)
+
+def collect_two_step(oc: OracleConnector, templates: dict, mem_type: str, target: int = None):
+    """
+    Two-step registration check: page through active members and check each batch's USER_NOs
+    against registered_members until target (default DESIRED_COUNT) registered members are found.
+    Returns (collected_active, collected_registered, registered_found).
+    """
+    target = target or DESIRED_COUNT
+    active_template = templates["active_members"]
+    registered_template = templates["registered_members"]
+    collected_active = []
+    collected_registered = []
+    registered_found = False
+
+    # iterate batches (batch k+1 is prefetched while batch k is checked for registration)
+    batches = iter_active_batches(oc, active_template, mem_type, new_active_pager(active_template))
+    try:
+        for rows in batches:
+            collected_active.extend(rows)
+
+            # extract user_nos to check registration in batch
+            user_nos = [r.get("USER_NO") for r in rows if r.get("USER_NO") is not None]
+            user_nos = list(dict.fromkeys([u for u in user_nos if u]))
+
+            if user_nos:
+                registered_set = check_registered_batch(oc, registered_template, user_nos,
+                                                        batch_template=templates.get("registered_members_batch"))
+                if registered_set:
+                    for r in rows:
+                        if r.get("USER_NO") in registered_set:
+                            collected_registered.append(r)
+                            if len(collected_registered) >= target:
+                                break
+            if len(collected_registered) >= target:
+                registered_found = True
+                break
+    finally:
+        # stops the prefetcher; a query still in flight is cancelled
+        batches.close()
+    return collected_active, collected_registered, registered_found
+
+def process_example(idx: int, ex: dict, oc: OracleConnector, templates: dict, dwh_schema: SchemaIndex, run_ts: str):
+    """
+    Run the Oracle -> DWH flow for one Examples row and return its history entry
+    (None when the row is skipped). Rows are independent, so this is safe to run concurrently.
+    """
+    active_template = templates["active_members"]
+    registered_template = templates["registered_members"]
+    dwh_template = templates["dwh_query"]
+
+    ex_norm = {k.strip().lower(): v.strip() for k, v in ex.items()}
+    mem_type = ex_norm.get("member_type") or ex_norm.get("member type")
+    if not mem_type:
+        print(f"[example {idx}] missing member_type; skipping")
+        return None
+    print(f"[example {idx}] member_type = {mem_type}")
+
+    rule = RULES.get(mem_type) if RULES else None
+    criterion_name = ex_norm.get("member_criteria") or ex_norm.get("member criteria")
+    criterion = compile_criterion(RULES, mem_type, criterion_name) if RULES_ENGINE and criterion_name else None
+    if criterion_name and RULES_ENGINE and criterion is None:
+        print(f"[example {idx}] no rules.json criterion {mem_type}/{criterion_name}; selecting without it")
+    # with a criterion, collect a larger pool for the DWH / criterion step so enough members survive the filter
+    target = max(RULE_CANDIDATE_POOL, DESIRED_COUNT) if criterion is not None else DESIRED_COUNT
+
+    fused_rows = None
+    if REGISTRATION_CHECK_MODE == "fused":
+        fused_rows = fetch_registered_fused(oc, active_template, registered_template, mem_type, limit=target)
+    if fused_rows is not None:
+        collected_registered = fused_rows
+        collected_active = [] if len(fused_rows) >= target else fetch_active_batch(oc, active_template, mem_type,
+                                                                                   EMAIL_PATTERN, 0, target)
+    else:
+        collected_active, collected_registered, _ = collect_two_step(oc, templates, mem_type, target)
+
+    registered_found = len(collected_registered) >= DESIRED_COUNT
+    pool = collected_registered[:target] if registered_found else collected_active[:target]
+    # the candidate file and the unfiltered selection stay at DESIRED_COUNT; only the DWH query and the
+    # criterion see the larger pool
+    chosen = pool[:DESIRED_COUNT]
+
+    # write chosen to the oracle output file (RESULT_FORMAT)
+    os.makedirs(ORACLE_OUT, exist_ok=True)
+    oracle_out_file = save_records(chosen, os.path.join(ORACLE_OUT, f"oracle_candidates_example{idx}"))
+
+    # Build DWH query: use the batch-compiled template, else ask LLM to transform single-member dwh_template
+    member_ids = [m.get("MEMBER_ID") for m in pool if m.get("MEMBER_ID") is not None]
+    single_dwh_sql = render_template(dwh_template, DWH_SUBS)
+    dwh_batch_template = templates.get("dwh_query_batch")
+
+    dwh_batch_sql = None
+    if dwh_batch_template is None:
+        dwh_rewritable = can_bind_in_list(strip_sql_comments(single_dwh_sql), "member_id")
+        if IN_LIST_MODE == "temp_table" and dwh_rewritable:
+            dwh_batch_sql = to_temp_table_semi_join(strip_sql_comments(single_dwh_sql), "member_id")
+        elif not (deterministic_first() and dwh_rewritable):
+            dwh_batch_sql = call_llm_batch_transform(single_dwh_sql, "SQLServer", "member_id", member_ids)
+    dwh_out_file = None
+    dwh_rows = 0
+    dwh_bytes = 0
+    # DWH rows as {column: values} for the criterion and the correlation
+    dwh_results = {}
+    try:
+        if dwh_batch_sql and ("#members" in dwh_batch_sql or "CREATE TABLE" in dwh_batch_sql.upper()):
+            dwh_conn = DWHConnector()
+            if RESULT_STREAMING:
+                dwh_out_file, dwh_rows, dwh_bytes = stream_dwh_with_temp_table(
+                    dwh_conn, member_ids, dwh_batch_sql, out_dir=DWH_OUT, file_prefix=f"dwh_result_example{idx}", ts=run_ts)
+            else:
+                results = dwh_execute_with_temp_table(dwh_conn, member_ids, dwh_batch_sql)
+                dwh_results = columns_from_rows(results)
+                os.makedirs(DWH_OUT, exist_ok=True)
+                dwh_out_file = save_records(results, os.path.join(DWH_OUT, f"dwh_result_example{idx}_{run_ts}"))
+                dwh_rows, dwh_bytes = len(results), os.path.getsize(dwh_out_file)
+        else:
+            statements = None
+            if dwh_batch_template is not None:
+                statements = plan_in_batches(dwh_batch_template, "member_id", member_ids, "SQLServer")
+            elif IN_LIST_MODE == "bind":
+                statements = plan_in_batches(strip_sql_comments(single_dwh_sql), "member_id", member_ids, "SQLServer")
+            if statements:
+                # every chunk shares one SQL shape, so validating the first covers them all;
+                # batch templates (plan / batch compile) were validated when they were compiled
+                ok, msg = (True, "") if dwh_batch_template is not None else validate_dwh_sql(statements[0][0], dwh_schema)
+                if not ok:
+                    print(f"[example {idx}] DWH SQL validation failed: {msg}")
+                else:
+                    dwh_out_file, dwh_rows, dwh_bytes = execute_dwh_batches_and_save(
+                        statements, out_dir=DWH_OUT, file_prefix=f"dwh_result_example{idx}", ts=run_ts,
+                        parallel=IN_LIST_PARALLEL, columns_out=dwh_results)
+            elif statements is not None:
+                print(f"[example {idx}] no member ids for DWH query")
+            else:
+                batch_dwh_sql = fallback_make_in_clause(single_dwh_sql, "member_id", member_ids)
+                ok, msg = validate_dwh_sql(batch_dwh_sql, dwh_schema)
+                if not ok:
+                    print(f"[example {idx}] DWH SQL validation failed: {msg}")
+                else:
+                    dwh_out_file, dwh_rows, dwh_bytes = execute_dwh_and_save(
+                        batch_dwh_sql, out_dir=DWH_OUT, file_prefix=f"dwh_result_example{idx}", ts=run_ts,
+                        columns_out=dwh_results)
+    except Exception as e:
+        print(f"[example {idx}] DWH execution error: {e}")
+
+    matched_file = None
+    criteria_matched = None
+    selected_members = chosen
+    streamed = bool(dwh_rows) and not dwh_results
+    if streamed and (criterion is not None or CORRELATION_ENABLED):
+        print(f"[example {idx}] DWH rows were streamed to disk; criteria / correlation not applied")
+    elif criterion is not None and dwh_out_file:
+        selected = select_members(dwh_results, RULES, mem_type, criterion_name, DESIRED_COUNT, candidate_ids=member_ids)
+        if selected is not None:
+            rank = {k: i for i, k in enumerate(selected)}
+            # keyed exactly as select_members normalized member_ids ('000123' / 123.0 -> '123')
+            keyed = [(k, m) for k, m in zip(member_keys([m.get("MEMBER_ID") for m in pool]), pool) if k in rank]
+            matched = [m for _, m in sorted(keyed, key=lambda km: rank[km[0]])]
+            criteria_matched = len(matched)
+            matched_file = save_records(matched, os.path.join(ORACLE_OUT, f"oracle_matched_example{idx}"))
+            print(f"[example {idx}] {criteria_matched}/{DESIRED_COUNT} members meet {mem_type}/{criterion_name}")
+            selected_members = matched
+
+    # one merged Oracle x DWH dataset per example (MEMBER_ID join)
+    merged_file = None
+    merged_rows = 0
+    if CORRELATION_ENABLED and dwh_out_file and not streamed:
+        try:
+            merged_file, merged_rows = correlate_and_save(idx, selected_members, dwh_results, run_ts)
+        except Exception as e:
+            print(f"[example {idx}] correlation error: {e}")
+
+    entry = {
+        "example_index": idx,
+        "example": ex_norm,
+        "registered_found": registered_found,
+        "oracle_candidates_file": oracle_out_file,
+        "chosen_count": len(chosen),
+        "dwh_output_file": dwh_out_file,
+        "dwh_rows": dwh_rows,
+        "dwh_bytes": dwh_bytes,
+        "member_criteria": criterion_name,
+        "criteria_matched": criteria_matched,
+        "matched_file": matched_file,
+        "merged_file": merged_file,
+        "merged_rows": merged_rows
+    }
+    print(f"[example {idx}] done. registered_found={registered_found}, dwh_rows={dwh_rows}")
+    return entry
 
 def process_feature_examples(feature_path: str,
                              do_test_oracle=False,
@@ -219,12 +740,27 @@ def process_feature_examples(feature_path: str,
                              do_extract_oracle_schema=False,
                              do_extract_dwh_schema=False,
                              do_fetch_active=False,
-                             fetch_member_type=None):
+                             fetch_member_type=None,
+                             workers: int = 1,
+                             do_refresh_schema=False,
+                             do_compile_plan=False):
     """
     Main orchestrator. The boolean flags control early single-component execution.
     If any of the do_* flags are True, the function will run those components and return
-    without running the full pipeline (unless no flags provided).
+    without running the full pipeline (unless no flags provided). The Oracle pools and DWH
+    sessions are closed on every path, including the early returns.
     """
+    try:
+        _process_feature_examples(feature_path, do_test_oracle, do_test_dwh, do_extract_oracle_schema,
+                                  do_extract_dwh_schema, do_fetch_active, fetch_member_type, workers,
+                                  do_refresh_schema, do_compile_plan)
+    finally:
+        close_oracle_pools()
+        close_dwh_sessions()
+
+def _process_feature_examples(feature_path, do_test_oracle, do_test_dwh, do_extract_oracle_schema,
+                              do_extract_dwh_schema, do_fetch_active, fetch_member_type, workers,
+                              do_refresh_schema, do_compile_plan):
 
     # If any single-component flags provided, run them and exit early (do not run full flow)
     # 1) test oracle connectivity
@@ -232,12 +768,12 @@ def process_feature_examples(feature_path: str,
         try:
             oc = OracleConnector()
             conn = oc.get_connection()
-            conn.close()
+            oc.release_connection(conn)
             print("[test-oracle] Oracle connection successful.")
         except Exception as e:
             print(f"[test-oracle] Oracle connection FAILED: {e}")
         # if only testing oracle, continue to other flags or return if none other
-        if not (do_test_dwh or do_extract_oracle_schema or do_extract_dwh_schema or do_fetch_active):
+        if not (do_test_dwh or do_extract_oracle_schema or do_extract_dwh_schema or do_refresh_schema or do_compile_plan or do_fetch_active):
             return
 
     # 2) test dwh connectivity
@@ -249,7 +785,7 @@ def process_feature_examples(feature_path: str,
             print("[test-dwh] DWH connection successful.")
         except Exception as e:
             print(f"[test-dwh] DWH connection FAILED: {e}")
-        if not (do_extract_oracle_schema or do_extract_dwh_schema or do_fetch_active):
+        if not (do_extract_oracle_schema or do_extract_dwh_schema or do_refresh_schema or do_compile_plan or do_fetch_active):
             return
 
     # 3) extract oracle schema
@@ -259,7 +795,7 @@ def process_feature_examples(feature_path: str,
             print("[extract-oracle-schema] completed.")
         except Exception as e:
             print(f"[extract-oracle-schema] FAILED: {e}")
-        if not (do_extract_dwh_schema or do_fetch_active):
+        if not (do_extract_dwh_schema or do_refresh_schema or do_compile_plan or do_fetch_active):
             return
 
     # 4) extract dwh schema
@@ -269,6 +805,30 @@ def process_feature_examples(feature_path: str,
             print("[extract-dwh-schema] completed.")
         except Exception as e:
             print(f"[extract-dwh-schema] FAILED: {e}")
+        if not (do_refresh_schema or do_compile_plan or do_fetch_active):
+            return
+
+    # 4b) incremental schema refresh (only tables whose DDL changed)
+    if do_refresh_schema:
+        try:
+            refresh_oracle_schema(ORACLE_SCHEMA_PATH)
+            refresh_dwh_schema(DWH_SCHEMA_PATH)
+            print("[refresh-schema] completed.")
+        except Exception as e:
+            print(f"[refresh-schema] FAILED: {e}")
+        if not (do_compile_plan or do_fetch_active):
+            return
+
+    # 4c) compile and validate all templates ahead of time into a plan artifact
+    if do_compile_plan:
+        missing = [p for p in (ORACLE_SCHEMA_PATH, DWH_SCHEMA_PATH) if not os.path.exists(p)]
+        if missing:
+            print(f"[compile-plan] schema snapshot missing: {', '.join(missing)} (run --extract-*-schema first)")
+            return
+        try:
+            compile_query_plan(load_templates(), load_schema_index(ORACLE_SCHEMA_PATH), load_schema_index(DWH_SCHEMA_PATH))
+        except Exception as e:
+            print(f"[compile-plan] FAILED: {e}")
         if not do_fetch_active:
             return
 
@@ -288,11 +848,11 @@ def process_feature_examples(feature_path: str,
 
         # We'll fetch only first batch (offset 0)
         oc = OracleConnector()
-        rows = fetch_active_batch(oc, active_template, fetch_member_type, EMAIL_PATTERN, 0, BATCH_SIZE)
+        rows = fetch_active_batch(oc, active_template, fetch_member_type, EMAIL_PATTERN, 0, BATCH_SIZE,
+                                  pager=new_active_pager(active_template))
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         os.makedirs(ORACLE_OUT, exist_ok=True)
-        out_file = os.path.join(ORACLE_OUT, f"oracle_active_{fetch_member_type}_{ts}.json")
-        save_json_file(rows, out_file)
+        out_file = save_records(rows, os.path.join(ORACLE_OUT, f"oracle_active_{fetch_member_type}_{ts}"))
         print(f"[fetch-active] saved {len(rows)} rows to {out_file}")
         return
 
@@ -307,117 +867,82 @@ def process_feature_examples(feature_path: str,
         print("[app] no Examples table found in feature file.")
         return
 
-    if not os.path.exists(ORACLE_SCHEMA_PATH):
-        print("[app] extracting oracle schema...")
-        extract_oracle_schema(ORACLE_SCHEMA_PATH)
-    if not os.path.exists(DWH_SCHEMA_PATH):
-        print("[app] extracting dwh schema...")
-        extract_dwh_schema(DWH_SCHEMA_PATH)
+    if SCHEMA_REFRESH_MODE == "incremental":
+        print("[app] refreshing schemas (incremental)...")
+        refresh_oracle_schema(ORACLE_SCHEMA_PATH)
+        refresh_dwh_schema(DWH_SCHEMA_PATH)
+    else:
+        if not os.path.exists(ORACLE_SCHEMA_PATH):
+            print("[app] extracting oracle schema...")
+            extract_oracle_schema(ORACLE_SCHEMA_PATH)
+        if not os.path.exists(DWH_SCHEMA_PATH):
+            print("[app] extracting dwh schema...")
+            extract_dwh_schema(DWH_SCHEMA_PATH)
 
-    oracle_schema = load_json_file(ORACLE_SCHEMA_PATH)
-    dwh_schema = load_json_file(DWH_SCHEMA_PATH)
+    # indexed once per snapshot file (cached by mtime) for O(1) validator lookups
+    oracle_schema = load_schema_index(ORACLE_SCHEMA_PATH)
+    dwh_schema = load_schema_index(DWH_SCHEMA_PATH)
 
     oc = OracleConnector()
 
-    # Load templates
-    if "queries" not in CONFIG:
-        raise RuntimeError("config.json must include a 'queries' object with active_members and registered_members and dwh_query")
-
-    active_template = CONFIG["queries"].get("active_members")
-    registered_template = CONFIG["queries"].get("registered_members")
-    dwh_template = CONFIG["queries"].get("dwh_query")
-
-    if active_template is None or registered_template is None or dwh_template is None:
-        raise RuntimeError("config.json queries must include active_members, registered_members and dwh_query")
-
-    for idx, ex in enumerate(examples, start=1):
-        ex_norm = {k.strip().lower(): v.strip() for k, v in ex.items()}
-        mem_type = ex_norm.get("member_type") or ex_norm.get("member type")
-        if not mem_type:
-            print(f"[example {idx}] missing member_type; skipping")
-            continue
-        print(f"[example {idx}] member_type = {mem_type}")
-
-        rule = RULES.get(mem_type) if RULES else None
-
-        collected_active = []
-        collected_registered = []
-        registered_found = False
-
-        # iterate batches
-        for batch_idx in range(MAX_BATCHES):
-            offset = batch_idx * BATCH_SIZE
-            rows = fetch_active_batch(oc, active_template, mem_type, EMAIL_PATTERN, offset, BATCH_SIZE)
-            if not rows:
-                break
-            collected_active.extend(rows)
-
-            # extract user_nos to check registration in batch
-            user_nos = [r.get("USER_NO") for r in rows if r.get("USER_NO") is not None]
-            user_nos = list(dict.fromkeys([u for u in user_nos if u]))
-
-            if user_nos:
-                registered_set = check_registered_batch(oc, registered_template, user_nos)
-                if registered_set:
-                    for r in rows:
-                        if r.get("USER_NO") in registered_set:
-                            collected_registered.append(r)
-                            if len(collected_registered) >= DESIRED_COUNT:
-                                break
-            if len(collected_registered) >= DESIRED_COUNT:
-                registered_found = True
-                break
-
-        if registered_found and collected_registered:
-            chosen = collected_registered[:DESIRED_COUNT]
-        else:
-            chosen = collected_active[:DESIRED_COUNT]
-            registered_found = False
-
-        # write chosen to oracle output JSON
-        os.makedirs(ORACLE_OUT, exist_ok=True)
-        oracle_out_file = os.path.join(ORACLE_OUT, f"oracle_candidates_example{idx}.json")
-        save_json_file(chosen, oracle_out_file)
-
-        # Build DWH query: ask LLM to transform single-member dwh_template into batch SQL
-        member_ids = [m.get("MEMBER_ID") for m in chosen if m.get("MEMBER_ID") is not None]
-        subs = {"OWNER": OWNER, "TABLE": ORACLE_TABLE}
-        single_dwh_sql = render_template(dwh_template, subs)
-
-        dwh_batch_sql = call_llm_batch_transform(single_dwh_sql, "SQLServer", "member_id", member_ids)
-        dwh_out_file = None
-        dwh_rows = 0
-        try:
-            if dwh_batch_sql and ("#members" in dwh_batch_sql or "CREATE TABLE" in dwh_batch_sql.upper()):
-                dwh_conn = DWHConnector()
-                results = dwh_execute_with_temp_table(dwh_conn, member_ids, dwh_batch_sql)
-                os.makedirs(DWH_OUT, exist_ok=True)
-                ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                dwh_out_file = os.path.join(DWH_OUT, f"dwh_result_example{idx}_{ts}.json")
-                save_json_file(results, dwh_out_file)
-                dwh_rows = len(results)
-            else:
-                batch_dwh_sql = fallback_make_in_clause(single_dwh_sql, "member_id", member_ids)
-                ok, msg = validate_dwh_sql(batch_dwh_sql, dwh_schema)
-                if not ok:
-                    print(f"[example {idx}] DWH SQL validation failed: {msg}")
-                else:
-                    dwh_out_file, dwh_rows = execute_dwh_and_save(batch_dwh_sql, out_dir=DWH_OUT)
-        except Exception as e:
-            print(f"[example {idx}] DWH execution error: {e}")
-
-        # append history
-        entry = {
-            "example_index": idx,
-            "example": ex_norm,
-            "registered_found": registered_found,
-            "oracle_candidates_file": oracle_out_file,
-            "chosen_count": len(chosen),
-            "dwh_output_file": dwh_out_file,
-            "dwh_rows": dwh_rows
-        }
-        append_history(HISTORY_PATH, entry)
-        print(f"[example {idx}] done. registered_found={registered_found}, dwh_rows={dwh_rows}")
+    templates = load_templates()
+    plan = None
+    if QUERY_PLAN_MODE != "off":
+        key = current_plan_key()
+        plan = load_plan(QUERY_PLAN_DIR, key)
+        if plan is None and QUERY_PLAN_MODE == "require":
+            raise RuntimeError(f"no query plan at {plan_path(QUERY_PLAN_DIR, key)}; run with --compile-plan first")
+    if plan is not None:
+        print(f"[app] using query plan {plan_path(QUERY_PLAN_DIR, plan['plan_key'])} ({plan.get('created_at')})")
+        apply_query_plan(plan, templates)
+    elif TEMPLATE_COMPILE_MODE == "batch":
+        templates.update(compile_run_templates(templates, oracle_schema, dwh_schema))
+    run_ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    indexed = list(enumerate(examples, start=1))
+
+    if workers <= 1:
+        for idx, ex in indexed:
+            try:
+                entry = process_example(idx, ex, oc, templates, dwh_schema, run_ts)
+            except Exception as e:
+                print(f"[example {idx}] FAILED: {e}")
+                continue
+            if entry is not None:
+                append_history(HISTORY_PATH, entry)
+    else:
+        print(f"[app] processing {len(indexed)} examples with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="example") as pool:
+            futures = [pool.submit(process_example, idx, ex, oc, templates, dwh_schema, run_ts) for idx, ex in indexed]
+            # history is appended in example-index order regardless of completion order
+            for (idx, _), fut in zip(indexed, futures):
+                try:
+                    entry = fut.result()
+                except Exception as e:
+                    # as in the serial loop: one failed example must not drop the later entries
+                    print(f"[example {idx}] FAILED: {e}")
+                    continue
+                if entry is not None:
+                    append_history(HISTORY_PATH, entry)
+
+    pool_stats = oc.pool_stats()
+    if pool_stats:
+        print(f"[app] Oracle pool: acquisitions={pool_stats['acquisitions']}, opened={pool_stats['opened']}, "
+              f"avg_wait_ms={pool_stats['avg_wait_ms']:.2f}, max_wait_ms={pool_stats['max_wait_ms']:.2f}, "
+              f"avg_checkout_ms={pool_stats['avg_checkout_ms']:.2f}")
+
+    dwh_stats = dwh_session_stats()
+    if dwh_stats:
+        print(f"[app] DWH sessions: sessions={dwh_stats['sessions']}, loads={dwh_stats['loads']}, "
+              f"ids={dwh_stats['ids_loaded']}, load_ms_per_1000={dwh_stats['load_ms_per_1000']:.1f}, "
+              f"queries={dwh_stats['queries']}, avg_query_ms={dwh_stats['avg_query_ms']:.1f}, "
+              f"max_query_ms={dwh_stats['max_query_s'] * 1000:.1f}, reconnects={dwh_stats['reconnects']}")
+
+    cache_stats = llm_cache_stats()
+    if cache_stats:
+        print(f"[app] LLM cache: hits={cache_stats['hits']}, misses={cache_stats['misses']}, entries={cache_stats['entries']}")
+    usage = llm_usage_stats()
+    if usage["calls"]:
+        print(f"[app] LLM usage: calls={usage['calls']}, retries={usage['retries']}, coalesced={usage['coalesced']}, cost=${usage['cost']:.6f}")
 
 def main():
     parser = argparse.ArgumentParser()
@@ -427,9 +952,17 @@ def main():
     parser.add_argument("--test-dwh", action="store_true", help="Test DWH connection only and exit")
     parser.add_argument("--extract-oracle-schema", action="store_true", help="Extract Oracle schema and exit")
     parser.add_argument("--extract-dwh-schema", action="store_true", help="Extract DWH schema and exit")
+    parser.add_argument("--refresh-schema", action="store_true", help="Incrementally refresh Oracle and DWH schema snapshots and exit")
+    parser.add_argument("--compile-plan", action="store_true", help="Compile and validate all templates into a query plan and exit")
     parser.add_argument("--fetch-active", action="store_true", help="Fetch active members only (first batch) and exit")
     parser.add_argument("--member-type", type=str, help="Member type to use with --fetch-active")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EXAMPLE_WORKERS", "1")),
+                        help="Number of Examples rows processed concurrently")
+    parser.add_argument("--output-format", choices=RESULT_FORMATS, default=None,
+                        help="Result / candidate file format (default: RESULT_FORMAT or json)")
     args = parser.parse_args()
+    if args.output_format:
+        set_result_format(args.output_format)
 
     process_feature_examples(
         args.feature,
@@ -438,7 +971,10 @@ def main():
         do_extract_oracle_schema=args.extract_oracle_schema,
         do_extract_dwh_schema=args.extract_dwh_schema,
         do_fetch_active=args.fetch_active,
-        fetch_member_type=args.member_type
+        fetch_member_type=args.member_type,
+        workers=args.workers,
+        do_refresh_schema=args.refresh_schema,
+        do_compile_plan=args.compile_plan
     )
 
 if __name__ == "__main__":
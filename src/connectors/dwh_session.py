@@ -0,0 +1,232 @@
+# src/connectors/dwh_session.py
+"""
+Warm per-thread DWH sessions with a reusable #members staging table.
+"""
+import os
+import re
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from src.connectors.dwh_connector import DWHConnector
+
+load_dotenv()
+
+DWH_SESSION_REUSE = os.getenv("DWH_SESSION_REUSE", "true").lower() in ("yes", "true", "1")
+DWH_MEMBER_LOAD_MODE = os.getenv("DWH_MEMBER_LOAD_MODE", "values").lower()
+DWH_MEMBER_TVP_TYPE = os.getenv("DWH_MEMBER_TVP_TYPE", "dbo.MemberIdList")
+DWH_MEMBER_INSERT_CHUNK = min(1000, max(1, int(os.getenv("DWH_MEMBER_INSERT_CHUNK", "1000"))))
+
+MEMBERS_TABLE = "#members"
+
+_MEMBERS_DDL = re.compile(
+    r"(?:CREATE\s+TABLE\s+#members\s*\((?:[^()]|\([^()]*\))*\)"
+    r"|(?:IF\s+OBJECT_ID\s*\(\s*'tempdb\.\.#members'\s*\)\s+IS\s+NOT\s+NULL\s+)?"
+    r"DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?#members\b)\s*;?",
+    re.IGNORECASE,
+)
+_MEMBERS_MANAGED = re.compile(
+    r"\b(?:CREATE|DROP|ALTER)\s+TABLE\s+(?:IF\s+EXISTS\s+)?#members\b|\bSELECT\b[^;]*?\bINTO\s+#members\b",
+    re.IGNORECASE,
+)
+
+def strip_members_ddl(sql: str) -> Tuple[str, int]:
+    """
+    sql without its CREATE TABLE #members / DROP TABLE #members statements, and how many were removed.
+    """
+    return _MEMBERS_DDL.subn("", sql)
+
+def manages_members_table(sql: str) -> bool:
+    """
+    True when sql creates, drops or alters #members itself (the warm session must not run it).
+    """
+    return bool(_MEMBERS_MANAGED.search(sql))
+
+class DWHSession:
+    """
+    One long-lived DWH connection plus its #members staging table.
+    """
+    def __init__(self, connector: DWHConnector = None, load_mode: str = None):
+        self.connector = connector or DWHConnector()
+        self.load_mode = load_mode or DWH_MEMBER_LOAD_MODE
+        self.conn = None
+        self._table_ready = False
+        self.loads = 0
+        self.ids_loaded = 0
+        self.load_s = 0.0
+        self.queries = 0
+        self.query_s = 0.0
+        self.max_query_s = 0.0
+        self.reconnects = 0
+        self.retired = False
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = self.connector.get_connection()
+            self._table_ready = False
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+        self._table_ready = False
+
+    def _discard(self):
+        """
+        Drop a connection that raised; the next call reconnects.
+        """
+        if self.conn is not None:
+            self.reconnects += 1
+        self.close()
+
+    def _ensure_members_table(self, cur):
+        if self._table_ready:
+            cur.execute(f"TRUNCATE TABLE {MEMBERS_TABLE};")
+            return
+        cur.execute(f"IF OBJECT_ID('tempdb..{MEMBERS_TABLE}') IS NOT NULL DROP TABLE {MEMBERS_TABLE};")
+        cur.execute(f"CREATE TABLE {MEMBERS_TABLE} (member_id BIGINT NOT NULL PRIMARY KEY);")
+        self._table_ready = True
+
+    def _insert_values(self, cur, ids: List[int]):
+        step = DWH_MEMBER_INSERT_CHUNK
+        full_sql = None
+        for start in range(0, len(ids), step):
+            chunk = ids[start:start + step]
+            if len(chunk) == step and full_sql is not None:
+                sql = full_sql
+            else:
+                sql = f"INSERT INTO {MEMBERS_TABLE} (member_id) VALUES " + ", ".join(["(?)"] * len(chunk)) + ";"
+                if len(chunk) == step:
+                    full_sql = sql
+            cur.execute(sql, chunk)
+
+    def _insert_tvp(self, cur, ids: List[int]):
+        schema, _, type_name = DWH_MEMBER_TVP_TYPE.rpartition(".")
+        # pyodbc: leading strings name the table type (and its schema), the tuples are the rows
+        tvp = [type_name, schema or "dbo"] + [(i,) for i in ids]
+        cur.execute(f"INSERT INTO {MEMBERS_TABLE} (member_id) SELECT member_id FROM ?;", (tvp,))
+
+    def load_members(self, member_ids: Iterable) -> int:
+        """
+        Replace the contents of #members with member_ids (deduplicated). Returns the number loaded.
+        """
+        ids = sorted({int(m) for m in member_ids if m is not None})
+        started = time.perf_counter()
+        conn = self._connection()
+        cur = conn.cursor()
+        try:
+            self._ensure_members_table(cur)
+            if ids:
+                if self.load_mode == "tvp":
+                    try:
+                        self._insert_tvp(cur, ids)
+                    except Exception as e:
+                        print(f"[dwh_session] TVP load failed ({e}); using multi-row VALUES")
+                        self.load_mode = "values"
+                        cur.execute(f"TRUNCATE TABLE {MEMBERS_TABLE};")
+                        self._insert_values(cur, ids)
+                else:
+                    self._insert_values(cur, ids)
+            conn.commit()
+        except Exception:
+            cur.close()
+            self._discard()
+            raise
+        cur.close()
+        elapsed = time.perf_counter() - started
+        self.loads += 1
+        self.ids_loaded += len(ids)
+        self.load_s += elapsed
+        per_k = elapsed / len(ids) * 1000 * 1000 if ids else 0.0
+        print(f"[dwh_session] loaded {len(ids)} ids into {MEMBERS_TABLE} in {elapsed * 1000:.1f} ms "
+              f"({per_k:.1f} ms / 1000 ids, {self.load_mode})")
+        return len(ids)
+
+    def run(self, sql: str, consume: Callable, params=None):
+        """
+        Run sql on the warm connection and return consume(cursor), e.g. to stream the rows.
+        """
+        started = time.perf_counter()
+        conn = self._connection()
+        cur = conn.cursor()
+        try:
+            if params:
+                cur.execute(sql, params)
+            else:
+                cur.execute(sql)
+            result = consume(cur)
+            conn.commit()
+        except Exception:
+            cur.close()
+            self._discard()
+            raise
+        cur.close()
+        elapsed = time.perf_counter() - started
+        self.queries += 1
+        self.query_s += elapsed
+        self.max_query_s = max(self.max_query_s, elapsed)
+        print(f"[dwh_session] query finished in {elapsed * 1000:.1f} ms")
+        return result
+
+    def query(self, sql: str, params=None) -> List[dict]:
+        """
+        Run sql on the warm connection and return rows as dicts.
+        """
+        def fetch(cur):
+            cols = [c[0] for c in cur.description] if cur.description else []
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+        return self.run(sql, fetch, params)
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "ids_loaded": self.ids_loaded,
+            "load_s": self.load_s,
+            "queries": self.queries,
+            "query_s": self.query_s,
+            "max_query_s": self.max_query_s,
+            "reconnects": self.reconnects,
+        }
+
+_LOCAL = threading.local()
+_SESSIONS: List[DWHSession] = []
+_SESSIONS_LOCK = threading.Lock()
+
+def get_dwh_session() -> DWHSession:
+    """
+    The calling thread's DWHSession (created on first use).
+    """
+    session: Optional[DWHSession] = getattr(_LOCAL, "session", None)
+    if session is None or session.retired:
+        session = DWHSession()
+        _LOCAL.session = session
+        with _SESSIONS_LOCK:
+            _SESSIONS.append(session)
+    return session
+
+def dwh_session_stats() -> Dict[str, float]:
+    """
+    Totals over every session of this run; empty when no session was used.
+    """
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS)
+    if not sessions:
+        return {}
+    totals = {"sessions": len(sessions)}
+    for s in sessions:
+        for k, v in s.stats().items():
+            totals[k] = max(totals.get(k, 0), v) if k == "max_query_s" else totals.get(k, 0) + v
+    totals["load_ms_per_1000"] = totals["load_s"] / totals["ids_loaded"] * 1000 * 1000 if totals["ids_loaded"] else 0.0
+    totals["avg_query_ms"] = totals["query_s"] / totals["queries"] * 1000 if totals["queries"] else 0.0
+    return totals
+
+def close_dwh_sessions():
+    with _SESSIONS_LOCK:
+        for s in _SESSIONS:
+            s.retired = True
+            s.close()
+        _SESSIONS.clear()
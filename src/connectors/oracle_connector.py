@@ -1,8 +1,20 @@
 # src/connectors/oracle_connector.py
+"""
+Oracle connector with an optional session pool.
+
+Environment variables supported:
+- ORACLE_POOL_ENABLED: 'true' to use the session pool (default 'false')
+- ORACLE_POOL_MIN / ORACLE_POOL_MAX / ORACLE_POOL_INCREMENT: pool sizing (defaults 1 / 4 / 1)
+- ORACLE_STMT_CACHE_SIZE: statement cache size per session (default 40)
+- ORACLE_ARRAYSIZE / ORACLE_PREFETCHROWS: cursor fetch sizes applied to new cursors (defaults 500 / 500)
+"""
 import os
+import time
+import threading
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import oracledb
-from typing import Optional
+from typing import Optional, Dict, Tuple
 
 load_dotenv()
 
@@ -17,16 +29,154 @@ def build_oracle_dsn():
         raise ValueError("Either ORACLE_DSN or ORACLE_HOST+ORACLE_SERVICE must be set in .env")
     return f"{host}:{port}/{service}"
 
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("yes", "true", "1")
+
+ORACLE_ARRAYSIZE = int(os.getenv("ORACLE_ARRAYSIZE", "500"))
+ORACLE_PREFETCHROWS = int(os.getenv("ORACLE_PREFETCHROWS", "500"))
+
+class TunedConnection(oracledb.Connection):
+    """
+    Connection whose cursors start with ORACLE_ARRAYSIZE / ORACLE_PREFETCHROWS, so the fetch sizes
+    apply only to this connector's connections instead of the process-wide oracledb.defaults.
+    """
+    def cursor(self, scrollable: bool = False) -> oracledb.Cursor:
+        cur = super().cursor(scrollable)
+        cur.arraysize = ORACLE_ARRAYSIZE
+        cur.prefetchrows = ORACLE_PREFETCHROWS
+        return cur
+
+class PoolStats:
+    """
+    Acquire-wait and checkout-time counters for one pool (thread-safe).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.releases = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.total_checkout_s = 0.0
+        self.max_checkout_s = 0.0
+
+    def record_acquire(self, wait_s: float):
+        with self._lock:
+            self.acquisitions += 1
+            self.total_wait_s += wait_s
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+
+    def record_release(self, checkout_s: float):
+        with self._lock:
+            self.releases += 1
+            self.total_checkout_s += checkout_s
+            self.max_checkout_s = max(self.max_checkout_s, checkout_s)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "acquisitions": self.acquisitions,
+                "releases": self.releases,
+                "avg_wait_ms": (self.total_wait_s / self.acquisitions * 1000) if self.acquisitions else 0.0,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "avg_checkout_ms": (self.total_checkout_s / self.releases * 1000) if self.releases else 0.0,
+                "max_checkout_ms": self.max_checkout_s * 1000,
+            }
+
+_POOLS: Dict[Tuple[str, str], oracledb.ConnectionPool] = {}
+_POOL_STATS: Dict[Tuple[str, str], PoolStats] = {}
+_POOLS_LOCK = threading.Lock()
+
 class OracleConnector:
-    def __init__(self, user_env="ORACLE_USER", pwd_env="ORACLE_PASSWORD"):
+    def __init__(self, user_env="ORACLE_USER", pwd_env="ORACLE_PASSWORD", pooled: Optional[bool] = None):
         self.user = os.getenv(user_env)
         self.pwd = os.getenv(pwd_env)
         self.dsn = build_oracle_dsn()
         if not (self.user and self.pwd):
             raise ValueError("ORACLE_USER and ORACLE_PASSWORD must be set in .env")
+        self.pooled = _env_flag("ORACLE_POOL_ENABLED") if pooled is None else pooled
+        self._pool_key = (self.user, self.dsn)
+        self._checked_out = {}
+
+    def _get_pool(self) -> oracledb.ConnectionPool:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(self._pool_key)
+            if pool is None:
+                try:
+                    pool = oracledb.create_pool(
+                        user=self.user,
+                        password=self.pwd,
+                        dsn=self.dsn,
+                        min=int(os.getenv("ORACLE_POOL_MIN", "1")),
+                        max=int(os.getenv("ORACLE_POOL_MAX", "4")),
+                        increment=int(os.getenv("ORACLE_POOL_INCREMENT", "1")),
+                        stmtcachesize=int(os.getenv("ORACLE_STMT_CACHE_SIZE", "40")),
+                        getmode=oracledb.POOL_GETMODE_WAIT,
+                        connectiontype=TunedConnection,
+                    )
+                except Exception as exc:
+                    raise RuntimeError(f"[OracleConnector] pool creation failed: {exc}")
+                _POOLS[self._pool_key] = pool
+                _POOL_STATS[self._pool_key] = PoolStats()
+            return pool
 
     def get_connection(self) -> Optional[oracledb.Connection]:
+        if not self.pooled:
+            try:
+                return oracledb.connect(user=self.user, password=self.pwd, dsn=self.dsn, conn_class=TunedConnection)
+            except Exception as exc:
+                raise RuntimeError(f"[OracleConnector] connection failed: {exc}")
+        pool = self._get_pool()
+        start = time.perf_counter()
         try:
-            return oracledb.connect(user=self.user, password=self.pwd, dsn=self.dsn)
+            conn = pool.acquire()
         except Exception as exc:
-            raise RuntimeError(f"[OracleConnector] connection failed: {exc}")
+            raise RuntimeError(f"[OracleConnector] pool acquire failed: {exc}")
+        now = time.perf_counter()
+        _POOL_STATS[self._pool_key].record_acquire(now - start)
+        self._checked_out[id(conn)] = now
+        return conn
+
+    def release_connection(self, conn: oracledb.Connection):
+        """
+        Return a connection obtained from get_connection(); closes it when not pooled.
+        """
+        if conn is None:
+            return
+        if not self.pooled:
+            conn.close()
+            return
+        started = self._checked_out.pop(id(conn), None)
+        try:
+            _POOLS[self._pool_key].release(conn)
+        finally:
+            if started is not None:
+                _POOL_STATS[self._pool_key].record_release(time.perf_counter() - started)
+
+    @contextmanager
+    def connection(self):
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            self.release_connection(conn)
+
+    def pool_stats(self) -> dict:
+        """
+        Wait/checkout timings plus live pool counters; empty when not pooled or no pool yet.
+        """
+        pool = _POOLS.get(self._pool_key)
+        if not self.pooled or pool is None:
+            return {}
+        stats = _POOL_STATS[self._pool_key].as_dict()
+        stats.update({"opened": pool.opened, "busy": pool.busy, "max": pool.max})
+        return stats
+
+def close_oracle_pools():
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            try:
+                pool.close(force=True)
+            except Exception:
+                pass
+        _POOLS.clear()
+        _POOL_STATS.clear()
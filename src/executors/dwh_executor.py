@@ -2,65 +2,181 @@
 import os
 from datetime import datetime
 from src.connectors.dwh_connector import DWHConnector
-from src.utils.io_utils import save_json_file
+from src.connectors.dwh_session import (DWH_SESSION_REUSE, DWHSession, get_dwh_session, manages_members_table,
+                                        strip_members_ddl)
+from src.utils.io_utils import iter_fetchmany, write_ndjson_stream
+from src.utils.result_writer import save_cursor_rows
+from src.utils.row_converter import rows_to_columns
+from src.utils.bind_batching import run_batches
 
 DEFAULT_OUT = os.getenv("OUTPUT_DWH", "output/dwh")
+# streaming NDJSON output (constant memory) instead of one indented JSON document
+RESULT_STREAMING = os.getenv("RESULT_STREAMING", "false").lower() in ("yes", "true", "1")
+RESULT_GZIP = os.getenv("RESULT_GZIP", "false").lower() in ("yes", "true", "1")
+RESULT_ARRAYSIZE = int(os.getenv("RESULT_ARRAYSIZE", "5000"))
 
-def execute_dwh_and_save(sql: str, out_dir: str = DEFAULT_OUT):
+def stream_dwh_to_ndjson(sql: str, out_dir: str = DEFAULT_OUT, file_prefix: str = "dwh_result", ts: str = None,
+                        params=None, gzip_output: bool = None, arraysize: int = None):
+    """
+    Execute sql and write rows incrementally as NDJSON (optionally gzip) using fetchmany(arraysize).
+    Returns (filename, row_count, bytes_on_disk).
+    """
+    gzip_output = RESULT_GZIP if gzip_output is None else gzip_output
+    arraysize = arraysize or RESULT_ARRAYSIZE
+    ts = ts or datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(out_dir, f"{file_prefix}_{ts}.ndjson" + (".gz" if gzip_output else ""))
     dwh = DWHConnector()
     conn = dwh.get_connection()
     cur = conn.cursor()
-    cur.execute(sql)
-    rows = cur.fetchall()
-    cols = [c[0] for c in cur.description] if cur.description else []
-    results = []
-    for r in rows:
-        obj = {}
-        for idx, col in enumerate(cols):
-            val = r[idx]
-            try:
-                if hasattr(val, "isoformat"):
-                    val = val.isoformat()
-            except Exception:
-                pass
-            obj[col] = val
-        results.append(obj)
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.join(out_dir, f"dwh_result_{ts}.json")
-    save_json_file(results, filename)
-    cur.close()
-    conn.close()
-    return filename, len(results)
+    try:
+        if params:
+            cur.execute(sql, params)
+        else:
+            cur.execute(sql)
+        cols = [c[0] for c in cur.description] if cur.description else []
+        count, nbytes = write_ndjson_stream(iter_fetchmany(cur, arraysize), cols, filename, gzip_output)
+    finally:
+        cur.close()
+        conn.close()
+    return filename, count, nbytes
 
-def dwh_execute_with_temp_table(dwh_conn: DWHConnector, member_ids: list, full_sql_using_temp_table: str):
+def execute_dwh_and_save(sql: str, out_dir: str = DEFAULT_OUT, file_prefix: str = "dwh_result", ts: str = None, params=None,
+                         stream: bool = None, columns_out: dict = None):
     """
-    full_sql_using_temp_table is expected to include creation & join to temp table.
-    We'll open a connection, create temp table, bulk insert member ids, then execute and return results.
-    This helper expects the SQL returned by LLM to reference a temp table named '#members' or similar.
+    Execute sql and save the rows in RESULT_FORMAT (typed from cursor.description for Parquet /
+    Arrow), or stream them as NDJSON. Returns (filename, row_count, bytes_on_disk). columns_out,
+    when given, also receives the rows as {column: values} straight from the fetched tuples (not
+    in streaming mode).
     """
-    if not member_ids:
-        return []
-    conn = dwh_conn.get_connection()
+    if RESULT_STREAMING if stream is None else stream:
+        filename, count, nbytes = stream_dwh_to_ndjson(sql, out_dir, file_prefix, ts, params)
+        print(f"[dwh_executor] streamed {count} rows ({nbytes} bytes) to {filename}")
+        return filename, count, nbytes
+    dwh = DWHConnector()
+    conn = dwh.get_connection()
     cur = conn.cursor()
     try:
-        # create temp table
-        cur.execute("CREATE TABLE #members (member_id BIGINT);")
-        # bulk insert
-        rows_to_insert = [(int(mid),) for mid in member_ids]
-        cur.fast_executemany = True
-        cur.executemany("INSERT INTO #members (member_id) VALUES (?);", rows_to_insert)
-        # run the provided SQL (which should reference #members)
-        cur.execute(full_sql_using_temp_table)
-        cols = [c[0] for c in cur.description] if cur.description else []
-        results = [dict(zip(cols, r)) for r in cur.fetchall()]
-        # clean up
-        try:
-            cur.execute("DROP TABLE #members;")
-        except Exception:
-            pass
-        conn.commit()
-        return results
+        if params:
+            cur.execute(sql, params)
+        else:
+            cur.execute(sql)
+        description = cur.description or []
+        rows = cur.fetchall()
     finally:
         cur.close()
         conn.close()
+    if columns_out is not None:
+        columns_out.update(rows_to_columns(description, rows))
+    ts = ts or datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = save_cursor_rows(rows, description, os.path.join(out_dir, f"{file_prefix}_{ts}"))
+    return filename, len(rows), os.path.getsize(filename)
+
+def _stream_path(out_dir: str, file_prefix: str, ts: str, gzip_output: bool) -> str:
+    ts = ts or datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(out_dir, f"{file_prefix}_{ts}.ndjson" + (".gz" if gzip_output else ""))
+
+def execute_dwh_batches_and_save(statements: list, out_dir: str = DEFAULT_OUT, file_prefix: str = "dwh_result",
+                                 ts: str = None, parallel: int = 1, columns_out: dict = None, stream: bool = None):
+    """
+    Execute (sql, params) chunks produced by src.utils.bind_batching.plan_in_batches and save the
+    merged rows as one RESULT_FORMAT file. Each parallel chunk uses its own connection. columns_out,
+    when given, also receives the merged rows as {column: values}. In streaming mode the chunks run
+    one after another and are appended to one NDJSON file with fetchmany (columns_out stays empty).
+    Returns (filename, row_count, bytes_on_disk).
+    """
+    dwh = DWHConnector()
+    if RESULT_STREAMING if stream is None else stream:
+        filename = _stream_path(out_dir, file_prefix, ts, RESULT_GZIP)
+        # filled from the first chunk's description before its first batch reaches write_ndjson_stream
+        cols = []
+
+        def row_batches():
+            for sql, params in statements:
+                conn = dwh.get_connection()
+                cur = conn.cursor()
+                try:
+                    cur.execute(sql, params)
+                    if not cols and cur.description:
+                        cols.extend(c[0] for c in cur.description)
+                    yield from iter_fetchmany(cur, RESULT_ARRAYSIZE)
+                finally:
+                    cur.close()
+                    conn.close()
+
+        count, nbytes = write_ndjson_stream(row_batches(), cols, filename, RESULT_GZIP)
+        print(f"[dwh_executor] streamed {count} rows from {len(statements)} chunks ({nbytes} bytes) to {filename}")
+        return filename, count, nbytes
+
+    def run(sql, params):
+        conn = dwh.get_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.description or [], cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+
+    description = []
+    rows = []
+    for chunk_description, chunk_rows in run_batches(statements, run, parallel):
+        # every chunk has the same SQL shape, so any chunk's description describes them all
+        description = description or chunk_description
+        rows.extend(chunk_rows)
+    if columns_out is not None:
+        columns_out.update(rows_to_columns(description, rows))
+    ts = ts or datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = save_cursor_rows(rows, description, os.path.join(out_dir, f"{file_prefix}_{ts}"))
+    return filename, len(rows), os.path.getsize(filename)
+
+def _run_with_temp_table(dwh_conn: DWHConnector, member_ids: list, full_sql_using_temp_table: str, consume):
+    sql, stripped = strip_members_ddl(full_sql_using_temp_table)
+    if stripped:
+        print(f"[dwh_executor] removed {stripped} CREATE/DROP TABLE #members statement(s) from the batch SQL")
+    reuse = DWH_SESSION_REUSE and not manages_members_table(sql)
+    if DWH_SESSION_REUSE and not reuse:
+        print("[dwh_executor] batch SQL manages #members itself; using a one-off DWH session")
+    session = get_dwh_session() if reuse else DWHSession(dwh_conn)
+    try:
+        session.load_members(member_ids)
+        return session.run(sql, consume)
+    finally:
+        if not reuse:
+            session.close()
+
+def dwh_execute_with_temp_table(dwh_conn: DWHConnector, member_ids: list, full_sql_using_temp_table: str):
+    """
+    full_sql_using_temp_table is expected to reference the temp table '#members' (member_id BIGINT).
+    With DWH_SESSION_REUSE the calling worker's warm DWHSession reloads its existing #members
+    (truncate + bulk load) and runs the SQL; otherwise a one-off session is opened and closed.
+    CREATE / DROP TABLE #members statements in the SQL are removed (the session owns the table);
+    SQL that still manages #members runs on a one-off session so the warm one keeps its table.
+    Returns the rows as dicts.
+    """
+    if not member_ids:
+        return []
+
+    def fetch(cur):
+        cols = [c[0] for c in cur.description] if cur.description else []
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
+    return _run_with_temp_table(dwh_conn, member_ids, full_sql_using_temp_table, fetch)
+
+def stream_dwh_with_temp_table(dwh_conn: DWHConnector, member_ids: list, full_sql_using_temp_table: str,
+                               out_dir: str = DEFAULT_OUT, file_prefix: str = "dwh_result", ts: str = None,
+                               gzip_output: bool = None):
+    """
+    dwh_execute_with_temp_table, but the rows are written incrementally as NDJSON (fetchmany).
+    Returns (filename, row_count, bytes_on_disk).
+    """
+    gzip_output = RESULT_GZIP if gzip_output is None else gzip_output
+    filename = _stream_path(out_dir, file_prefix, ts, gzip_output)
+    if not member_ids:
+        count, nbytes = write_ndjson_stream([], [], filename, gzip_output)
+        return filename, count, nbytes
+
+    def write(cur):
+        cols = [c[0] for c in cur.description] if cur.description else []
+        return write_ndjson_stream(iter_fetchmany(cur, RESULT_ARRAYSIZE), cols, filename, gzip_output)
+    count, nbytes = _run_with_temp_table(dwh_conn, member_ids, full_sql_using_temp_table, write)
+    print(f"[dwh_executor] streamed {count} rows ({nbytes} bytes) to {filename}")
+    return filename, count, nbytes
@@ -2,30 +2,57 @@
 import os
 from datetime import datetime
 from src.connectors.oracle_connector import OracleConnector
-from src.utils.io_utils import save_json_file
+from src.utils.io_utils import iter_fetchmany, write_ndjson_stream
+from src.utils.result_writer import save_cursor_rows
 
 DEFAULT_OUT = os.getenv("OUTPUT_ORACLE", "output/oracle")
+# streaming NDJSON output (constant memory) instead of one indented JSON document
+RESULT_STREAMING = os.getenv("RESULT_STREAMING", "false").lower() in ("yes", "true", "1")
+RESULT_GZIP = os.getenv("RESULT_GZIP", "false").lower() in ("yes", "true", "1")
+RESULT_ARRAYSIZE = int(os.getenv("RESULT_ARRAYSIZE", "5000"))
 
-def execute_oracle_and_save(sql: str, out_dir: str = DEFAULT_OUT):
+def stream_oracle_to_ndjson(sql: str, out_dir: str = DEFAULT_OUT, gzip_output: bool = None, arraysize: int = None):
+    """
+    Execute sql and write rows incrementally as NDJSON (optionally gzip) using fetchmany(arraysize).
+    Returns (filename, row_count, bytes_on_disk).
+    """
+    gzip_output = RESULT_GZIP if gzip_output is None else gzip_output
+    arraysize = arraysize or RESULT_ARRAYSIZE
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(out_dir, f"oracle_result_{ts}.ndjson" + (".gz" if gzip_output else ""))
+    oc = OracleConnector()
+    conn = oc.get_connection()
+    cur = conn.cursor()
+    try:
+        cur.prefetchrows = arraysize
+        cur.arraysize = arraysize
+        cur.execute(sql)
+        cols = [c[0] for c in cur.description] if cur.description else []
+        count, nbytes = write_ndjson_stream(iter_fetchmany(cur, arraysize), cols, filename, gzip_output)
+    finally:
+        cur.close()
+        oc.release_connection(conn)
+    return filename, count, nbytes
+
+def execute_oracle_and_save(sql: str, out_dir: str = DEFAULT_OUT, stream: bool = None):
+    """
+    Execute sql and save the rows in RESULT_FORMAT (typed from cursor.description for Parquet /
+    Arrow), or stream them as NDJSON. Returns (filename, row_count, bytes_on_disk).
+    """
+    if RESULT_STREAMING if stream is None else stream:
+        filename, count, nbytes = stream_oracle_to_ndjson(sql, out_dir)
+        print(f"[oracle_executor] streamed {count} rows ({nbytes} bytes) to {filename}")
+        return filename, count, nbytes
     oc = OracleConnector()
     conn = oc.get_connection()
     cur = conn.cursor()
-    cur.execute(sql)
-    cols = [c[0] for c in cur.description] if cur.description else []
-    rows = cur.fetchall()
-    results = []
-    for r in rows:
-        obj = {}
-        for idx, col in enumerate(cols):
-            val = r[idx]
-            if hasattr(val, "isoformat"):
-                val = val.isoformat()
-            obj[col] = val
-        results.append(obj)
-    os.makedirs(out_dir, exist_ok=True)
+    try:
+        cur.execute(sql)
+        description = cur.description or []
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        oc.release_connection(conn)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.join(out_dir, f"oracle_result_{ts}.json")
-    save_json_file(results, filename)
-    cur.close()
-    conn.close()
-    return filename, len(results)
+    filename = save_cursor_rows(rows, description, os.path.join(out_dir, f"oracle_result_{ts}"))
+    return filename, len(rows), os.path.getsize(filename)
@@ -0,0 +1,136 @@
+# src/query_generators/keyset_pager.py
+"""
+Keyset (seek) pagination for single-row SQL templates.
+"""
+import re
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.sql_utils import (
+    strip_trailing_semicolon, strip_sql_comments, render_bind_template,
+    top_level_mask, find_top_level_keyword, split_top_level_commas,
+)
+
+SEEK_KEY_COL = "SEEK_KEY"
+SEEK_ID_COL = "SEEK_ID"
+
+class KeysetStatements:
+    def __init__(self, first: str, seek: str, seek_null: str, bind_names: Iterable[str]):
+        self.first = first
+        self.seek = seek
+        self.seek_null = seek_null
+        self.bind_names = tuple(sorted(bind_names))
+
+_COMPILED: Dict[str, Optional[KeysetStatements]] = {}
+_COMPILED_LOCK = threading.Lock()
+
+def _parse_order_by(order_by: str) -> Optional[Tuple[str, str]]:
+    items = split_top_level_commas(order_by)
+    if len(items) != 1:
+        return None
+    item = items[0]
+    if re.search(r'\bNULLS\b', top_level_mask(item), re.IGNORECASE):
+        return None
+    m = re.match(r'^(.*?)\s+(ASC|DESC)$', item, re.IGNORECASE | re.DOTALL)
+    if m:
+        return m.group(1).strip(), m.group(2).upper()
+    return item.strip(), "ASC"
+
+def _rewrite(base_sql: str, expr: str, direction: str, key_col: str, bind_names: Iterable[str]) -> Optional[KeysetStatements]:
+    mask = top_level_mask(base_sql)
+    sel = find_top_level_keyword(base_sql, "SELECT", mask=mask)
+    frm = find_top_level_keyword(base_sql, "FROM", start=sel + 1, mask=mask) if sel >= 0 else -1
+    if sel < 0 or frm < 0:
+        return None
+    if find_top_level_keyword(base_sql, r"GROUP\s+BY", mask=mask) >= 0 or find_top_level_keyword(base_sql, "UNION", mask=mask) >= 0:
+        return None
+    select_list = base_sql[sel + len("SELECT"):frm].strip()
+    if select_list == "*" or select_list.upper().startswith("DISTINCT"):
+        return None
+
+    # body = everything up to ORDER BY / OFFSET / FETCH, which are replaced
+    cut = len(base_sql)
+    for kw in (r"ORDER\s+BY", "OFFSET", "FETCH"):
+        pos = find_top_level_keyword(base_sql, kw, start=frm, mask=mask)
+        if pos >= 0:
+            cut = min(cut, pos)
+    head = base_sql[:frm].rstrip() + f", {expr} AS {SEEK_KEY_COL}, {key_col} AS {SEEK_ID_COL}\n"
+    body = base_sql[frm:cut].rstrip()
+    where = find_top_level_keyword(body, "WHERE")
+
+    cmp = "<" if direction == "DESC" else ">"
+    order_sql = f"\nORDER BY {expr} {direction}, {key_col} {direction}\nFETCH FIRST :page_limit ROWS ONLY"
+    seek_pred = f"({expr} {cmp} :seek_key OR ({expr} = :seek_key AND {key_col} {cmp} :seek_id))"
+    if direction == "DESC":
+        # NULL keys sort first: after a non-NULL key only non-NULL keys remain
+        seek_null_pred = f"({expr} IS NOT NULL OR {key_col} {cmp} :seek_id)"
+    else:
+        # NULL keys sort last: they always follow any non-NULL key
+        seek_pred = f"({seek_pred[1:-1]} OR {expr} IS NULL)"
+        seek_null_pred = f"({expr} IS NULL AND {key_col} {cmp} :seek_id)"
+
+    def with_pred(pred: str) -> str:
+        if where >= 0:
+            cond = body[where + len("WHERE"):].strip()
+            return f"{head}{body[:where]}WHERE ({cond})\n  AND {pred}{order_sql}"
+        return f"{head}{body}\nWHERE {pred}{order_sql}"
+
+    return KeysetStatements(
+        first=head + body + order_sql,
+        seek=with_pred(seek_pred),
+        seek_null=with_pred(seek_null_pred),
+        bind_names=bind_names,
+    )
+
+def compile_keyset_statements(sql_template: str, subs: dict, bind_names: Iterable[str], order_by: str,
+                              key_column: str = "MEMBER_ID") -> Optional[KeysetStatements]:
+    bind_names = tuple(bind_names)
+    base_sql = strip_trailing_semicolon(strip_sql_comments(render_bind_template(sql_template, subs, bind_names)))
+    key = hashlib.sha256(f"{order_by}\x00{key_column}\x00{base_sql}".encode("utf-8")).hexdigest()
+    with _COMPILED_LOCK:
+        if key in _COMPILED:
+            return _COMPILED[key]
+        parsed = _parse_order_by(order_by)
+        stmts = _rewrite(base_sql, parsed[0], parsed[1], key_column, bind_names) if parsed else None
+        if stmts is None:
+            print(f"[keyset_pager] cannot rewrite template for keyset paging (ORDER BY {order_by}); use OFFSET paging")
+        _COMPILED[key] = stmts
+        return stmts
+
+class KeysetPager:
+    """
+    Holds the seek position for one scan; call next_statement() before each page and
+    advance() with the fetched rows.
+    """
+    def __init__(self, statements: KeysetStatements):
+        self.statements = statements
+        self.started = False
+        self.exhausted = False
+        self.last_key = None
+        self.last_id = None
+
+    def next_statement(self, limit: int, **values) -> Tuple[str, dict]:
+        binds = {n: values[n] for n in self.statements.bind_names}
+        binds["page_limit"] = limit
+        if not self.started:
+            return self.statements.first, binds
+        binds["seek_id"] = self.last_id
+        if self.last_key is None:
+            return self.statements.seek_null, binds
+        binds["seek_key"] = self.last_key
+        return self.statements.seek, binds
+
+    def advance(self, rows: List[dict], limit: int) -> List[dict]:
+        """
+        Record the seek position from the last row and strip the helper columns.
+        """
+        self.started = True
+        if rows:
+            self.last_key = rows[-1].get(SEEK_KEY_COL)
+            self.last_id = rows[-1].get(SEEK_ID_COL)
+        if len(rows) < limit:
+            self.exhausted = True
+        for r in rows:
+            r.pop(SEEK_KEY_COL, None)
+            r.pop(SEEK_ID_COL, None)
+        return rows
@@ -0,0 +1,141 @@
+# src/query_generators/paged_query_compiler.py
+"""
+Compiles a single-row SQL template into one parameterized paged statement.
+"""
+import os
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Dict, Iterable, Optional
+from src.services.llm_client import call_llm
+from src.utils.sql_utils import strip_trailing_semicolon, strip_sql_comments, extract_bind_names, render_bind_template
+from src.query_generators.sql_rewriter import add_paging, deterministic_first
+
+PAGING_BINDS = ("page_offset", "page_limit")
+
+PROMPT_TEMPLATE = """You are an SQL assistant for {dialect}. Convert the following SQL into a paginated SQL statement.
+- Keep every existing bind variable exactly as written ({binds}).
+- Express paging ONLY through the bind variables :page_offset and :page_limit (OFFSET :page_offset ROWS FETCH NEXT :page_limit ROWS ONLY). Do NOT inline numbers.
+- Keep the existing ORDER BY so pages are deterministic.
+Return only one SQL statement (no commentary).
+
+SQL:
+{sql}
+"""
+
+class CompiledQuery:
+    def __init__(self, sql: str, bind_names: Iterable[str], source: str):
+        self.sql = sql
+        self.bind_names = tuple(sorted(bind_names))
+        self.source = source  # "rewriter", "llm", "llm-batch", "plan" or "fallback"
+
+    def binds(self, **values) -> Dict[str, object]:
+        """
+        Build the bind dict for one execution; only names present in the SQL are passed.
+        """
+        missing = [n for n in self.bind_names if n not in values]
+        if missing:
+            raise ValueError(f"missing bind values: {', '.join(missing)}")
+        return {n: values[n] for n in self.bind_names}
+
+_COMPILED: Dict[str, CompiledQuery] = {}
+_COMPILED_LOCK = threading.Lock()
+# compilations in progress by key, so concurrent callers of one template share one LLM call
+_PENDING: Dict[str, Future] = {}
+
+def _clean_llm_sql(resp: str) -> str:
+    sql = (resp or "").strip().strip("`").strip()
+    if sql.lower().startswith("sql\n"):
+        sql = sql[4:]
+    return strip_trailing_semicolon(sql).strip()
+
+def fallback_paged_sql(base_sql: str, dialect: str = "Oracle") -> str:
+    paged = add_paging(base_sql, dialect)
+    if paged is not None:
+        return paged
+    return f"{strip_trailing_semicolon(base_sql)}\nOFFSET :page_offset ROWS FETCH NEXT :page_limit ROWS ONLY"
+
+def paged_base_sql(sql_template: str, subs: dict, bind_names: Iterable[str]) -> str:
+    """
+    The rendered single-statement SQL (binds in place of placeholders, comments removed) that gets paged.
+    """
+    return strip_trailing_semicolon(strip_sql_comments(render_bind_template(sql_template, subs, tuple(bind_names))))
+
+def _compiled_key(dialect: str, use_llm: bool, base_sql: str) -> str:
+    return hashlib.sha256(f"{dialect}\x00{use_llm}\x00{base_sql}".encode("utf-8")).hexdigest()
+
+def _compile(base_sql: str, dialect: str, use_llm: bool) -> CompiledQuery:
+    expected = extract_bind_names(base_sql) | set(PAGING_BINDS)
+    if use_llm and deterministic_first():
+        # SQL_REWRITE_MODE=deterministic: the rewriter's paging needs no LLM round trip
+        paged_sql = add_paging(base_sql, dialect)
+        if paged_sql and extract_bind_names(paged_sql) == expected:
+            return CompiledQuery(paged_sql, expected, "rewriter")
+    if use_llm:
+        prompt = PROMPT_TEMPLATE.format(
+            dialect=dialect,
+            binds=", ".join(":" + b for b in sorted(extract_bind_names(base_sql))) or "none",
+            sql=base_sql,
+        )
+        try:
+            paged_sql = _clean_llm_sql(call_llm(prompt, temperature=float(os.getenv("LLM_TEMPERATURE", "0.0"))))
+            if paged_sql and extract_bind_names(paged_sql) == expected:
+                return CompiledQuery(paged_sql, expected, "llm")
+            if paged_sql:
+                print("[paged_query_compiler] LLM result has unexpected bind variables; using fallback")
+        except Exception as e:
+            print(f"[paged_query_compiler] LLM compile failed: {e}")
+    return CompiledQuery(fallback_paged_sql(base_sql, dialect), expected, "fallback")
+
+def compile_paged_query(sql_template: str, subs: dict, bind_names: Iterable[str], dialect: str = "Oracle",
+                        use_llm: bool = True) -> CompiledQuery:
+    """
+    The compiled paged statement for the template. Concurrent callers for the same key wait for one
+    compilation; the LLM call runs outside the cache lock, so other templates compile meanwhile.
+    A fallback (LLM failed or answered with the wrong binds) is cached like any other result, so
+    the LLM is not retried for that template until clear_compiled_queries() or the next run.
+    """
+    base_sql = paged_base_sql(sql_template, subs, bind_names)
+    key = _compiled_key(dialect, use_llm, base_sql)
+    with _COMPILED_LOCK:
+        compiled = _COMPILED.get(key)
+        if compiled is not None:
+            return compiled
+        pending = _PENDING.get(key)
+        if pending is None:
+            _PENDING[key] = future = Future()
+    if pending is not None:
+        return pending.result()
+    try:
+        compiled = _compile(base_sql, dialect, use_llm)
+        with _COMPILED_LOCK:
+            # a statement registered while this one compiled wins
+            compiled = _COMPILED.setdefault(key, compiled)
+        future.set_result(compiled)
+        return compiled
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _COMPILED_LOCK:
+            _PENDING.pop(key, None)
+
+def register_compiled_query(sql_template: str, subs: dict, bind_names: Iterable[str], paged_sql: str,
+                            dialect: str = "Oracle", source: str = "llm") -> Optional[CompiledQuery]:
+    """
+    Seed the cache with a paged statement compiled elsewhere (e.g. batch template compilation) so
+    compile_paged_query() returns it without an LLM call. Rejected (None) when its binds do not match.
+    """
+    base_sql = paged_base_sql(sql_template, subs, bind_names)
+    paged_sql = strip_trailing_semicolon(paged_sql).strip()
+    expected = extract_bind_names(base_sql) | set(PAGING_BINDS)
+    if not paged_sql or extract_bind_names(paged_sql) != expected:
+        return None
+    compiled = CompiledQuery(paged_sql, expected, source)
+    with _COMPILED_LOCK:
+        _COMPILED[_compiled_key(dialect, True, base_sql)] = compiled
+    return compiled
+
+def clear_compiled_queries():
+    with _COMPILED_LOCK:
+        _COMPILED.clear()
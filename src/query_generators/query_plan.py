@@ -0,0 +1,61 @@
+# src/query_generators/query_plan.py
+"""
+Ahead-of-time query plan artifacts (--compile-plan).
+"""
+import os
+import json
+import hashlib
+import datetime
+from typing import Dict, Iterable, Optional
+from src.utils.io_utils import load_json_file, save_json_file
+
+PLAN_VERSION = 1
+
+def _file_digest(path: str) -> str:
+    if not path or not os.path.exists(path):
+        return "missing"
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def plan_key(config: dict, schema_paths: Iterable[str], env_tokens: Dict[str, object]) -> str:
+    h = hashlib.sha256()
+    h.update(f"v{PLAN_VERSION}\x00".encode("utf-8"))
+    h.update(json.dumps(config, sort_keys=True, default=str).encode("utf-8"))
+    for path in schema_paths:
+        h.update(f"\x00{os.path.basename(path)}:{_file_digest(path)}".encode("utf-8"))
+    h.update(b"\x00" + json.dumps(env_tokens, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def plan_path(plan_dir: str, key: str) -> str:
+    return os.path.join(plan_dir, f"query_plan_{key[:16]}.json")
+
+def save_plan(plan_dir: str, key: str, queries: dict, validation: dict) -> str:
+    path = plan_path(plan_dir, key)
+    plan = {
+        "version": PLAN_VERSION,
+        "plan_key": key,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "queries": queries,
+        "validation": validation,
+    }
+    save_json_file(plan, path)
+    return path
+
+def load_plan(plan_dir: str, key: str) -> Optional[dict]:
+    """
+    Return the plan for key, or None when absent, from another version, or for another key.
+    """
+    path = plan_path(plan_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        plan = load_json_file(path)
+    except Exception as e:
+        print(f"[query_plan] unreadable plan {path}: {e}")
+        return None
+    if plan.get("version") != PLAN_VERSION or plan.get("plan_key") != key:
+        return None
+    return plan
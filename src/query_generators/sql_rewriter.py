@@ -0,0 +1,144 @@
+# src/query_generators/sql_rewriter.py
+"""
+Deterministic Oracle / T-SQL rewrites for IN-lists and paging, used instead of the LLM.
+"""
+import os
+import re
+from typing import Optional, Sequence
+from src.utils.sql_utils import strip_trailing_semicolon, top_level_mask, find_top_level_keyword
+from src.utils.bind_batching import find_param_predicate
+
+SQL_REWRITE_MODE = os.getenv("SQL_REWRITE_MODE", "deterministic").lower()
+
+TEMP_TABLE = "#members"
+TEMP_TABLE_COLUMN = "member_id"
+
+# clauses that end a WHERE condition, in statement order
+_AFTER_WHERE = (r"GROUP\s+BY", "HAVING", r"CONNECT\s+BY", r"START\s+WITH", r"ORDER\s+BY", "OFFSET", "FETCH",
+                "OPTION", r"FOR\s+UPDATE")
+_SET_OPERATORS = ("UNION", "INTERSECT", "MINUS", "EXCEPT")
+
+def is_tsql(dialect: str) -> bool:
+    return dialect.lower().replace(" ", "").replace("-", "") in ("tsql", "mssql", "sqlserver")
+
+def deterministic_first() -> bool:
+    return SQL_REWRITE_MODE != "llm"
+
+def sql_literal(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _first_top_level(sql: str, keywords, start: int, mask: str) -> int:
+    hits = [p for p in (find_top_level_keyword(sql, kw, start=start, mask=mask) for kw in keywords) if p >= 0]
+    return min(hits) if hits else -1
+
+def _main_from(sql: str, mask: str) -> int:
+    """
+    Position of the main query's FROM, or -1 for shapes that are not rewritten (no SELECT/FROM,
+    top-level set operators).
+    """
+    if _first_top_level(sql, _SET_OPERATORS, 0, mask) >= 0:
+        return -1
+    # with a leading CTE the last top-level SELECT is the main query
+    sel = -1
+    for m in re.finditer(r"\bSELECT\b", mask, re.IGNORECASE):
+        sel = m.start()
+    if sel < 0:
+        return -1
+    return find_top_level_keyword(sql, "FROM", start=sel, mask=mask)
+
+def add_where_predicate(sql: str, predicate: str) -> Optional[str]:
+    """
+    AND predicate into the main query's WHERE (existing condition parenthesised), or add a WHERE
+    before GROUP BY / HAVING / ORDER BY / paging. None for unsupported statement shapes.
+    """
+    sql = strip_trailing_semicolon(sql)
+    mask = top_level_mask(sql)
+    frm = _main_from(sql, mask)
+    if frm < 0:
+        return None
+    end = _first_top_level(sql, _AFTER_WHERE, frm, mask)
+    end = len(sql) if end < 0 else end
+    where = find_top_level_keyword(sql, "WHERE", start=frm, mask=mask)
+    tail = sql[end:]
+    if 0 <= where < end:
+        cond = sql[where + len("WHERE"):end].strip()
+        return f"{sql[:where]}WHERE ({cond})\n  AND {predicate}" + (f"\n{tail}" if tail else "")
+    return f"{sql[:end].rstrip()}\nWHERE {predicate}" + (f"\n{tail}" if tail else "")
+
+def to_literal_in(sql: str, param: str, values: Sequence, column: str = None) -> Optional[str]:
+    """
+    `col = {param}` -> `col IN (<literals>)`; without such a predicate, `column (default param) IN (...)`
+    is merged into the WHERE clause.
+    """
+    in_list = ", ".join(sql_literal(v) for v in values)
+    m = find_param_predicate(sql, param)
+    if m is not None:
+        return sql[:m.start()] + f"{m.group(1)} IN ({in_list})" + sql[m.end():]
+    return add_where_predicate(sql, f"{column or param} IN ({in_list})")
+
+def to_temp_table_semi_join(sql: str, param: str, temp_table: str = TEMP_TABLE,
+                            temp_column: str = TEMP_TABLE_COLUMN) -> Optional[str]:
+    """
+    `col = {param}` -> `col IN (SELECT member_id FROM #members)`, the shape dwh_execute_with_temp_table
+    expects. A semi-join keeps one row per matching row, like the IN-list form.
+    """
+    m = find_param_predicate(sql, param)
+    if m is None:
+        return None
+    return sql[:m.start()] + f"{m.group(1)} IN (SELECT {temp_column} FROM {temp_table})" + sql[m.end():]
+
+def main_table_ref(sql: str) -> Optional[str]:
+    """
+    How the main query's single FROM table can be referenced from a correlated subquery: its alias,
+    else its (possibly schema-qualified) name. None when the FROM has joins or several tables.
+    """
+    mask = top_level_mask(sql)
+    frm = _main_from(sql, mask)
+    if frm < 0:
+        return None
+    end = _first_top_level(sql, ("WHERE",) + _AFTER_WHERE, frm, mask)
+    from_clause = sql[frm + len("FROM"):len(sql) if end < 0 else end].strip()
+    if "," in from_clause or re.search(r"\bJOIN\b", from_clause, re.IGNORECASE):
+        return None
+    parts = from_clause.split()
+    if not parts or not re.match(r'^[A-Za-z0-9_$#".]+$', parts[0]):
+        return None
+    if len(parts) == 1:
+        return parts[0]
+    if len(parts) == 2:
+        return parts[1]
+    if len(parts) == 3 and parts[1].upper() == "AS":
+        return parts[2]
+    return None
+
+def to_correlated_exists(inner_sql: str, param: str, outer_column_ref: str) -> Optional[str]:
+    """
+    `col = {param}` in inner_sql -> `col = <outer_column_ref>`, wrapped as EXISTS (...), e.g. to
+    turn a single-value registration check into a semi-join on the outer query's rows.
+    """
+    m = find_param_predicate(inner_sql, param)
+    if m is None:
+        return None
+    inner = strip_trailing_semicolon(inner_sql[:m.start()] + f"{m.group(1)} = {outer_column_ref}" + inner_sql[m.end():])
+    return f"EXISTS (\n{inner.strip()}\n)"
+
+def add_paging(sql: str, dialect: str = "Oracle") -> Optional[str]:
+    """
+    Append OFFSET :page_offset ROWS FETCH NEXT :page_limit ROWS ONLY after the top-level ORDER BY,
+    replacing an existing top-level OFFSET/FETCH. Oracle only: CompiledQuery carries named binds,
+    which pyodbc (qmark) cannot execute, so other dialects return None and callers fall back to
+    the LLM.
+    """
+    if dialect.lower() != "oracle":
+        return None
+    sql = strip_trailing_semicolon(sql).rstrip()
+    mask = top_level_mask(sql)
+    order = find_top_level_keyword(sql, r"ORDER\s+BY", mask=mask)
+    cut = _first_top_level(sql, ("OFFSET", "FETCH"), max(order, 0), mask)
+    if cut >= 0:
+        sql = sql[:cut].rstrip()
+    return sql + "\nOFFSET :page_offset ROWS FETCH NEXT :page_limit ROWS ONLY"
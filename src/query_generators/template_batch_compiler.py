@@ -0,0 +1,132 @@
+# src/query_generators/template_batch_compiler.py
+"""
+Compiles every config.json query template in one LLM request.
+"""
+import os
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from src.services.llm_client import call_llm, replace_cached_response
+from src.utils.sql_utils import strip_trailing_semicolon, extract_bind_names
+from src.utils.bind_batching import can_bind_in_list, make_bind_in_sql
+from src.query_generators.paged_query_compiler import PAGING_BINDS
+
+TEMPLATE_BATCH_RETRIES = int(os.getenv("TEMPLATE_BATCH_RETRIES", "2"))
+
+PROMPT_HEADER = """You are an SQL assistant. Transform each SQL template below as instructed.
+Answer with ONE JSON object that maps every template name to its transformed SQL string.
+No commentary, no markdown, exactly the template names listed.
+"""
+
+PAGED_TASK = ("Dialect: {dialect}. Keep every bind variable exactly as written ({binds}) and add paging ONLY through the "
+              "bind variables :page_offset and :page_limit (OFFSET :page_offset ROWS FETCH NEXT :page_limit ROWS ONLY). "
+              "Do NOT inline numbers. Keep the existing ORDER BY.")
+
+IN_LIST_TASK = ("Dialect: {dialect}. The template checks ONE value of {param}. Rewrite it to check many values by replacing "
+                "that predicate with `<same column> IN ({{{param}_list}})` - write the token {{{param}_list}} literally, "
+                "it is expanded into bind variables later. Change nothing else.")
+
+Validator = Callable[[str, str], Tuple[bool, str]]
+
+class TemplateSpec:
+    def __init__(self, name: str, sql: str, dialect: str, kind: str, param: str = None):
+        if kind not in ("paged", "in_list"):
+            raise ValueError(f"unsupported template kind: {kind}")
+        self.name = name
+        self.sql = sql
+        self.dialect = dialect
+        self.kind = kind
+        self.param = param
+
+    def task(self) -> str:
+        if self.kind == "paged":
+            binds = ", ".join(":" + b for b in sorted(extract_bind_names(self.sql))) or "none"
+            return PAGED_TASK.format(dialect=self.dialect, binds=binds)
+        return IN_LIST_TASK.format(dialect=self.dialect, param=self.param)
+
+def build_batch_prompt(specs: Iterable[TemplateSpec], rejected: Dict[str, str] = None) -> str:
+    rejected = rejected or {}
+    parts = [PROMPT_HEADER]
+    for spec in specs:
+        parts.append(f"### {spec.name}\nTask: {spec.task()}")
+        if spec.name in rejected:
+            parts.append(f"Your previous answer for {spec.name} was rejected: {rejected[spec.name]}")
+        parts.append(f"SQL:\n{spec.sql}\n")
+    return "\n".join(parts)
+
+def parse_batch_response(resp: str) -> Dict[str, str]:
+    text = (resp or "").strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("no JSON object in LLM response")
+    data = json.loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError("LLM response is not a JSON object")
+    return {str(k): strip_trailing_semicolon(str(v)).strip() for k, v in data.items() if isinstance(v, str)}
+
+def check_template_result(spec: TemplateSpec, sql: str, validate: Optional[Validator] = None) -> Tuple[bool, str]:
+    """
+    Structural check for one compiled template, then the optional validator(dialect, sql).
+    """
+    if not sql:
+        return False, "empty SQL"
+    if spec.kind == "paged":
+        expected = extract_bind_names(spec.sql) | set(PAGING_BINDS)
+        found = extract_bind_names(sql)
+        if found != expected:
+            return False, f"bind variables {sorted(found)} != expected {sorted(expected)}"
+        probe = sql
+    else:
+        if not can_bind_in_list(sql, spec.param):
+            return False, f"missing `IN ({{{spec.param}_list}})` predicate"
+        probe = make_bind_in_sql(sql, spec.param, 1, spec.dialect)
+    if validate is not None:
+        return validate(spec.dialect, probe)
+    return True, "ok"
+
+def compile_templates_batch(specs: List[TemplateSpec], validate: Optional[Validator] = None,
+                            retries: int = None) -> Dict[str, str]:
+    """
+    Compile all specs with one LLM request (plus one per retry round for rejected templates).
+    Returns {name: sql} for the templates that passed.
+    """
+    retries = TEMPLATE_BATCH_RETRIES if retries is None else retries
+    temperature = float(os.getenv("LLM_TEMPERATURE", "0.0"))
+    first_prompt = None
+    first_rejected = False
+    compiled: Dict[str, str] = {}
+    rejected: Dict[str, str] = {}
+    pending = list(specs)
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        prompt = build_batch_prompt(pending, rejected)
+        if attempt == 0:
+            first_prompt = prompt
+        try:
+            # retries bypass the cache so a repeated rejection reason cannot replay a cached bad answer
+            resp = call_llm(prompt, temperature=temperature, use_cache=attempt == 0)
+            answers = parse_batch_response(resp)
+        except Exception as e:
+            print(f"[template_batch_compiler] attempt {attempt + 1} failed: {e}")
+            answers = {}
+        still_pending = []
+        for spec in pending:
+            sql = answers.get(spec.name)
+            ok, msg = check_template_result(spec, sql, validate) if sql else (False, "missing from answer")
+            if ok:
+                compiled[spec.name] = sql
+                rejected.pop(spec.name, None)
+            else:
+                rejected[spec.name] = msg
+                still_pending.append(spec)
+        if attempt == 0:
+            first_rejected = bool(still_pending)
+        pending = still_pending
+    if first_rejected:
+        # the cached first answer is (partly) bad: keep only what passed, so the next run replays the
+        # accepted templates and asks again for the rest
+        replace_cached_response(first_prompt, json.dumps(compiled) if compiled else None, temperature)
+    for spec in pending:
+        print(f"[template_batch_compiler] {spec.name} not compiled: {rejected.get(spec.name)}")
+    print(f"[template_batch_compiler] compiled {len(compiled)}/{len(specs)} templates")
+    return compiled
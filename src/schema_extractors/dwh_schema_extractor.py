@@ -1,11 +1,13 @@
 # src/schema_extractors/dwh_schema_extractor.py
 import os
+import time
 from typing import Dict, Tuple
 from src.connectors.dwh_connector import DWHConnector
-from src.utils.io_utils import save_json_file
+from src.utils.bind_batching import plan_in_batches
+from src.schema_extractors.schema_snapshot import ddl_stamp, save_snapshot, load_snapshot, merge_changed_tables
 
 """
-DWH schema extractor (SQL Server / INFORMATION_SCHEMA) - configurable and safe.
+DWH schema extractor (SQL Server catalog views) - configurable and safe.
 
 Environment variables supported:
 - DWH_SCHEMA: comma-separated schema names to include (e.g. dbo, staging)
@@ -13,6 +15,11 @@ Environment variables supported:
 - DWH_TABLE_PREFIX: table name prefix to include
 - DWH_MAX_TABLES: integer maximum number of tables to extract (safe default applied)
 - DWH_SAMPLE_COLUMNS: if set to 'true', we will only sample up to first N columns (not used here)
+
+User tables and views are extracted (like the former INFORMATION_SCHEMA.COLUMNS query).
+Per-object sys.objects.modify_date is saved next to the snapshot so refresh_dwh_schema() only
+re-fetches objects whose DDL changed; a view's stamp is the newest modify_date of the view and the
+objects it references, so altering a base table also refreshes the views over it.
 """
 
 DEFAULT_MAX_TABLES_SAFE = 20  # safety fallback to avoid extracting millions of tables
@@ -23,11 +30,11 @@ def _parse_csv_env(name: str):
         return None
     return [x.strip() for x in v.split(",") if x.strip()]
 
-def extract_dwh_schema(output_path: str = "schema/dwh_schema.json") -> Dict[str, Dict]:
-    dconn = DWHConnector()
-    conn = dconn.get_connection()
-    cur = conn.cursor()
-
+def _selected_tables(cur):
+    """
+    Return an ordered {"SCHEMA.TABLE": (object_id, modify_date)} for the user tables and views selected by
+    DWH_SCHEMA / DWH_TABLES / DWH_TABLE_PREFIX / DWH_MAX_TABLES.
+    """
     # read filters from env
     wanted_schemas = _parse_csv_env("DWH_SCHEMA")  # e.g. ["dbo","staging"]
     wanted_tables = _parse_csv_env("DWH_TABLES")   # e.g. ["MEMBER_DWH","ORDERS"]
@@ -42,65 +49,108 @@ def extract_dwh_schema(output_path: str = "schema/dwh_schema.json") -> Dict[str,
     if not (wanted_schemas or wanted_tables or table_prefix or max_tables):
         max_tables = DEFAULT_MAX_TABLES_SAFE
 
-    # Build WHERE clause pieces
-    where_clauses = []
-    params = {}
+    # Build WHERE clause pieces; pyodbc uses positional binding, so order matters:
+    # wanted_schemas, wanted_tables, then prefix
+    where_clauses = ["o.type IN ('U', 'V')"]
+    param_values = []
 
     if wanted_schemas:
         placeholders = ",".join(["?"] * len(wanted_schemas))
-        where_clauses.append(f"TABLE_SCHEMA IN ({placeholders})")
-        params.update({f"ps{i}": v for i, v in enumerate(wanted_schemas)})
-        # pyodbc doesn't accept named params in the same way, we'll use positional binding later
+        where_clauses.append(f"s.name IN ({placeholders})")
+        param_values.extend(wanted_schemas)
 
     if wanted_tables:
         placeholders = ",".join(["?"] * len(wanted_tables))
-        where_clauses.append(f"TABLE_NAME IN ({placeholders})")
-        params.update({f"pt{i}": v for i, v in enumerate(wanted_tables)})
+        where_clauses.append(f"o.name IN ({placeholders})")
+        param_values.extend(wanted_tables)
 
     if table_prefix:
-        where_clauses.append("TABLE_NAME LIKE ?")
-        params[f"pp0"] = f"{table_prefix}%"
-
-    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
+        where_clauses.append("o.name LIKE ?")
+        param_values.append(f"{table_prefix}%")
 
-    # Query INFORMATION_SCHEMA.COLUMNS with filtering. We'll fetch rows and then limit by distinct tables if needed.
     q = f"""
-    SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, DATA_TYPE
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE {where_sql}
-    ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION
+    SELECT o.object_id, s.name, o.name,
+           CASE WHEN o.type = 'V' THEN ISNULL((
+               SELECT MAX(r.modify_date)
+               FROM sys.sql_expression_dependencies d
+               JOIN sys.objects r ON r.object_id = d.referenced_id
+               WHERE d.referencing_id = o.object_id AND r.modify_date > o.modify_date
+           ), o.modify_date) ELSE o.modify_date END AS modify_date
+    FROM sys.objects o
+    JOIN sys.schemas s ON s.schema_id = o.schema_id
+    WHERE {" AND ".join(where_clauses)}
+    ORDER BY s.name, o.name
     """
-    # Build positional parameter list in the correct order
-    param_values = []
-    # order matters: wanted_schemas, wanted_tables, then prefix
-    if wanted_schemas:
-        param_values.extend(wanted_schemas)
-    if wanted_tables:
-        param_values.extend(wanted_tables)
-    if table_prefix:
-        param_values.append(f"{table_prefix}%")
-
-    # Execute
-    cur.execute(q, param_values if param_values else None)
-    rows = cur.fetchall()
-
-    # Build a mapping of (schema,table) -> list of columns. But if max_tables is set, only keep first N distinct tables.
-    schema = {}
-    distinct_table_keys = []
-    for sch, tbl, col, dtype in rows:
-        key = f"{sch.upper()}.{tbl.upper()}"
-        if key not in schema:
-            # if we already reached max_tables, skip creating new keys
-            if max_tables and len(distinct_table_keys) >= max_tables:
+    if param_values:
+        cur.execute(q, param_values)
+    else:
+        cur.execute(q)
+
+    tables = {}
+    for object_id, sch, tbl, modified in cur.fetchall():
+        if max_tables and len(tables) >= max_tables:
+            break
+        tables[f"{sch.upper()}.{tbl.upper()}"] = (object_id, modified)
+    return tables
+
+def _fetch_columns(cur, tables: dict, keys: list) -> dict:
+    """
+    Fetch columns for the given table keys with object_id IN-list chunks.
+    """
+    by_id = {tables[k][0]: k for k in keys}
+    schema = {k: {"columns": {}} for k in keys}
+    base_sql = (
+        "SELECT c.object_id, c.name, TYPE_NAME(c.system_type_id) FROM sys.columns c "
+        "WHERE c.object_id = {object_id} ORDER BY c.object_id, c.column_id"
+    )
+    for sql, params in plan_in_batches(base_sql, "object_id", list(by_id.keys()), "SQLServer") or []:
+        cur.execute(sql, params)
+        for object_id, col, dtype in cur.fetchall():
+            key = by_id.get(object_id)
+            if key is None:
                 continue
-            distinct_table_keys.append(key)
-            schema[key] = {"columns": {}}
-        # add column; if many duplicates, last wins but that's fine
-        schema[key]["columns"][col.upper()] = dtype.upper()
+            # add column; if many duplicates, last wins but that's fine
+            schema[key]["columns"][col.upper()] = (dtype or "").upper()
+    return schema
 
-    cur.close()
-    conn.close()
+def extract_dwh_schema(output_path: str = "schema/dwh_schema.json") -> Dict[str, Dict]:
+    dconn = DWHConnector()
+    conn = dconn.get_connection()
+    cur = conn.cursor()
+    try:
+        tables = _selected_tables(cur)
+        schema = _fetch_columns(cur, tables, list(tables.keys()))
+    finally:
+        cur.close()
+        conn.close()
 
-    save_json_file(schema, output_path)
+    save_snapshot(schema, {k: ddl_stamp(v[1]) for k, v in tables.items()}, output_path)
     print(f"[dwh_schema_extractor] saved {len(schema)} tables to {output_path}")
     return schema
+
+def refresh_dwh_schema(output_path: str = "schema/dwh_schema.json") -> Dict[str, Dict]:
+    """
+    Incremental refresh: compare sys.objects.modify_date with the stored timestamps and re-fetch only
+    added/changed tables, dropping vanished ones. Falls back to a full extract when no snapshot exists.
+    """
+    schema, stored_ddl = load_snapshot(output_path)
+    if not schema:
+        return extract_dwh_schema(output_path)
+
+    started = time.perf_counter()
+    dconn = DWHConnector()
+    conn = dconn.get_connection()
+    cur = conn.cursor()
+    try:
+        tables = _selected_tables(cur)
+        current_ddl = {k: ddl_stamp(v[1]) for k, v in tables.items()}
+        changed, dropped = merge_changed_tables(schema, stored_ddl, current_ddl, lambda keys: _fetch_columns(cur, tables, keys))
+    finally:
+        cur.close()
+        conn.close()
+
+    if changed or dropped or stored_ddl != current_ddl:
+        save_snapshot(schema, current_ddl, output_path)
+    print(f"[dwh_schema_extractor] refreshed {output_path}: {len(changed)} re-fetched, {len(dropped)} dropped, "
+          f"{len(schema)} tables ({time.perf_counter() - started:.2f}s)")
+    return schema
@@ -1,62 +1,153 @@
 # src/schema_extractors/oracle_schema_extractor.py
 import os
+import time
 from dotenv import load_dotenv
 from src.connectors.oracle_connector import OracleConnector
-from src.utils.io_utils import save_json_file
+from src.utils.bind_batching import plan_in_batches, run_batches
+from src.schema_extractors.schema_snapshot import ddl_stamp, save_snapshot, load_snapshot, merge_changed_tables
 
 load_dotenv()
 
-def extract_oracle_schema(output_path: str = "schema/oracle_schema.json"):
-    oc = OracleConnector()
-    conn = oc.get_connection()
-    cur = conn.cursor()
+SCHEMA_CHUNK_SIZE = int(os.getenv("SCHEMA_CHUNK_SIZE", "500"))
+SCHEMA_EXTRACT_PARALLEL = int(os.getenv("SCHEMA_EXTRACT_PARALLEL", "1"))
+SCHEMA_ARRAYSIZE = int(os.getenv("SCHEMA_ARRAYSIZE", "5000"))
 
-    owner = os.getenv("SCHEMA_OWNER")
+def _selected_tables(oc: OracleConnector, owner: str):
+    """
+    Return ({table: last_ddl_time} for the tables selected by SCHEMA_TABLES / SCHEMA_TABLE_PREFIX /
+    SCHEMA_MAX_TABLES, total number of tables visible for the owner).
+    """
     table_list_env = os.getenv("SCHEMA_TABLES")
     prefix = os.getenv("SCHEMA_TABLE_PREFIX")
     max_tables = int(os.getenv("SCHEMA_MAX_TABLES") or 0)
 
-    if owner:
-        cur.execute("SELECT TABLE_NAME FROM ALL_TABLES WHERE OWNER = :owner ORDER BY TABLE_NAME", {"owner": owner.upper()})
-        tables_raw = [r[0] for r in cur.fetchall()]
-    else:
-        cur.execute("SELECT TABLE_NAME FROM USER_TABLES ORDER BY TABLE_NAME")
-        tables_raw = [r[0] for r in cur.fetchall()]
+    conn = oc.get_connection()
+    cur = conn.cursor()
+    try:
+        if owner:
+            cur.execute(
+                "SELECT t.TABLE_NAME, o.LAST_DDL_TIME FROM ALL_TABLES t "
+                "JOIN ALL_OBJECTS o ON o.OWNER = t.OWNER AND o.OBJECT_NAME = t.TABLE_NAME AND o.OBJECT_TYPE = 'TABLE' "
+                "WHERE t.OWNER = :owner ORDER BY t.TABLE_NAME",
+                {"owner": owner.upper()},
+            )
+        else:
+            cur.execute(
+                "SELECT t.TABLE_NAME, o.LAST_DDL_TIME FROM USER_TABLES t "
+                "JOIN USER_OBJECTS o ON o.OBJECT_NAME = t.TABLE_NAME AND o.OBJECT_TYPE = 'TABLE' "
+                "ORDER BY t.TABLE_NAME"
+            )
+        tables_raw = [(r[0], r[1]) for r in cur.fetchall()]
+    finally:
+        cur.close()
+        oc.release_connection(conn)
 
     if table_list_env:
         wanted = set([t.strip().upper() for t in table_list_env.strip().strip('"').strip("'").split(",") if t.strip()])
-        tables = [t for t in tables_raw if t.upper() in wanted]
+        tables = [t for t in tables_raw if t[0].upper() in wanted]
     elif prefix:
         pref = prefix.strip().upper()
-        tables = [t for t in tables_raw if t.upper().startswith(pref)]
+        tables = [t for t in tables_raw if t[0].upper().startswith(pref)]
     else:
         tables = tables_raw
 
     if max_tables and len(tables) > max_tables:
         tables = tables[:max_tables]
 
-    schema = {}
-    for tbl in tables:
-        if owner:
-            q = """
-            SELECT COLUMN_NAME, DATA_TYPE FROM ALL_TAB_COLUMNS
-            WHERE OWNER = :owner AND TABLE_NAME = :tbl_name
-            ORDER BY COLUMN_ID
-            """
-            cur.execute(q, {"owner": owner.upper(), "tbl_name": tbl.upper()})
-        else:
-            q = """
-            SELECT COLUMN_NAME, DATA_TYPE FROM USER_TAB_COLUMNS
-            WHERE TABLE_NAME = :tbl_name
-            ORDER BY COLUMN_ID
-            """
-            cur.execute(q, {"tbl_name": tbl.upper()})
-        cols = {row[0].upper(): row[1] for row in cur.fetchall()}
-        schema[tbl.upper()] = {"columns": cols}
-
-    cur.close()
-    conn.close()
-
-    save_json_file(schema, output_path)
-    print(f"[oracle_schema_extractor] saved {len(schema)} tables to {output_path}")
+    return {t.upper(): ddl_stamp(ts) for t, ts in tables}, len(tables_raw)
+
+def _fetch_columns(oc: OracleConnector, owner: str, tables: list, whole_owner: bool = False):
+    """
+    Fetch columns for tables in one pass; returns (schema, query_count).
+    """
+    owner_u = owner.upper() if owner else None
+    view = "ALL_TAB_COLUMNS" if owner_u else "USER_TAB_COLUMNS"
+    select_sql = (
+        f"SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, NULLABLE, DATA_LENGTH, DATA_PRECISION, DATA_SCALE, CHAR_LENGTH "
+        f"FROM {view}"
+    )
+    order_sql = " ORDER BY TABLE_NAME, COLUMN_ID"
+    owner_where = " WHERE OWNER = :owner" if owner_u else ""
+    if whole_owner:
+        # every table is wanted: a single query, no IN-list needed
+        statements = [(select_sql + owner_where + order_sql, {})]
+    else:
+        base_sql = select_sql + (owner_where + " AND" if owner_u else " WHERE") + " TABLE_NAME = {table_name}" + order_sql
+        statements = plan_in_batches(base_sql, "table_name", tables, "Oracle", max_chunk=SCHEMA_CHUNK_SIZE) or []
+    if owner_u:
+        for _, binds in statements:
+            binds["owner"] = owner_u
+
+    def fetch_chunk(sql, binds):
+        c = oc.get_connection()
+        k = c.cursor()
+        try:
+            k.arraysize = SCHEMA_ARRAYSIZE
+            k.prefetchrows = SCHEMA_ARRAYSIZE
+            k.execute(sql, binds)
+            return k.fetchall()
+        finally:
+            k.close()
+            oc.release_connection(c)
+
+    schema = {t: {"columns": {}, "column_info": {}} for t in tables}
+    for rows in run_batches(statements, fetch_chunk, SCHEMA_EXTRACT_PARALLEL):
+        for tbl, col, dtype, nullable, length, precision, scale, char_length in rows:
+            tbl = tbl.upper()
+            if tbl not in schema:
+                continue
+            col = col.upper()
+            schema[tbl]["columns"][col] = dtype
+            schema[tbl]["column_info"][col] = {
+                "type": dtype,
+                "nullable": nullable == "Y",
+                "length": char_length or length,
+                "precision": precision,
+                "scale": scale,
+            }
+    return schema, len(statements)
+
+def extract_oracle_schema(output_path: str = "schema/oracle_schema.json"):
+    """
+    Extract columns for the selected tables in one pass: a single ALL_TAB_COLUMNS query when the whole
+    owner is wanted, otherwise bind IN-list chunks of SCHEMA_CHUNK_SIZE tables, optionally fanned out over
+    SCHEMA_EXTRACT_PARALLEL pooled sessions. Each table keeps the {"columns": {COL: TYPE}} shape used by
+    the validators plus "column_info" with nullability, length, precision and scale.
+    Per-table LAST_DDL_TIME is saved next to the snapshot for refresh_oracle_schema().
+    """
+    started = time.perf_counter()
+    oc = OracleConnector()
+    owner = os.getenv("SCHEMA_OWNER")
+
+    ddl_times, total = _selected_tables(oc, owner)
+    tables = list(ddl_times.keys())
+    schema, queries = _fetch_columns(oc, owner, tables, whole_owner=len(tables) == total)
+
+    elapsed = time.perf_counter() - started
+    save_snapshot(schema, ddl_times, output_path)
+    rate = len(schema) / elapsed if elapsed > 0 else float(len(schema))
+    print(f"[oracle_schema_extractor] saved {len(schema)} tables to {output_path} "
+          f"({queries} queries, {elapsed:.2f}s, {rate:.1f} tables/sec)")
+    return schema
+
+def refresh_oracle_schema(output_path: str = "schema/oracle_schema.json"):
+    """
+    Incremental refresh: compare ALL_OBJECTS.LAST_DDL_TIME with the stored timestamps and re-fetch only
+    added/changed tables, dropping vanished ones. Falls back to a full extract when no snapshot exists.
+    """
+    schema, stored_ddl = load_snapshot(output_path)
+    if not schema:
+        return extract_oracle_schema(output_path)
+
+    started = time.perf_counter()
+    oc = OracleConnector()
+    owner = os.getenv("SCHEMA_OWNER")
+    current_ddl, _ = _selected_tables(oc, owner)
+    changed, dropped = merge_changed_tables(
+        schema, stored_ddl, current_ddl, lambda tables: _fetch_columns(oc, owner, tables)[0]
+    )
+    if changed or dropped or stored_ddl != current_ddl:
+        save_snapshot(schema, current_ddl, output_path)
+    print(f"[oracle_schema_extractor] refreshed {output_path}: {len(changed)} re-fetched, {len(dropped)} dropped, "
+          f"{len(schema)} tables ({time.perf_counter() - started:.2f}s)")
     return schema
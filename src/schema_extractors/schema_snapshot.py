@@ -0,0 +1,42 @@
+# src/schema_extractors/schema_snapshot.py
+"""
+DDL timestamp sidecars and merging for incremental schema refresh.
+"""
+import os
+from typing import Callable, Dict, List, Tuple
+from src.utils.io_utils import load_json_file, save_json_file
+
+def ddl_path(snapshot_path: str) -> str:
+    return os.path.splitext(snapshot_path)[0] + ".ddl.json"
+
+def ddl_stamp(val) -> str:
+    return val.isoformat() if hasattr(val, "isoformat") else str(val)
+
+def save_snapshot(schema: dict, ddl_times: Dict[str, str], snapshot_path: str):
+    save_json_file(schema, snapshot_path)
+    save_json_file({k: ddl_times[k] for k in schema if k in ddl_times}, ddl_path(snapshot_path))
+
+def load_snapshot(snapshot_path: str) -> Tuple[dict, Dict[str, str]]:
+    """
+    Return (schema, ddl_times); ddl_times is empty when the snapshot predates the sidecar.
+    """
+    if not os.path.exists(snapshot_path):
+        return {}, {}
+    schema = load_json_file(snapshot_path)
+    sidecar = ddl_path(snapshot_path)
+    ddl_times = load_json_file(sidecar) if os.path.exists(sidecar) else {}
+    return schema, ddl_times
+
+def merge_changed_tables(schema: dict, stored_ddl: Dict[str, str], current_ddl: Dict[str, str],
+                         fetch_columns: Callable[[List[str]], dict]) -> Tuple[List[str], List[str]]:
+    """
+    Re-fetch added/changed tables via fetch_columns(table_keys) and drop vanished ones, updating
+    schema in place. Returns (refetched, dropped) table keys.
+    """
+    changed = [t for t, ts in current_ddl.items() if t not in schema or stored_ddl.get(t) != ts]
+    dropped = [t for t in list(schema.keys()) if t not in current_ddl]
+    for t in dropped:
+        schema.pop(t, None)
+    if changed:
+        schema.update(fetch_columns(changed))
+    return changed, dropped
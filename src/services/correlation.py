@@ -0,0 +1,81 @@
+# src/services/correlation.py
+"""
+Oracle candidates <-> DWH results correlation (one merged file per example).
+"""
+import os
+import time
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+from src.utils.io_utils import write_ndjson_stream
+from src.utils.result_writer import result_format, save_columns
+from src.utils.row_converter import column_length, columns_from_rows
+try:
+    from src.utils.columnar import join_indices, key_array, take, iter_row_chunks
+except ImportError:  # correlation is skipped without numpy
+    join_indices = None
+
+load_dotenv()
+
+CORRELATION_ENABLED = os.getenv("CORRELATION_ENABLED", "true").lower() in ("yes", "true", "1")
+CORRELATION_JOIN = os.getenv("CORRELATION_JOIN", "left").lower()
+CORRELATION_ORACLE_KEY = os.getenv("CORRELATION_ORACLE_KEY", "MEMBER_ID")
+CORRELATION_DWH_KEY = os.getenv("CORRELATION_DWH_KEY", "MEMBER_ID")
+CORRELATION_CHUNK = int(os.getenv("CORRELATION_CHUNK", "5000"))
+MERGED_OUT = os.getenv("OUTPUT_MERGED", "output/merged")
+MERGED_GZIP = os.getenv("RESULT_GZIP", "false").lower() in ("yes", "true", "1")
+if CORRELATION_ENABLED and join_indices is None:
+    print("[correlation] numpy not installed; CORRELATION_ENABLED ignored")
+    CORRELATION_ENABLED = False
+
+def _find_column(columns: Dict[str, list], name: str) -> str:
+    for col in columns:
+        if col.upper() == name.upper():
+            return col
+    raise KeyError(f"join column {name} not in {list(columns)}")
+
+def correlate(candidates: List[dict], dwh_rows, how: str = None) -> Tuple[List[str], list]:
+    """
+    Join candidates with dwh_rows on the configured keys. Returns (column_names, columns) where
+    columns are equally long NumPy object arrays: Oracle columns first, then DWH columns (the DWH key
+    is dropped, it equals the Oracle key on every matched row). dwh_rows is a {column: values} dict
+    (the executors' columns_out) or a list of dicts.
+    """
+    how = how or CORRELATION_JOIN
+    left = columns_from_rows(candidates)
+    right = dwh_rows if isinstance(dwh_rows, dict) else columns_from_rows(dwh_rows)
+    if not left:
+        return [], []
+    left_key = _find_column(left, CORRELATION_ORACLE_KEY)
+    right_key = _find_column(right, CORRELATION_DWH_KEY) if right else None
+    right_keys = key_array(right[right_key] if right_key else [])
+    left_idx, right_idx = join_indices(key_array(left[left_key]), right_keys, how)
+
+    names = list(left)
+    columns = [take(left[n], left_idx) for n in names]
+    upper = {n.upper() for n in names}
+    for n, values in right.items():
+        if n == right_key:
+            continue
+        names.append(f"{n}_DWH" if n.upper() in upper else n)
+        columns.append(take(values, right_idx))
+    return names, columns
+
+def correlate_and_save(idx: int, candidates: List[dict], dwh_rows, run_ts: str,
+                       out_dir: str = MERGED_OUT) -> Tuple[str, int]:
+    """
+    Correlate one example and write the merged rows as NDJSON (Parquet / Arrow when RESULT_FORMAT
+    selects one). Returns (filename, merged_rows).
+    """
+    started = time.perf_counter()
+    names, columns = correlate(candidates, dwh_rows)
+    dwh_count = column_length(dwh_rows) if isinstance(dwh_rows, dict) else len(dwh_rows)
+    base = os.path.join(out_dir, f"merged_example{idx}_{run_ts}")
+    if result_format() == "json":
+        filename = base + ".ndjson" + (".gz" if MERGED_GZIP else "")
+        count, nbytes = write_ndjson_stream(iter_row_chunks(columns, CORRELATION_CHUNK), names, filename, MERGED_GZIP)
+    else:
+        filename = save_columns(names, columns, base)
+        count, nbytes = (len(columns[0]) if columns else 0), os.path.getsize(filename)
+    print(f"[correlation] example {idx}: {len(candidates)} candidates x {dwh_count} DWH rows -> "
+          f"{count} merged rows ({nbytes} bytes) in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return filename, count
@@ -1,8 +1,15 @@
 # src/services/llm_client.py
 import os
 import json
+import time
+import random
+import threading
+from concurrent.futures import Future
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from typing import Dict, Optional
+from src.services.llm_cache import get_default_cache, make_cache_key
 
 load_dotenv()
 
@@ -15,28 +22,160 @@ DEFAULT_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
 if not API_URL or not API_KEY:
     raise RuntimeError("LLM_API_URL and LLM_API_KEY must be set in .env")
 
-running_cost = 0.0
 PRICE_INPUT = 0.15 / 1_000_000
 PRICE_OUTPUT = 0.60 / 1_000_000
 
-def call_llm(prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "0"))  # 0 = unlimited
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "5"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+
+RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Blocking token-bucket limiter: `rate` requests/sec sustained, bursts up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class CostAccumulator:
+    """
+    Thread-safe running total of token usage and cost. on_total, when given, is called with the new
+    total under the lock, so successive calls see it in order.
+    """
+    def __init__(self, on_total=None):
+        self._lock = threading.Lock()
+        self._on_total = on_total
+        self.total = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int) -> float:
+        call_cost = (prompt_tokens * PRICE_INPUT) + (completion_tokens * PRICE_OUTPUT)
+        with self._lock:
+            self.total += call_cost
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.calls += 1
+            if self._on_total is not None:
+                self._on_total(self.total)
+        return call_cost
+
+    def __float__(self):
+        return self.total
+
+# running total in USD as a plain float (public since before the accumulator); updated by
+# cost_accumulator under its lock, so it never goes backwards
+running_cost = 0.0
+
+def _set_running_cost(total: float):
     global running_cost
-    payload = {
-        "model": MODEL,
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-        "messages": [{"role": "user", "content": prompt}]
-    }
-    headers = {"Content-Type": "application/json"}
-    if "openai" in API_URL:
-        headers["Authorization"] = f"Bearer {API_KEY}"
-    else:
-        headers["X-api-key"] = API_KEY
+    running_cost = total
 
-    try:
-        resp = requests.post(API_URL, headers=headers, json=payload, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
+cost_accumulator = CostAccumulator(on_total=_set_running_cost)
+
+class LLMClient:
+    """
+    LLM gateway client: one pooled keep-alive requests.Session, token-bucket rate limiting and
+    exponential backoff with full jitter on 429 / 5xx / connection errors (Retry-After honoured).
+    Safe to share between threads.
+    """
+    def __init__(self, api_url: str = API_URL, api_key: str = API_KEY, model: str = MODEL,
+                 timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE, backoff_max: float = LLM_BACKOFF_MAX,
+                 rate_per_sec: float = LLM_RATE_PER_SEC, burst: int = LLM_RATE_BURST,
+                 pool_size: int = LLM_POOL_SIZE, cost: CostAccumulator = None):
+        self.api_url = api_url
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket(rate_per_sec, burst)
+        self.cost = cost if cost is not None else CostAccumulator()
+        self.retries = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if "openai" in api_url:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        else:
+            self.session.headers["X-api-key"] = api_key
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, payload: dict) -> dict:
+        """
+        POST payload with rate limiting and retries; returns the decoded JSON response.
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                resp = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp.json()
+                retry_after = resp.headers.get("Retry-After")
+                error = f"HTTP {resp.status_code}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = str(e)
+            except requests.exceptions.RequestException as e:
+                raise RuntimeError(f"LLM API request failed: {e}")
+            if attempt >= self.max_retries:
+                raise RuntimeError(f"LLM API request failed after {attempt + 1} attempts: {error}")
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            print(f"[LLM] {error}; retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def complete(self, prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_tokens: int = DEFAULT_MAX_TOKENS):
+        """
+        Return (text, cacheable) for one chat completion; cacheable is False when the response had
+        no chat/completion text and a raw fallback field was returned instead.
+        """
+        payload = {
+            "model": self.model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        data = self.post(payload)
 
         text_out = None
         if "choices" in data and data["choices"]:
@@ -49,17 +188,94 @@ def call_llm(prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_tokens:
         usage = data.get("usage", {})
         prompt_tokens = usage.get("prompt_tokens", 0)
         completion_tokens = usage.get("completion_tokens", 0)
-        call_cost = (prompt_tokens * PRICE_INPUT) + (completion_tokens * PRICE_OUTPUT)
-        running_cost += call_cost
-
+        call_cost = self.cost.add(prompt_tokens, completion_tokens)
         print(f"[LLM] prompt_tokens={prompt_tokens}, completion_tokens={completion_tokens}, cost=${call_cost:.6f}")
 
         if text_out:
-            return text_out
+            return text_out, True
         for k in ("text", "output", "response"):
             if k in data and isinstance(data[k], str):
-                return data[k].strip()
-        return json.dumps(data)[:4000]
+                return data[k].strip(), False
+        return json.dumps(data)[:4000], False
+
+    def close(self):
+        self.session.close()
+
+_DEFAULT_CLIENT = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+def get_default_client() -> LLMClient:
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = LLMClient(cost=cost_accumulator)
+        return _DEFAULT_CLIENT
+
+# in-flight requests by cache key: concurrent identical calls (e.g. --workers threads) share one request
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+_COALESCED = {"count": 0}
+
+def call_llm(prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_tokens: int = DEFAULT_MAX_TOKENS, use_cache: bool = True) -> str:
+    cache = get_default_cache() if use_cache else None
+    cache_key = make_cache_key(MODEL, temperature, max_tokens, prompt)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"[LLM] cache hit ({cache.hits} hits / {cache.misses} misses)")
+            return cached
+
+    with _INFLIGHT_LOCK:
+        pending = _INFLIGHT.get(cache_key)
+        if pending is None:
+            _INFLIGHT[cache_key] = future = Future()
+        else:
+            _COALESCED["count"] += 1
+    if pending is not None:
+        print("[LLM] identical request already in flight; waiting for it")
+        return pending.result()
+
+    try:
+        # a request that finished between the cache miss above and taking the slot is cached by now
+        text_out = cache.get(cache_key) if cache is not None else None
+        if text_out is None:
+            text_out, cacheable = get_default_client().complete(prompt, temperature, max_tokens)
+            if cacheable and cache is not None:
+                cache.put(cache_key, text_out)
+        future.set_result(text_out)
+        return text_out
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(cache_key, None)
+
+def replace_cached_response(prompt: str, response: Optional[str], temperature: float = DEFAULT_TEMPERATURE,
+                            max_tokens: int = DEFAULT_MAX_TOKENS):
+    """
+    Overwrite the cached answer for prompt (e.g. after the caller rejected it); None evicts it.
+    """
+    cache = get_default_cache()
+    if cache is None:
+        return
+    cache_key = make_cache_key(MODEL, temperature, max_tokens, prompt)
+    if response is None:
+        cache.delete(cache_key)
+    else:
+        cache.put(cache_key, response)
+
+def llm_usage_stats() -> dict:
+    client = _DEFAULT_CLIENT
+    return {
+        "coalesced": _COALESCED["count"],
+        "calls": cost_accumulator.calls,
+        "prompt_tokens": cost_accumulator.prompt_tokens,
+        "completion_tokens": cost_accumulator.completion_tokens,
+        "cost": cost_accumulator.total,
+        "retries": client.retries if client is not None else 0,
+    }
 
-    except requests.exceptions.RequestException as e:
-        raise RuntimeError(f"LLM API request failed: {e}")
+def llm_cache_stats() -> dict:
+    cache = get_default_cache()
+    return cache.stats() if cache is not None else {}
@@ -0,0 +1,167 @@
+# src/services/registered_users.py
+"""
+Preloaded registered USER_NOs (set or Bloom filter) for in-process registration checks.
+"""
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+from typing import Iterable, Optional
+from dotenv import load_dotenv
+from src.connectors.oracle_connector import OracleConnector
+from src.utils.bloom_filter import BloomFilter
+from src.utils.io_utils import iter_fetchmany
+from src.utils.bind_batching import find_param_predicate
+from src.utils.sql_utils import strip_trailing_semicolon
+
+load_dotenv()
+
+REGISTERED_CACHE_DIR = os.getenv("REGISTERED_CACHE_DIR", "cache")
+REGISTERED_CACHE_TTL_SECONDS = int(os.getenv("REGISTERED_CACHE_TTL_SECONDS", "3600"))
+REGISTERED_BLOOM_FP_RATE = float(os.getenv("REGISTERED_BLOOM_FP_RATE", "0.01"))
+REGISTERED_ARRAYSIZE = int(os.getenv("REGISTERED_ARRAYSIZE", "10000"))
+
+def registered_key(value) -> str:
+    return str(value).strip()
+
+def all_registered_sql(single_sql: str, param: str = "user_no") -> Optional[str]:
+    """
+    The single-user registration SQL without its user predicate, or None when it has none.
+    """
+    m = find_param_predicate(single_sql, param)
+    if m is None:
+        return None
+    return strip_trailing_semicolon(single_sql[:m.start()] + "1 = 1" + single_sql[m.end():])
+
+class RegisteredUsers:
+    """
+    Registered USER_NO snapshot: mode "set" (exact) or "bloom" (probabilistic, confirm positives).
+    """
+    def __init__(self, mode: str, members, created_at: float, sql_hash: str):
+        self.mode = mode
+        self.members = members
+        self.created_at = created_at
+        self.sql_hash = sql_hash
+
+    @property
+    def exact(self) -> bool:
+        return self.mode == "set"
+
+    def candidates(self, user_nos: Iterable) -> list:
+        """
+        user_nos that may be registered (exactly the registered ones in "set" mode).
+        """
+        members = self.members
+        return [u for u in user_nos if registered_key(u) in members]
+
+    def size_bytes(self) -> int:
+        if self.mode == "bloom":
+            return self.members.size_bytes()
+        return sum(len(k) for k in self.members)
+
+def _cache_path(mode: str) -> str:
+    return os.path.join(REGISTERED_CACHE_DIR, f"registered_users.{mode}.gz")
+
+def save_registered(reg: RegisteredUsers, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    header = {"mode": reg.mode, "created_at": reg.created_at, "sql_hash": reg.sql_hash}
+    if reg.mode == "bloom":
+        bf = reg.members
+        header.update(capacity=bf.capacity, fp_rate=bf.fp_rate, num_bits=bf.num_bits,
+                      num_hashes=bf.num_hashes, count=bf.count)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb") as fh:
+        fh.write((json.dumps(header) + "\n").encode("utf-8"))
+        if reg.mode == "bloom":
+            fh.write(bytes(reg.members.bits))
+        else:
+            for key in reg.members:
+                fh.write((key + "\n").encode("utf-8"))
+    os.replace(tmp, path)
+
+def load_registered(path: str, sql_hash: str, ttl_seconds: int) -> Optional[RegisteredUsers]:
+    """
+    Return the persisted snapshot, or None when missing, expired or built from other SQL.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rb") as fh:
+            header = json.loads(fh.readline().decode("utf-8"))
+            if header.get("sql_hash") != sql_hash or time.time() - header.get("created_at", 0) > ttl_seconds:
+                return None
+            if header["mode"] == "bloom":
+                bf = BloomFilter(header["capacity"], header["fp_rate"], num_bits=header["num_bits"],
+                                 num_hashes=header["num_hashes"], bits=bytearray(fh.read()))
+                bf.count = header.get("count", 0)
+                members = bf
+            else:
+                members = {line.decode("utf-8").rstrip("\n") for line in fh}
+    except Exception as e:
+        print(f"[registered_users] ignoring unreadable snapshot {path}: {e}")
+        return None
+    return RegisteredUsers(header["mode"], members, header["created_at"], sql_hash)
+
+def build_registered(oc: OracleConnector, sql: str, mode: str, fp_rate: float = None) -> RegisteredUsers:
+    """
+    Stream every registered USER_NO from Oracle into a set or a Bloom filter.
+    """
+    sql_hash = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+    conn = oc.get_connection()
+    cur = conn.cursor()
+    try:
+        if mode == "bloom":
+            # size the filter up front so it can be filled while streaming
+            cur.execute(f"SELECT COUNT(*) FROM (\n{sql}\n)")
+            capacity = cur.fetchone()[0] or 1
+            members = BloomFilter(capacity, fp_rate if fp_rate is not None else REGISTERED_BLOOM_FP_RATE)
+            add = members.add
+        else:
+            members = set()
+            add = members.add
+        cur.prefetchrows = REGISTERED_ARRAYSIZE
+        cur.execute(sql)
+        for rows in iter_fetchmany(cur, REGISTERED_ARRAYSIZE):
+            for r in rows:
+                if r[0] is not None:
+                    add(registered_key(r[0]))
+    finally:
+        cur.close()
+        oc.release_connection(conn)
+    return RegisteredUsers(mode, members, time.time(), sql_hash)
+
+_LOADED = {}
+_LOADED_LOCK = threading.Lock()
+
+def get_registered_users(oc: OracleConnector, single_sql: str, mode: str) -> Optional[RegisteredUsers]:
+    """
+    Process-wide snapshot for mode "set" / "bloom": memory, else disk (within TTL), else Oracle.
+    None when the template has no `col = {user_no}` predicate or loading fails.
+    """
+    sql = all_registered_sql(single_sql)
+    if sql is None:
+        return None
+    sql_hash = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+    with _LOADED_LOCK:
+        reg = _LOADED.get(mode)
+        if reg is not None and reg.sql_hash == sql_hash and time.time() - reg.created_at <= REGISTERED_CACHE_TTL_SECONDS:
+            return reg
+        path = _cache_path(mode)
+        started = time.perf_counter()
+        reg = load_registered(path, sql_hash, REGISTERED_CACHE_TTL_SECONDS)
+        source = "disk"
+        if reg is None:
+            try:
+                reg = build_registered(oc, sql, mode)
+                save_registered(reg, path)
+                source = "oracle"
+            except Exception as e:
+                print(f"[registered_users] preload failed: {e}")
+                return None
+        count = len(reg.members)
+        print(f"[registered_users] {mode} with {count} USER_NOs from {source} "
+              f"({reg.size_bytes() / 1024:.1f} KiB, {time.perf_counter() - started:.2f}s)")
+        _LOADED[mode] = reg
+        return reg
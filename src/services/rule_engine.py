@@ -0,0 +1,254 @@
+# src/services/rule_engine.py
+"""
+Columnar evaluation of rules.json criteria over DWH results.
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+try:
+    import numpy as np
+    from src.utils.columnar import (column_length, columns_from_rows, comparable_keys, key_array, key_text,
+                                    null_keys, object_array, ordered_unique)
+except ImportError:  # rule evaluation is skipped without numpy
+    np = None
+
+RULE_MEMBER_ID_COLUMN = os.getenv("RULE_MEMBER_ID_COLUMN", "MEMBER_ID")
+RULE_COVER_COLUMN = os.getenv("RULE_COVER_COLUMN", "{cover}_COVER")
+RULE_COVER_NAME_COLUMN = os.getenv("RULE_COVER_NAME_COLUMN", "COVER_TYPE")
+RULE_COVERAGE_TYPE_COLUMN = os.getenv("RULE_COVERAGE_TYPE_COLUMN", "COVERAGE_TYPE")
+RULE_DB_CODE_COLUMN = os.getenv("RULE_DB_CODE_COLUMN", "DB_CODE")
+RULE_FUND_CODE_COLUMN = os.getenv("RULE_FUND_CODE_COLUMN", "FUND_CODE")
+
+FALSY_VALUES = ("", "0", "N", "NO", "F", "FALSE", "NONE", "NULL", "NAN")
+
+def member_keys(values: Sequence) -> List[str]:
+    """
+    values in the form select_members() returns them when they are passed as candidate_ids (the
+    list is normalized as a whole with key_array: '000123' and 123.0 both become '123').
+    """
+    return key_text(key_array(list(values))).tolist()
+
+def rules_available() -> bool:
+    return np is not None
+
+def _text_form(value) -> str:
+    return "NONE" if value is None else str(value).strip().upper()
+
+def _is_truthy_text(value) -> bool:
+    text = _text_form(value)
+    if text in FALSY_VALUES:
+        return False
+    try:
+        return float(text) != 0
+    except ValueError:
+        return True
+
+def _isin(arr: "np.ndarray", hits: list) -> "np.ndarray":
+    """
+    np.isin for a column and a few of its own distinct values; object columns (mixed types, NULLs)
+    are compared value by value so 100 and "100" stay distinct.
+    """
+    if not hits:
+        return np.zeros(arr.shape[0], dtype=bool)
+    if arr.dtype.kind != "O":
+        return np.isin(arr, hits)
+    mask = np.zeros(arr.shape[0], dtype=bool)
+    for h in hits:
+        mask |= arr == h
+    return mask
+
+class ColumnTable:
+    """
+    Rows as named NumPy columns. Numeric columns are tested numerically; text columns are compared
+    by normalizing only their distinct values and matching the raw column against those with isin.
+    """
+    def __init__(self, columns: Dict[str, Sequence], num_rows: int):
+        self.columns = {name.upper(): values for name, values in columns.items()}
+        self.num_rows = num_rows
+        self._arrays: Dict[str, "np.ndarray"] = {}
+        self._numeric: Dict[str, Optional["np.ndarray"]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: List[dict]) -> "ColumnTable":
+        # one pass per column; everything after this is column-at-a-time
+        return cls(columns_from_rows(rows), len(rows))
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence]) -> "ColumnTable":
+        # e.g. the executors' columns_out (transposed cursor tuples), no per-row pivot needed
+        return cls(columns, column_length(columns))
+
+    def has(self, name: str) -> bool:
+        return name.upper() in self.columns
+
+    def array(self, name: str) -> "np.ndarray":
+        key = name.upper()
+        if key not in self._arrays:
+            self._arrays[key] = object_array(self.columns[key])
+        return self._arrays[key]
+
+    def numeric(self, name: str) -> Optional["np.ndarray"]:
+        """
+        The column as float64 (NULL -> NaN), or None when it holds non-numeric values.
+        """
+        key = name.upper()
+        if key not in self._numeric:
+            arr = self.array(key)
+            out = None
+            if arr.dtype.kind in "iufb":
+                out = arr.astype(np.float64)
+            elif arr.dtype.kind == "O":
+                try:
+                    out = np.array(arr, dtype=np.float64)
+                except (TypeError, ValueError):
+                    out = None
+            self._numeric[key] = out
+        return self._numeric[key]
+
+    def distinct(self, name: str) -> set:
+        values = self.columns[name.upper()]
+        return set(values.tolist() if isinstance(values, np.ndarray) else values)
+
+    def text_in(self, name: str, allowed: Sequence[str]) -> "np.ndarray":
+        """
+        Rows whose value, stripped and upper-cased, is one of allowed (already upper-case).
+        """
+        arr = self.array(name)
+        allowed = set(allowed)
+        return _isin(arr, [v for v in self.distinct(name) if _text_form(v) in allowed])
+
+    def truthy(self, name: str) -> "np.ndarray":
+        nums = self.numeric(name)
+        if nums is not None:
+            return (nums != 0) & ~np.isnan(nums)
+        arr = self.array(name)
+        return _isin(arr, [v for v in self.distinct(name) if _is_truthy_text(v)])
+
+    def cover_columns(self) -> Dict[str, str]:
+        """
+        {COVER: column} for every column matching RULE_COVER_COLUMN.
+        """
+        pattern = re.escape(RULE_COVER_COLUMN.upper()).replace(re.escape("{COVER}"), "(.+)")
+        out = {}
+        for name in self.columns:
+            m = re.fullmatch(pattern, name)
+            if m:
+                out[m.group(1)] = name
+        return out
+
+class CompiledCriterion:
+    def __init__(self, name: str, criterion: dict, db_fund_pairs: list):
+        self.name = name
+        self.required_covers = [str(c).strip().upper() for c in criterion.get("required_covers", [])]
+        coverage_type = criterion.get("coverage_type")
+        self.coverage_type = str(coverage_type).strip().upper() if coverage_type else None
+        self.exclusive = bool(criterion.get("exclusive_covers", name.lower().endswith("_only")))
+        self.funds_by_db: Dict[str, List[str]] = {}
+        for pair in db_fund_pairs or []:
+            db = str(pair.get("db_code", "")).strip().upper()
+            self.funds_by_db.setdefault(db, []).extend(str(f).strip().upper() for f in pair.get("fund_codes", []))
+
+    def _row_mask(self, table: ColumnTable, warnings: list) -> "np.ndarray":
+        mask = np.ones(table.num_rows, dtype=bool)
+        if self.coverage_type:
+            if table.has(RULE_COVERAGE_TYPE_COLUMN):
+                mask &= table.text_in(RULE_COVERAGE_TYPE_COLUMN, [self.coverage_type])
+            else:
+                warnings.append(f"no {RULE_COVERAGE_TYPE_COLUMN} column; coverage_type not checked")
+        if self.funds_by_db:
+            if table.has(RULE_DB_CODE_COLUMN) and table.has(RULE_FUND_CODE_COLUMN):
+                pairs = np.zeros(table.num_rows, dtype=bool)
+                for db, funds in self.funds_by_db.items():
+                    pairs |= table.text_in(RULE_DB_CODE_COLUMN, [db]) & table.text_in(RULE_FUND_CODE_COLUMN, funds)
+                mask &= pairs
+            elif table.has(RULE_FUND_CODE_COLUMN):
+                all_funds = [f for funds in self.funds_by_db.values() for f in funds]
+                mask &= table.text_in(RULE_FUND_CODE_COLUMN, all_funds)
+            else:
+                warnings.append(f"no {RULE_FUND_CODE_COLUMN} column; db_fund_pairs not checked")
+        return mask
+
+    def matching_members(self, table: ColumnTable, warnings: list) -> Optional["np.ndarray"]:
+        """
+        Member keys (in first-appearance order) meeting the criterion, or None when the table has
+        neither the wide cover columns nor the long-layout cover name column.
+        """
+        ids = key_array(table.array(RULE_MEMBER_ID_COLUMN))
+        mask = self._row_mask(table, warnings) & ~null_keys(ids)
+        covers = table.cover_columns()
+        if any(c in covers for c in self.required_covers):
+            for cover in self.required_covers:
+                if cover not in covers:
+                    warnings.append(f"no column for required cover {cover}")
+                    return ids[:0]
+                mask &= table.truthy(covers[cover])
+            if self.exclusive:
+                for cover, col in covers.items():
+                    if cover not in self.required_covers:
+                        mask &= ~table.truthy(col)
+            return ordered_unique(ids[mask])
+        if table.has(RULE_COVER_NAME_COLUMN):
+            matched = ordered_unique(ids[mask])
+            for cover in self.required_covers:
+                matched = matched[np.isin(matched, ids[mask & table.text_in(RULE_COVER_NAME_COLUMN, [cover])])]
+            if self.exclusive:
+                others = ids[mask & ~table.text_in(RULE_COVER_NAME_COLUMN, self.required_covers)]
+                matched = matched[~np.isin(matched, others)]
+            return matched
+        return None
+
+_COMPILED: Dict[Tuple[str, str], CompiledCriterion] = {}
+_COMPILED_LOCK = threading.Lock()
+
+def compile_criterion(rules: dict, member_type: str, criterion_name: str) -> Optional[CompiledCriterion]:
+    """
+    Compiled criterion for member_type / criterion_name (cached), or None when rules.json has none.
+    """
+    key = (member_type, criterion_name)
+    with _COMPILED_LOCK:
+        if key in _COMPILED:
+            return _COMPILED[key]
+    type_rules = (rules or {}).get(member_type) or {}
+    criterion = (type_rules.get("criteria") or {}).get(criterion_name)
+    compiled = CompiledCriterion(criterion_name, criterion, type_rules.get("db_fund_pairs")) if criterion else None
+    with _COMPILED_LOCK:
+        _COMPILED[key] = compiled
+    return compiled
+
+def select_members(rows, rules: dict, member_type: str, criterion_name: str, limit: int,
+                   candidate_ids: Sequence = None) -> Optional[List[str]]:
+    """
+    Keys (str) of up to limit members whose DWH rows meet the criterion, in candidate_ids order when
+    given (else result order). None when the criterion is unknown or cannot be evaluated on rows.
+    rows is a ColumnTable, a {column: values} dict (the executors' columns_out) or a list of dicts.
+    """
+    if np is None:
+        print("[rule_engine] numpy not installed; criteria not applied")
+        return None
+    compiled = compile_criterion(rules, member_type, criterion_name)
+    if compiled is None:
+        return None
+    if isinstance(rows, ColumnTable):
+        table = rows
+    elif isinstance(rows, dict):
+        table = ColumnTable.from_columns(rows)
+    else:
+        table = ColumnTable.from_rows(rows)
+    if table.num_rows and not table.has(RULE_MEMBER_ID_COLUMN):
+        print(f"[rule_engine] no {RULE_MEMBER_ID_COLUMN} column in DWH result; criteria not applied")
+        return None
+    warnings: list = []
+    if not table.num_rows:
+        return []
+    matched = compiled.matching_members(table, warnings)
+    for w in dict.fromkeys(warnings):
+        print(f"[rule_engine] {member_type}/{criterion_name}: {w}")
+    if matched is None:
+        print(f"[rule_engine] {member_type}/{criterion_name}: no cover columns in DWH result; criteria not applied")
+        return None
+    if candidate_ids is not None:
+        order = ordered_unique(key_array(list(candidate_ids)))
+        order, matched = comparable_keys(order, matched)
+        matched = order[np.isin(order, matched)]
+    return key_text(matched[:limit]).tolist()
@@ -0,0 +1,106 @@
+# src/utils/bind_batching.py
+"""
+Bucketed bind-variable IN-list batching.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+MAX_IN_ELEMENTS = {
+    "oracle": 1000,
+    "sqlserver": 2000,  # stays under the 2100-parameter limit with room for other binds
+}
+
+BatchStatement = Tuple[str, object]
+
+def _dialect_key(dialect: str) -> str:
+    d = dialect.lower().replace(" ", "").replace("-", "")
+    if d in ("tsql", "mssql", "sqlserver"):
+        return "sqlserver"
+    if d == "oracle":
+        return "oracle"
+    raise ValueError(f"unsupported dialect for IN-list batching: {dialect}")
+
+def bucket_size(n: int, cap: int) -> int:
+    size = 1
+    while size < n:
+        size *= 2
+    return min(size, cap)
+
+def _predicate_pattern(param_placeholder: str):
+    p = re.escape(param_placeholder)
+    single = r"=\s*(?:'\{" + p + r"\}'|\"\{" + p + r"\}\"|\{" + p + r"\}|:" + p + r"\b)"
+    # list marker produced by batch template compilation: col IN ({param_list}) / col IN (:param_list)
+    listed = r"IN\s*\(\s*(?:\{" + p + r"_list\}|:" + p + r"_list\b)\s*\)"
+    return re.compile(r"([A-Za-z0-9_\.\"]+)\s*(?:" + single + "|" + listed + ")", re.IGNORECASE)
+
+def find_param_predicate(single_sql: str, param_placeholder: str):
+    """
+    Match object for the `col = {param}` / `col IN ({param_list})` predicate (group 1 = column), or None.
+    """
+    return _predicate_pattern(param_placeholder).search(single_sql)
+
+def can_bind_in_list(single_sql: str, param_placeholder: str) -> bool:
+    return _predicate_pattern(param_placeholder).search(single_sql) is not None
+
+def make_bind_in_sql(single_sql: str, param_placeholder: str, slots: int, dialect: str) -> Optional[str]:
+    """
+    Rewrite the `col = {param}` (or `col IN ({param_list})`) predicate into a `col IN (...)` with `slots` bind markers.
+    Returns None when the template has no such predicate.
+    """
+    key = _dialect_key(dialect)
+    pattern = _predicate_pattern(param_placeholder)
+    if not pattern.search(single_sql):
+        return None
+    if key == "oracle":
+        markers = ", ".join(f":{param_placeholder}_{i}" for i in range(slots))
+    else:
+        markers = ", ".join("?" for _ in range(slots))
+    return pattern.sub(lambda m: f"{m.group(1)} IN ({markers})", single_sql, count=1)
+
+def make_list_marker_sql(single_sql: str, param_placeholder: str) -> Optional[str]:
+    """
+    Rewrite the `col = {param}` predicate into the `col IN ({param_list})` marker form kept in
+    compiled plans; make_bind_in_sql() expands the marker later. None when not rewritable.
+    """
+    pattern = _predicate_pattern(param_placeholder)
+    if not pattern.search(single_sql):
+        return None
+    return pattern.sub(lambda m: f"{m.group(1)} IN ({{{param_placeholder}_list}})", single_sql, count=1)
+
+def chunk_values(values: Sequence, max_chunk: int) -> List[list]:
+    return [list(values[i:i + max_chunk]) for i in range(0, len(values), max_chunk)]
+
+def plan_in_batches(single_sql: str, param_placeholder: str, values: Sequence, dialect: str,
+                    max_chunk: int = None) -> Optional[List[BatchStatement]]:
+    """
+    Build the (sql, binds) statements that cover all values. Oracle binds are dicts
+    (name -> value), SQL Server binds are positional lists. None when not rewritable.
+    """
+    key = _dialect_key(dialect)
+    cap = min(max_chunk or MAX_IN_ELEMENTS[key], MAX_IN_ELEMENTS[key])
+    values = list(dict.fromkeys(values))
+    if not values:
+        return []
+    statements = []
+    for chunk in chunk_values(values, cap):
+        slots = bucket_size(len(chunk), cap)
+        sql = make_bind_in_sql(single_sql, param_placeholder, slots, dialect)
+        if sql is None:
+            return None
+        padded = chunk + [chunk[-1]] * (slots - len(chunk))
+        if key == "oracle":
+            binds = {f"{param_placeholder}_{i}": v for i, v in enumerate(padded)}
+        else:
+            binds = padded
+        statements.append((sql, binds))
+    return statements
+
+def run_batches(statements: List[BatchStatement], execute: Callable[[str, object], list], parallel: int = 1) -> List[list]:
+    """
+    Execute every (sql, binds) statement with execute() and return the per-chunk results in order.
+    """
+    if parallel <= 1 or len(statements) <= 1:
+        return [execute(sql, binds) for sql, binds in statements]
+    with ThreadPoolExecutor(max_workers=min(parallel, len(statements)), thread_name_prefix="in-chunk") as pool:
+        return list(pool.map(lambda st: execute(st[0], st[1]), statements))
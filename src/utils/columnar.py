@@ -0,0 +1,112 @@
+# src/utils/columnar.py
+"""
+NumPy helpers shared by the rule engine and the Oracle/DWH correlation.
+"""
+from typing import Sequence, Tuple
+import numpy as np
+from src.utils.row_converter import columns_from_rows, column_length  # noqa: F401 (re-exported)
+
+NULL_INT_KEY = np.iinfo(np.int64).min
+
+def object_array(values) -> np.ndarray:
+    # object arrays only copy pointers; typed conversion happens where a stage needs it
+    return values if isinstance(values, np.ndarray) else np.array(values, dtype=object)
+
+def key_array(values) -> np.ndarray:
+    """
+    Join keys as int64 when every value is an exact integer (12, 12.0, Decimal('12'), ' 012 '),
+    else as normalized text.
+    """
+    arr = object_array(values)
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int64)
+    nulls = arr == None  # noqa: E711 (element-wise)
+    if arr.size and not nulls.all():
+        present = arr[~nulls]
+        try:
+            ints = present.astype(np.int64)
+            if np.array_equal(ints.astype(np.float64), present.astype(np.float64)):
+                out = np.full(arr.size, NULL_INT_KEY, dtype=np.int64)
+                out[~nulls] = ints
+                return out
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return np.char.upper(np.char.strip(np.where(arr == None, "", arr).astype(str)))  # noqa: E711 (element-wise)
+
+def comparable_keys(left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    int keys on one side and text on the other are compared as text.
+    """
+    if (left.dtype.kind == "i") != (right.dtype.kind == "i"):
+        return key_text(left), key_text(right)
+    return left, right
+
+def key_text(keys: np.ndarray) -> np.ndarray:
+    """
+    int keys as text ("" for NULL); text keys unchanged.
+    """
+    if keys.dtype.kind != "i":
+        return keys
+    return np.where(keys == NULL_INT_KEY, "", keys.astype(str))
+
+def null_keys(keys: np.ndarray) -> np.ndarray:
+    return keys == ("" if keys.dtype.kind == "U" else NULL_INT_KEY)
+
+def ordered_unique(keys: np.ndarray) -> np.ndarray:
+    """
+    Distinct keys in first-appearance order.
+    """
+    if keys.size == 0:
+        return keys
+    uniq, first = np.unique(keys, return_index=True)
+    return uniq[np.argsort(first, kind="stable")]
+
+def join_indices(left: np.ndarray, right: np.ndarray, how: str = "inner") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row index pairs (left_idx, right_idx) for left.key == right.key, in left order and then right
+    order. The right side is sorted once and every left key is located with searchsorted, so the
+    join is O((n + m) log m) without a Python loop. how="left" keeps unmatched left rows with
+    right_idx -1. NULL keys never match.
+    """
+    left, right = comparable_keys(left, right)
+    valid = np.nonzero(~null_keys(right))[0]
+    order = valid[np.argsort(right[valid], kind="stable")]
+    sorted_right = right[order]
+    lo = np.searchsorted(sorted_right, left, side="left")
+    hi = np.searchsorted(sorted_right, left, side="right")
+    hi = np.where(null_keys(left), lo, hi)
+    counts = hi - lo
+    total = int(counts.sum())
+    left_idx = np.repeat(np.arange(left.size), counts)
+    starts = np.repeat(lo, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    right_idx = order[starts + offsets] if total else np.zeros(0, dtype=np.int64)
+    if how == "left":
+        missing = np.nonzero(counts == 0)[0]
+        if missing.size:
+            left_idx = np.concatenate([left_idx, missing])
+            right_idx = np.concatenate([right_idx, np.full(missing.size, -1, dtype=np.int64)])
+            keep = np.argsort(left_idx, kind="stable")
+            left_idx, right_idx = left_idx[keep], right_idx[keep]
+    return left_idx, right_idx
+
+def take(values, idx: np.ndarray) -> np.ndarray:
+    """
+    values[idx] with -1 (no match) mapped to None.
+    """
+    arr = object_array(values)
+    if not arr.size:
+        return np.full(idx.size, None, dtype=object)
+    out = arr[np.where(idx < 0, 0, idx)]
+    if (idx < 0).any():
+        out = out.astype(object)
+        out[idx < 0] = None
+    return out
+
+def iter_row_chunks(columns: Sequence[np.ndarray], chunk_size: int):
+    """
+    Yield row tuples chunk by chunk from equally long columns.
+    """
+    n = len(columns[0]) if columns else 0
+    for start in range(0, n, chunk_size):
+        yield list(zip(*(c[start:start + chunk_size].tolist() for c in columns)))
@@ -0,0 +1,212 @@
+# src/utils/history_store.py
+"""
+Append-only JSONL run history with a sidecar index.
+"""
+import os
+import re
+import json
+import datetime
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+_ALL_KEY = "*"
+
+def _paths(history_path: str) -> dict:
+    base, ext = os.path.splitext(history_path)
+    return {
+        "base": base,
+        "ext": ext or ".jsonl",
+        "log": history_path,
+        # the pre-JSONL default (history/query_history.json) next to a .jsonl log
+        "legacy": f"{base}.json" if ext != ".json" else None,
+        "index": f"{base}.idx.jsonl",
+        "latest": f"{base}.latest.json",
+        "lock": f"{base}.lock",
+    }
+
+@contextmanager
+def _locked(lock_path: str):
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _rotated_segments(p: dict, infix: str = "") -> List[int]:
+    folder = os.path.dirname(p["log"]) or "."
+    prefix = os.path.basename(p["base"]) + "." + infix
+    ext = ".jsonl" if infix else p["ext"]
+    pattern = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(ext) + "$")
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(m.group(1)) for m in (pattern.match(f) for f in os.listdir(folder)) if m)
+
+def _current_segment(p: dict) -> int:
+    rotated = _rotated_segments(p)
+    return (rotated[-1] + 1) if rotated else 0
+
+def _segment_path(p: dict, segment: int) -> str:
+    rotated = f"{p['base']}.{segment}{p['ext']}"
+    return rotated if os.path.exists(rotated) else p["log"]
+
+def _is_success(entry: dict) -> bool:
+    if "success" in entry:
+        return bool(entry["success"])
+    return bool(entry.get("dwh_output_file"))
+
+def _member_type(entry: dict) -> Optional[str]:
+    ex = entry.get("example") or {}
+    return entry.get("member_type") or ex.get("member_type") or ex.get("member type")
+
+def _write_entry(p: dict, entry: dict, segment: int, latest: dict):
+    line = (json.dumps(entry, default=str) + "\n").encode("utf-8")
+    with open(p["log"], "ab") as fh:
+        offset = fh.tell()
+        fh.write(line)
+    pointer = {
+        "timestamp": entry.get("timestamp"),
+        "member_type": _member_type(entry),
+        "example_index": entry.get("example_index"),
+        "success": _is_success(entry),
+        "segment": segment,
+        "offset": offset,
+        "length": len(line),
+    }
+    with open(p["index"], "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(pointer) + "\n")
+    if pointer["success"]:
+        latest[_ALL_KEY] = pointer
+        if pointer["member_type"]:
+            latest[pointer["member_type"]] = pointer
+
+def _load_latest(p: dict) -> dict:
+    if not os.path.exists(p["latest"]):
+        return {}
+    try:
+        with open(p["latest"], "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except Exception:
+        return {}
+
+def _save_latest(p: dict, latest: dict):
+    tmp = p["latest"] + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(latest, fh)
+    os.replace(tmp, p["latest"])
+
+def _migrate_legacy(p: dict, latest: dict, legacy_path: str = None):
+    """
+    Convert a legacy JSON-array history file (at the log path, or legacy_path) into JSONL + index.
+    """
+    legacy_path = legacy_path or p["log"]
+    with open(legacy_path, "r", encoding="utf-8") as fh:
+        head = fh.read(64).lstrip()[:1]
+        if head != "[":
+            return
+        fh.seek(0)
+        try:
+            entries = json.load(fh)
+        except Exception:
+            entries = []
+    os.replace(legacy_path, legacy_path + ".legacy")
+    entries = entries if isinstance(entries, list) else []
+    for entry in entries:
+        _write_entry(p, entry, 0, latest)
+    if legacy_path != p["log"]:
+        print(f"[history] imported {len(entries)} entries from {legacy_path} into {p['log']} "
+              f"(original kept as {legacy_path}.legacy)")
+
+def _import_legacy_default(p: dict):
+    """
+    Import history/query_history.json (the old default path) the first time the .jsonl log is used.
+    """
+    if not p["legacy"] or not os.path.exists(p["legacy"]):
+        return
+    with _locked(p["lock"]):
+        if os.path.exists(p["legacy"]) and not (os.path.exists(p["log"]) and os.path.getsize(p["log"]) > 0):
+            latest = _load_latest(p)
+            _migrate_legacy(p, latest, p["legacy"])
+            _save_latest(p, latest)
+
+def append_history_entry(history_path: str, entry: dict, max_bytes: int = None):
+    p = _paths(history_path)
+    max_bytes = max_bytes or int(os.getenv("HISTORY_MAX_BYTES", DEFAULT_MAX_BYTES))
+    entry = dict(entry)
+    entry.setdefault("timestamp", datetime.datetime.now().isoformat(timespec="seconds"))
+    _import_legacy_default(p)
+    with _locked(p["lock"]):
+        latest = _load_latest(p)
+        if os.path.exists(p["log"]) and os.path.getsize(p["log"]) > 0:
+            _migrate_legacy(p, latest)
+        segment = _current_segment(p)
+        if os.path.exists(p["log"]) and os.path.getsize(p["log"]) >= max_bytes:
+            os.replace(p["log"], f"{p['base']}.{segment}{p['ext']}")
+            # the index rotates with the log; iter_index reads the rotated parts first
+            if os.path.exists(p["index"]):
+                os.replace(p["index"], f"{p['base']}.idx.{segment}.jsonl")
+            segment += 1
+        _write_entry(p, entry, segment, latest)
+        _save_latest(p, latest)
+
+def read_history_entry(history_path: str, pointer: dict) -> dict:
+    p = _paths(history_path)
+    with open(_segment_path(p, pointer["segment"]), "rb") as fh:
+        fh.seek(pointer["offset"])
+        return json.loads(fh.read(pointer["length"]).decode("utf-8"))
+
+def iter_index(history_path: str) -> Iterator[dict]:
+    p = _paths(history_path)
+    _import_legacy_default(p)
+    parts = [f"{p['base']}.idx.{n}.jsonl" for n in _rotated_segments(p, "idx.")] + [p["index"]]
+    for part in parts:
+        if not os.path.exists(part):
+            continue
+        with open(part, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def find_history(history_path: str, member_type: str = None, example_index: int = None,
+                 since: str = None, until: str = None, success: bool = None) -> List[dict]:
+    """
+    Return full entries matching the filters; timestamps compare as ISO strings.
+    """
+    out = []
+    for ptr in iter_index(history_path):
+        if member_type is not None and ptr.get("member_type") != member_type:
+            continue
+        if example_index is not None and ptr.get("example_index") != example_index:
+            continue
+        ts = ptr.get("timestamp") or ""
+        if since is not None and ts < since:
+            continue
+        if until is not None and ts > until:
+            continue
+        if success is not None and ptr.get("success") != success:
+            continue
+        out.append(read_history_entry(history_path, ptr))
+    return out
+
+def last_successful_run(history_path: str, member_type: str = None) -> Optional[dict]:
+    p = _paths(history_path)
+    _import_legacy_default(p)
+    ptr = _load_latest(p).get(member_type or _ALL_KEY)
+    return read_history_entry(history_path, ptr) if ptr else None
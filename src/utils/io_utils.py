@@ -1,7 +1,9 @@
 # src/utils/io_utils.py
+import gzip
 import json
 import os
-from typing import Any
+from typing import Any, Iterable, Iterator, Tuple
+from src.utils.history_store import append_history_entry
 
 def load_json_file(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as fh:
@@ -13,12 +15,41 @@ def save_json_file(obj: Any, path: str):
         json.dump(obj, fh, indent=2, default=str)
 
 def append_history(history_path: str, entry: dict):
-    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
-    hist = []
-    if os.path.exists(history_path):
-        try:
-            hist = load_json_file(history_path)
-        except Exception:
-            hist = []
-    hist.append(entry)
-    save_json_file(hist, history_path)
+    """
+    Append one run entry to the JSONL history log (locked, rotated, indexed).
+    See src/utils/history_store.py for lookups such as last_successful_run().
+    """
+    append_history_entry(history_path, entry)
+
+def _json_default(val: Any):
+    if hasattr(val, "isoformat"):
+        return val.isoformat()
+    return str(val)
+
+def iter_fetchmany(cur, arraysize: int) -> Iterator[list]:
+    """
+    Yield row batches from a DB-API cursor with fetchmany(arraysize) until exhausted.
+    """
+    cur.arraysize = arraysize
+    while True:
+        rows = cur.fetchmany(arraysize)
+        if not rows:
+            break
+        yield rows
+
+def write_ndjson_stream(row_batches: Iterable[list], cols: list, path: str, gzip_output: bool = False) -> Tuple[int, int]:
+    """
+    Write row tuples as newline-delimited JSON objects (one per row), batch by batch, so memory
+    stays constant regardless of result size. Dates/datetimes are written in ISO format.
+    Returns (row_count, bytes_on_disk).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    opener = gzip.open if gzip_output else open
+    count = 0
+    with opener(path, "wt", encoding="utf-8") as fh:
+        for batch in row_batches:
+            lines = [json.dumps(dict(zip(cols, r)), default=_json_default) for r in batch]
+            fh.write("\n".join(lines))
+            fh.write("\n")
+            count += len(batch)
+    return count, os.path.getsize(path)
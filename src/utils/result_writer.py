@@ -0,0 +1,185 @@
+# src/utils/result_writer.py
+"""
+Pluggable JSON / Parquet / Arrow result file format.
+"""
+import os
+import json
+import datetime
+import decimal
+from typing import List, Optional, Sequence
+from src.utils.io_utils import save_json_file
+from src.utils.row_converter import compile_row_converter
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for RESULT_FORMAT=parquet / arrow
+    pa = None
+
+RESULT_FORMATS = ("json", "parquet", "arrow")
+RESULT_PARQUET_COMPRESSION = os.getenv("RESULT_PARQUET_COMPRESSION", "snappy")
+RESULT_ARROW_COMPRESSION = os.getenv("RESULT_ARROW_COMPRESSION", "") or None
+
+_EXTENSIONS = {"json": ".json", "parquet": ".parquet", "arrow": ".arrow"}
+_format = os.getenv("RESULT_FORMAT", "json").lower()
+if _format not in RESULT_FORMATS or (_format != "json" and pa is None):
+    print(f"[result_writer] RESULT_FORMAT={_format} is unknown or needs pyarrow; writing json")
+    _format = "json"
+
+def set_result_format(fmt: str):
+    """
+    Override RESULT_FORMAT for this process (used by --output-format).
+    """
+    global _format
+    fmt = fmt.lower()
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"unsupported result format: {fmt} (expected one of {', '.join(RESULT_FORMATS)})")
+    if fmt != "json" and pa is None:
+        raise RuntimeError(f"RESULT_FORMAT={fmt} needs pyarrow (pip install pyarrow)")
+    _format = fmt
+
+def result_format() -> str:
+    return _format
+
+def result_path(base: str, fmt: str = None) -> str:
+    """
+    base (path without extension) plus the extension of fmt (default: the current format).
+    """
+    return base + _EXTENSIONS[fmt or _format]
+
+def arrow_type(desc) -> Optional["pa.DataType"]:
+    """
+    Arrow type for one cursor.description entry (oracledb or pyodbc), None when unknown.
+    """
+    type_code = desc[1]
+    precision = desc[4] if len(desc) > 4 else None
+    scale = desc[5] if len(desc) > 5 else None
+    name = getattr(type_code, "name", None)
+    if name is not None:
+        # oracledb DbType
+        if name in ("DB_TYPE_NUMBER", "DB_TYPE_BINARY_INTEGER"):
+            if not precision or scale == -127:
+                # unconstrained NUMBER / FLOAT: oracledb returns ints or floats per value, so infer
+                return None
+            if scale == 0 and precision <= 18:
+                return pa.int64()
+            return pa.float64()
+        if name in ("DB_TYPE_BINARY_DOUBLE", "DB_TYPE_BINARY_FLOAT"):
+            return pa.float64()
+        if name in ("DB_TYPE_VARCHAR", "DB_TYPE_NVARCHAR", "DB_TYPE_CHAR", "DB_TYPE_NCHAR", "DB_TYPE_LONG",
+                    "DB_TYPE_LONG_NVARCHAR", "DB_TYPE_CLOB", "DB_TYPE_NCLOB", "DB_TYPE_ROWID", "DB_TYPE_UROWID"):
+            return pa.string()
+        if name in ("DB_TYPE_DATE", "DB_TYPE_TIMESTAMP", "DB_TYPE_TIMESTAMP_LTZ"):
+            return pa.timestamp("us")
+        if name in ("DB_TYPE_RAW", "DB_TYPE_LONG_RAW", "DB_TYPE_BLOB"):
+            return pa.binary()
+        if name == "DB_TYPE_BOOLEAN":
+            return pa.bool_()
+        return None
+    # pyodbc: type_code is the Python type of the column values
+    if type_code is bool:
+        return pa.bool_()
+    if type_code is int:
+        return pa.int64()
+    if type_code is float:
+        return pa.float64()
+    if type_code is decimal.Decimal:
+        if scale == 0 and precision and precision <= 18:
+            return pa.int64()
+        if precision and 0 < precision <= 38 and scale is not None and scale >= 0:
+            return pa.decimal128(precision, scale)
+        return pa.float64()
+    if type_code is str:
+        return pa.string()
+    if type_code is datetime.datetime:
+        return pa.timestamp("us")
+    if type_code is datetime.date:
+        return pa.date32()
+    if type_code is datetime.time:
+        return pa.time64("us")
+    if type_code in (bytes, bytearray):
+        return pa.binary()
+    return None
+
+def _column_array(values: list, typ) -> "pa.Array":
+    if typ is not None:
+        try:
+            return pa.array(values, type=typ)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+            pass
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+def arrow_table(names: Sequence[str], columns: Sequence[Sequence], description=None) -> "pa.Table":
+    """
+    Table from column value lists; types from description when given.
+    """
+    types = [arrow_type(d) for d in description] if description else [None] * len(names)
+    arrays = [_column_array(list(values), typ) for values, typ in zip(columns, types)]
+    return pa.Table.from_arrays(arrays, names=list(names))
+
+def _write_table(table: "pa.Table", path: str, fmt: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if fmt == "parquet":
+        pq.write_table(table, path, compression=RESULT_PARQUET_COMPRESSION)
+    else:
+        options = pa_ipc.IpcWriteOptions(compression=RESULT_ARROW_COMPRESSION)
+        with pa_ipc.new_file(path, table.schema, options=options) as writer:
+            writer.write_table(table)
+
+def rows_to_records(description, rows: Sequence[Sequence]) -> List[dict]:
+    """
+    Row tuples as dicts, dates / datetimes as ISO strings (the JSON result shape). The converter
+    is compiled once per cursor.description (src.utils.row_converter).
+    """
+    return compile_row_converter(description)(rows)
+
+def save_cursor_rows(rows: Sequence[Sequence], description, base: str, fmt: str = None) -> str:
+    """
+    Save fetched row tuples with their cursor.description. Returns the file name.
+    """
+    fmt = fmt or _format
+    path = result_path(base, fmt)
+    names = [d[0] for d in description] if description else []
+    if fmt == "json":
+        save_json_file(rows_to_records(description, rows), path)
+    else:
+        columns = list(zip(*rows)) if rows else [[] for _ in names]
+        _write_table(arrow_table(names, columns, description), path, fmt)
+    return path
+
+def save_records(records: List[dict], base: str, fmt: str = None) -> str:
+    """
+    Save row dicts (e.g. candidate files); Arrow types are inferred. Returns the file name.
+    """
+    fmt = fmt or _format
+    path = result_path(base, fmt)
+    if fmt == "json":
+        save_json_file(records, path)
+    else:
+        names = list(records[0].keys()) if records else []
+        _write_table(arrow_table(names, [[r.get(n) for r in records] for n in names]), path, fmt)
+    return path
+
+def save_columns(names: Sequence[str], columns: Sequence[Sequence], base: str, fmt: str = None) -> str:
+    """
+    Save already columnar data (Parquet / Arrow only). Returns the file name.
+    """
+    fmt = fmt or _format
+    path = result_path(base, fmt)
+    _write_table(arrow_table(names, [c.tolist() if hasattr(c, "tolist") else c for c in columns]), path, fmt)
+    return path
+
+def load_records(path: str) -> List[dict]:
+    """
+    Read a file written by this module back as row dicts.
+    """
+    if path.endswith(".parquet"):
+        return pq.read_table(path).to_pylist()
+    if path.endswith(".arrow"):
+        with pa.memory_map(path) as source:
+            return pa_ipc.open_file(source).read_all().to_pylist()
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
@@ -0,0 +1,108 @@
+# src/utils/row_converter.py
+"""
+Row tuple -> dict / column conversion, built once per cursor.description.
+"""
+import datetime
+import operator
+from itertools import repeat
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence
+
+ROW_CONVERTER_CACHE_SIZE = 64
+
+_DAY_DB_TYPES = ("DB_TYPE_DATE",)
+_TIMESTAMP_DB_TYPES = ("DB_TYPE_TIMESTAMP", "DB_TYPE_TIMESTAMP_LTZ", "DB_TYPE_TIMESTAMP_TZ")
+_PLAIN_DB_TYPES = ("DB_TYPE_NUMBER", "DB_TYPE_BINARY_INTEGER", "DB_TYPE_BINARY_DOUBLE", "DB_TYPE_BINARY_FLOAT",
+                   "DB_TYPE_VARCHAR", "DB_TYPE_NVARCHAR", "DB_TYPE_CHAR", "DB_TYPE_NCHAR", "DB_TYPE_LONG",
+                   "DB_TYPE_LONG_NVARCHAR", "DB_TYPE_CLOB", "DB_TYPE_NCLOB", "DB_TYPE_RAW", "DB_TYPE_LONG_RAW",
+                   "DB_TYPE_BLOB", "DB_TYPE_ROWID", "DB_TYPE_UROWID", "DB_TYPE_BOOLEAN")
+_PLAIN_PY_TYPES = ("int", "float", "str", "bool", "bytes", "bytearray", "Decimal", "UUID")
+
+RowConverter = Callable[[Sequence[Sequence]], List[dict]]
+
+def column_kind(type_code) -> str:
+    """
+    "day", "timestamp", "plain" or "unknown" for one cursor.description type_code.
+    """
+    name = getattr(type_code, "name", None)
+    if name is not None:
+        # oracledb DbType
+        if name in _DAY_DB_TYPES:
+            return "day"
+        if name in _TIMESTAMP_DB_TYPES:
+            return "timestamp"
+        return "plain" if name in _PLAIN_DB_TYPES else "unknown"
+    # pyodbc: type_code is the Python type of the column values
+    if type_code is datetime.date:
+        return "day"
+    if type_code in (datetime.datetime, datetime.time):
+        return "timestamp"
+    return "plain" if getattr(type_code, "__name__", None) in _PLAIN_PY_TYPES else "unknown"
+
+def _cell_converter(kind: str) -> Callable:
+    if kind == "day":
+        memo = {}
+
+        def day(val):
+            text = memo.get(val)
+            if text is None and val is not None:
+                text = memo[val] = val.isoformat()
+            return text
+        return day
+    if kind == "timestamp":
+        return lambda val: None if val is None else val.isoformat()
+    return lambda val: val.isoformat() if hasattr(val, "isoformat") else val
+
+def _build(names: tuple, kinds: tuple) -> RowConverter:
+    last = {n: i for i, n in enumerate(names)}
+    # only the column that ends up in the dict for a repeated name needs its value converted
+    special = [(i, n, k) for i, (n, k) in enumerate(zip(names, kinds)) if k != "plain" and last[n] == i]
+
+    def convert(rows):
+        out = list(map(dict, map(zip, repeat(names), rows)))
+        for i, n, k in special:
+            # a fresh converter per call, so the day memo lives only as long as one result
+            for d, val in zip(out, map(_cell_converter(k), map(operator.itemgetter(i), rows))):
+                d[n] = val
+        return out
+    return convert
+
+_CONVERTERS: "OrderedDict[tuple, RowConverter]" = OrderedDict()
+_CONVERTERS_LOCK = threading.Lock()
+
+def compile_row_converter(description) -> RowConverter:
+    """
+    Converter for rows fetched with this cursor.description (cached).
+    """
+    names = tuple(str(d[0]) for d in description or [])
+    kinds = tuple(column_kind(d[1]) for d in description or [])
+    key = (names, kinds)
+    with _CONVERTERS_LOCK:
+        fn = _CONVERTERS.get(key)
+        if fn is not None:
+            _CONVERTERS.move_to_end(key)
+            return fn
+    fn = _build(names, kinds)
+    with _CONVERTERS_LOCK:
+        _CONVERTERS[key] = fn
+        if len(_CONVERTERS) > ROW_CONVERTER_CACHE_SIZE:
+            _CONVERTERS.popitem(last=False)
+    return fn
+
+def rows_to_columns(description, rows: Sequence[Sequence]) -> Dict[str, Sequence]:
+    """
+    {column: values} from fetched row tuples and their cursor.description (values untouched).
+    """
+    names = [str(d[0]) for d in description or []]
+    return {n: list(map(operator.itemgetter(i), rows)) for i, n in enumerate(names)}
+
+def columns_from_rows(rows: List[dict]) -> Dict[str, list]:
+    """
+    Pivot row dicts into {column: values}; columns are taken from the first row.
+    """
+    names = list(rows[0].keys()) if rows else []
+    return {n: [r.get(n) for r in rows] for n in names}
+
+def column_length(columns: Dict[str, Sequence]) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
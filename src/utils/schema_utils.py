@@ -0,0 +1,71 @@
+# src/utils/schema_utils.py
+"""
+Precomputed O(1) lookups over a schema snapshot.
+"""
+import os
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+from src.utils.io_utils import load_json_file
+
+class SchemaIndex:
+    def __init__(self, schema: dict):
+        self.schema = schema or {}
+        self.qualified: Dict[str, str] = {}   # upper-cased full key -> original key
+        self.by_last: Dict[str, str] = {}     # upper-cased last segment -> first matching key
+        self.columns: Dict[str, FrozenSet[str]] = {}
+        self.types: Dict[str, Dict[str, str]] = {}
+        for key, info in self.schema.items():
+            norm = key.upper()
+            self.qualified[norm] = key
+            self.by_last.setdefault(norm.split(".")[-1], key)
+            cols = (info or {}).get("columns", {}) or {}
+            self.columns[key] = frozenset(c.upper() for c in cols)
+            self.types[key] = {c.upper(): t for c, t in cols.items()}
+
+    def __len__(self):
+        return len(self.schema)
+
+    def resolve(self, table_name: str) -> Optional[str]:
+        """
+        Return the schema key for a (possibly schema-qualified) table name, or None.
+        Exact qualified match wins; otherwise the last name segment is matched.
+        """
+        name = table_name.strip('"').upper()
+        key = self.qualified.get(name)
+        if key is not None:
+            return key
+        return self.by_last.get(name.split(".")[-1])
+
+    def has_table(self, table_name: str) -> bool:
+        return self.resolve(table_name) is not None
+
+    def has_column(self, key: str, column: str) -> bool:
+        return column.upper() in self.columns.get(key, ())
+
+    def column_type(self, key: str, column: str) -> Optional[str]:
+        return self.types.get(key, {}).get(column.upper())
+
+def as_schema_index(schema) -> SchemaIndex:
+    """
+    Accept either a SchemaIndex or a raw schema dict (indexed on the fly).
+    """
+    return schema if isinstance(schema, SchemaIndex) else SchemaIndex(schema)
+
+_INDEX_CACHE: Dict[str, Tuple[Tuple[int, int], SchemaIndex]] = {}
+_INDEX_LOCK = threading.Lock()
+
+def load_schema_index(path: str) -> SchemaIndex:
+    """
+    Load a schema snapshot and return its SchemaIndex, cached per file mtime/size.
+    """
+    full = os.path.abspath(path)
+    st = os.stat(full)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(full)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    index = SchemaIndex(load_json_file(full))
+    with _INDEX_LOCK:
+        _INDEX_CACHE[full] = (stamp, index)
+    return index
@@ -0,0 +1,181 @@
+# src/utils/sql_analyzer.py
+"""
+Single-pass, memoized SQL analysis shared by the Oracle and DWH validators.
+"""
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+FORBIDDEN_KEYWORDS = ["DELETE", "DROP", "UPDATE", "INSERT", "ALTER", "TRUNCATE", "MERGE", "GRANT", "REVOKE"]
+
+SQL_ANALYSIS_CACHE_SIZE = int(os.getenv("SQL_ANALYSIS_CACHE_SIZE", "1024"))
+
+_TOKEN_RE = re.compile(r"""
+     (?P<ws>\s+)
+    |(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>[Nn]?'[^']*(?:''[^']*)*'?)
+    |(?P<qident>"[^"]*"?|\[[^\]]*\]?)
+    |(?P<bind>:[A-Za-z_]\w*|\?)
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    |(?P<word>[A-Za-z_][\w$#]*)
+    |(?P<op>.)
+""", re.VERBOSE | re.DOTALL)
+
+_TABLE_KEYWORDS = {"FROM", "JOIN", "INTO"}
+
+# FROM inside these calls is not a table clause, e.g. EXTRACT(YEAR FROM col), TRIM(' ' FROM col)
+_FROM_FUNCTIONS = {"EXTRACT", "TRIM", "SUBSTRING", "OVERLAY", "POSITION"}
+
+_NOT_ALIAS = {
+    "WHERE", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER", "NATURAL", "APPLY",
+    "GROUP", "ORDER", "HAVING", "FETCH", "LIMIT", "OFFSET", "UNION", "INTERSECT", "MINUS", "EXCEPT",
+    "CONNECT", "START", "PIVOT", "UNPIVOT", "WITH", "SELECT", "SET", "VALUES", "FOR", "WINDOW",
+    "PARTITION", "SAMPLE", "RETURNING",
+}
+
+class SqlAnalysis:
+    """
+    Result of analyze_sql(); treat as read-only, instances are shared through the cache.
+    """
+    def __init__(self, sql_hash: str, kind: Optional[str], first_token: Optional[str], statement_count: int,
+                 tables: FrozenSet[str], aliases: Dict[str, str], qualified_columns: FrozenSet[Tuple[str, str]],
+                 forbidden: Tuple[str, ...]):
+        self.sql_hash = sql_hash
+        self.kind = kind
+        self.first_token = first_token
+        self.statement_count = statement_count
+        self.tables = tables
+        self.aliases = aliases
+        self.qualified_columns = qualified_columns
+        self.forbidden = forbidden
+
+    @property
+    def is_select(self) -> bool:
+        return self.kind in ("SELECT", "WITH")
+
+def tokenize_sql(sql: str) -> List[Tuple[str, str]]:
+    """
+    Return significant (kind, text) tokens; whitespace and comments are dropped.
+    """
+    return [(m.lastgroup, m.group()) for m in _TOKEN_RE.finditer(sql) if m.lastgroup not in ("ws", "comment")]
+
+def _ident(text: str) -> str:
+    if text[:1] in ('"', "["):
+        text = text[1:-1] if len(text) > 1 else ""
+    return text.upper()
+
+def _group_names(tokens: List[Tuple[str, str]]) -> List[Tuple[str, object]]:
+    """
+    Fold dotted identifiers (a.b.c) into ("name", [parts]) items.
+    """
+    out = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        kind, text = tokens[i]
+        if kind in ("word", "qident"):
+            parts = [_ident(text)]
+            i += 1
+            while i + 1 < n and tokens[i] == ("op", ".") and tokens[i + 1][0] in ("word", "qident"):
+                parts.append(_ident(tokens[i + 1][1]))
+                i += 2
+            out.append(("name", parts))
+        else:
+            out.append((kind, text))
+            i += 1
+    return out
+
+def _analyze(sql: str, sql_hash: str) -> SqlAnalysis:
+    items = _group_names(tokenize_sql(sql))
+    n = len(items)
+
+    kind = None
+    first_token = None
+    statement_count = 0
+    in_statement = False
+    tables = set()
+    aliases = {}
+    qualified = set()
+    forbidden_found = set()
+    table_positions = set()
+    call_stack = []
+
+    for i, (k, val) in enumerate(items):
+        if k == "op":
+            if val == ";":
+                in_statement = False
+                continue
+            if val == "(":
+                prev = items[i - 1] if i else None
+                call_stack.append(bool(prev and prev[0] == "name" and len(prev[1]) == 1 and prev[1][0] in _FROM_FUNCTIONS))
+            elif val == ")" and call_stack:
+                call_stack.pop()
+        if not in_statement:
+            in_statement = True
+            statement_count += 1
+            if first_token is None:
+                first_token = val[0] if k == "name" else val
+                kind = first_token.upper() if k == "name" else None
+        if k != "name":
+            continue
+
+        if len(val) == 1 and val[0] in FORBIDDEN_KEYWORDS:
+            forbidden_found.add(val[0])
+
+        if i in table_positions:
+            continue
+        if len(val) >= 2:
+            qualified.add((val[-2], val[-1]))
+            continue
+
+        word = val[0]
+        if word not in _TABLE_KEYWORDS or (word == "FROM" and call_stack and call_stack[-1]):
+            continue
+        # table list: name [AS] [alias] {, name [AS] [alias]}  (only FROM takes a comma list)
+        j = i + 1
+        while j < n and items[j][0] == "name":
+            table_positions.add(j)
+            tables.add(items[j][1][-1])
+            table = items[j][1][-1]
+            j += 1
+            if j < n and items[j][0] == "name" and items[j][1] == ["AS"]:
+                table_positions.add(j)
+                j += 1
+            if j < n and items[j][0] == "name" and len(items[j][1]) == 1 and items[j][1][0] not in _NOT_ALIAS:
+                table_positions.add(j)
+                aliases[items[j][1][0]] = table
+                j += 1
+            if word == "FROM" and j < n and items[j] == ("op", ","):
+                j += 1
+                continue
+            break
+
+    forbidden = tuple(kw for kw in FORBIDDEN_KEYWORDS if kw in forbidden_found)
+    return SqlAnalysis(sql_hash, kind, first_token, statement_count, frozenset(tables), aliases,
+                       frozenset(qualified), forbidden)
+
+_ANALYSES: "OrderedDict[str, SqlAnalysis]" = OrderedDict()
+_ANALYSES_LOCK = threading.Lock()
+
+def analyze_sql(sql: str, use_cache: bool = True) -> SqlAnalysis:
+    sql_hash = hashlib.sha1(sql.encode("utf-8")).hexdigest()
+    if use_cache:
+        with _ANALYSES_LOCK:
+            cached = _ANALYSES.get(sql_hash)
+            if cached is not None:
+                _ANALYSES.move_to_end(sql_hash)
+                return cached
+    analysis = _analyze(sql, sql_hash)
+    if use_cache and SQL_ANALYSIS_CACHE_SIZE > 0:
+        with _ANALYSES_LOCK:
+            _ANALYSES[sql_hash] = analysis
+            while len(_ANALYSES) > SQL_ANALYSIS_CACHE_SIZE:
+                _ANALYSES.popitem(last=False)
+    return analysis
+
+def clear_sql_analysis_cache():
+    with _ANALYSES_LOCK:
+        _ANALYSES.clear()
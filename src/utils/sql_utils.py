@@ -81,3 +81,112 @@ def extract_qualified_columns(sql: str) -> Set[Tuple[str, str]]:
             t = t.split('.')[-1].upper()
         pairs.add((t, c))
     return pairs
+
+def strip_sql_comments(sql: str) -> str:
+    """
+    Remove -- line comments and /* */ block comments that are outside string literals.
+    """
+    out = []
+    i = 0
+    L = len(sql)
+    in_quote = False
+    while i < L:
+        ch = sql[i]
+        if in_quote:
+            out.append(ch)
+            if ch == "'":
+                if i + 1 < L and sql[i + 1] == "'":
+                    out.append("'")
+                    i += 2
+                    continue
+                in_quote = False
+            i += 1
+        elif ch == "'":
+            in_quote = True
+            out.append(ch)
+            i += 1
+        elif sql.startswith("--", i):
+            nl = sql.find("\n", i)
+            i = L if nl == -1 else nl
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = L if end == -1 else end + 2
+        else:
+            out.append(ch)
+            i += 1
+    lines = [l.rstrip() for l in "".join(out).splitlines()]
+    return "\n".join(l for l in lines if l.strip())
+
+def extract_bind_names(sql: str) -> Set[str]:
+    """
+    Return the set of named bind variables (:name) used outside string literals.
+    """
+    stripped = _strip_string_literals(sql)
+    return {m.group(1).lower() for m in re.finditer(r'(?<![:\w]):([A-Za-z_]\w*)', stripped)}
+
+def render_bind_template(sql_template: str, subs: dict, bind_names) -> str:
+    """
+    Replace ${VAR} tokens from subs and turn {placeholder} / '{placeholder}' for each
+    name in bind_names into an Oracle-style :placeholder bind variable.
+    """
+    out = sql_template
+    for k, v in subs.items():
+        out = out.replace("${" + k + "}", str(v))
+    for name in bind_names:
+        out = re.sub(r"'?\{" + re.escape(name) + r"\}'?", ":" + name, out)
+    return out
+
+def top_level_mask(sql: str) -> str:
+    """
+    Return a copy of sql of the same length where string literals, quoted identifiers and
+    anything nested inside parentheses are blanked out, so clause keywords can be located
+    with plain regex searches on the result.
+    """
+    out = []
+    depth = 0
+    quote = None
+    i = 0
+    L = len(sql)
+    while i < L:
+        ch = sql[i]
+        if quote:
+            if ch == quote:
+                if i + 1 < L and sql[i + 1] == quote:
+                    out.append("  ")
+                    i += 2
+                    continue
+                quote = None
+            out.append(" ")
+        elif ch in ("'", '"'):
+            quote = ch
+            out.append(" ")
+        elif ch == "(":
+            depth += 1
+            out.append(" ")
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+            out.append(" ")
+        else:
+            out.append(ch if depth == 0 else " ")
+        i += 1
+    return "".join(out)
+
+def find_top_level_keyword(sql: str, keyword_regex: str, start: int = 0, mask: str = None) -> int:
+    """
+    Position of the first top-level occurrence of keyword_regex (e.g. r'ORDER\\s+BY') at or
+    after start, or -1 when absent.
+    """
+    mask = mask if mask is not None else top_level_mask(sql)
+    m = re.compile(r'\b' + keyword_regex + r'\b', re.IGNORECASE).search(mask, start)
+    return m.start() if m else -1
+
+def split_top_level_commas(text: str):
+    mask = top_level_mask(text)
+    parts = []
+    last = 0
+    for i, ch in enumerate(mask):
+        if ch == ",":
+            parts.append(text[last:i].strip())
+            last = i + 1
+    parts.append(text[last:].strip())
+    return [p for p in parts if p]
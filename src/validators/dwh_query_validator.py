@@ -1,79 +1,52 @@
 # src/validators/dwh_query_validator.py
-import re
-import sqlparse
-from src.utils.sql_utils import extract_table_names, extract_qualified_columns, extract_alias_mapping
-
-FORBIDDEN_KEYWORDS = ["DELETE", "DROP", "UPDATE", "INSERT", "ALTER", "TRUNCATE", "MERGE", "GRANT", "REVOKE"]
+from src.utils.sql_analyzer import FORBIDDEN_KEYWORDS, analyze_sql
+from src.utils.schema_utils import as_schema_index
 
 def contains_forbidden(sql: str):
-    s = sql.upper()
-    for kw in FORBIDDEN_KEYWORDS:
-        if re.search(r'\b' + re.escape(kw) + r'\b', s):
-            return True, kw
+    found = analyze_sql(sql).forbidden
+    if found:
+        return True, found[0]
     return False, None
 
 def is_select_query(sql: str):
-    parsed = sqlparse.parse(sql)
-    if not parsed:
-        return False, "Could not parse SQL"
-    stmt = parsed[0]
-    for tok in stmt.tokens:
-        if not tok.is_whitespace:
-            first = tok
-            break
-    else:
+    analysis = analyze_sql(sql)
+    if analysis.first_token is None:
         return False, "No tokens found"
-    if getattr(first, "normalized", "").upper() in ("SELECT", "WITH"):
+    if analysis.is_select:
         return True, "SELECT/WITH"
-    return False, f"Query must be SELECT or WITH; found: {first.value}"
+    return False, f"Query must be SELECT or WITH; found: {analysis.first_token}"
 
-def _schema_has_table(schema: dict, table_name: str):
-    t = table_name.upper().split(".")[-1]
-    for k in schema.keys():
-        if k.upper().split(".")[-1] == t:
-            return True
-    return False
+def _schema_has_table(schema, table_name: str):
+    return as_schema_index(schema).has_table(table_name)
 
-def validate_dwh_sql(sql: str, schema: dict):
+def validate_dwh_sql(sql: str, schema):
+    """
+    Validate sql against a schema dict or a prebuilt SchemaIndex (preferred; see load_schema_index).
+    """
     sql = sql.strip()
-    if ";" in sql.rstrip().rstrip(";"):
+    analysis = analyze_sql(sql)
+    if analysis.statement_count > 1:
         return False, "Multiple statements detected; only a single SELECT is allowed."
-    forb, kw = contains_forbidden(sql)
-    if forb:
-        return False, f"Forbidden keyword found: {kw}"
+    if analysis.forbidden:
+        return False, f"Forbidden keyword found: {analysis.forbidden[0]}"
     sel_ok, sel_msg = is_select_query(sql)
     if not sel_ok:
         return False, sel_msg
+    index = as_schema_index(schema)
     issues = []
-    tables = extract_table_names(sql)
-    for t in tables:
-        if not _schema_has_table(schema, t):
+    for t in analysis.tables:
+        if not index.has_table(t):
             issues.append(f"Unknown table referenced: {t}")
-    alias_map = extract_alias_mapping(sql)
-    qcols = extract_qualified_columns(sql)
-    for qual, col in qcols:
-        qual_last = qual.upper().split(".")[-1]
-        matched_table_key = None
-        for k in schema.keys():
-            if k.upper().split(".")[-1] == qual_last:
-                matched_table_key = k
-                break
+    alias_map = analysis.aliases
+    for qual, col in analysis.qualified_columns:
+        matched_table_key = index.resolve(qual)
         if matched_table_key:
-            if col not in schema[matched_table_key].get("columns", {}):
+            if not index.has_column(matched_table_key, col):
                 issues.append(f"Unknown column {col} in table {matched_table_key}")
         elif qual in alias_map:
-            real = alias_map[qual]
-            found = False
-            for k in schema.keys():
-                if k.upper().split(".")[-1] == real:
-                    if col not in schema[k].get("columns", {}):
-                        issues.append(f"Unknown column {col} in table {k}")
-                    found = True
-                    break
-            if not found:
-                pass
-        else:
-            pass
+            real_key = index.resolve(alias_map[qual])
+            if real_key and not index.has_column(real_key, col):
+                issues.append(f"Unknown column {col} in table {real_key}")
     if issues:
         return False, "; ".join(issues)
     return True, "Validation passed"
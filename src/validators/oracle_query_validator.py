@@ -1,56 +1,49 @@
 # src/validators/oracle_query_validator.py
-import re
-import sqlparse
-from src.utils.sql_utils import extract_table_names, extract_qualified_columns, extract_alias_mapping
-
-FORBIDDEN_KEYWORDS = ["DELETE", "DROP", "UPDATE", "INSERT", "ALTER", "TRUNCATE", "MERGE", "GRANT", "REVOKE"]
+from src.utils.sql_analyzer import FORBIDDEN_KEYWORDS, analyze_sql
+from src.utils.schema_utils import as_schema_index
 
 def contains_forbidden(sql: str):
-    s = sql.upper()
-    for kw in FORBIDDEN_KEYWORDS:
-        if re.search(r'\b' + re.escape(kw) + r'\b', s):
-            return True, kw
+    found = analyze_sql(sql).forbidden
+    if found:
+        return True, found[0]
     return False, None
 
 def is_select_query(sql: str):
-    parsed = sqlparse.parse(sql)
-    if not parsed:
-        return False, "Could not parse SQL"
-    stmt = parsed[0]
-    for tok in stmt.tokens:
-        if not tok.is_whitespace:
-            first = tok
-            break
-    else:
+    analysis = analyze_sql(sql)
+    if analysis.first_token is None:
         return False, "No tokens found"
-    if getattr(first, "normalized", "").upper() in ("SELECT", "WITH"):
+    if analysis.is_select:
         return True, "SELECT/WITH"
-    return False, f"Query must be SELECT or WITH; found: {first.value}"
+    return False, f"Query must be SELECT or WITH; found: {analysis.first_token}"
 
-def validate_oracle_sql(sql: str, schema: dict):
+def validate_oracle_sql(sql: str, schema):
+    """
+    Validate sql against a schema dict or a prebuilt SchemaIndex (preferred; see load_schema_index).
+    """
     sql = sql.strip()
-    if ";" in sql.rstrip().rstrip(";"):
+    analysis = analyze_sql(sql)
+    if analysis.statement_count > 1:
         return False, "Multiple statements detected; only a single SELECT is allowed."
-    forb, kw = contains_forbidden(sql)
-    if forb:
-        return False, f"Forbidden keyword found: {kw}"
+    if analysis.forbidden:
+        return False, f"Forbidden keyword found: {analysis.forbidden[0]}"
     sel_ok, sel_msg = is_select_query(sql)
     if not sel_ok:
         return False, sel_msg
+    index = as_schema_index(schema)
     issues = []
-    tables = extract_table_names(sql)
-    for t in tables:
-        if t not in schema:
+    for t in analysis.tables:
+        if not index.has_table(t):
             issues.append(f"Unknown table referenced: {t}")
-    alias_map = extract_alias_mapping(sql)
-    qcols = extract_qualified_columns(sql)
-    for qual, col in qcols:
-        if qual in schema:
-            if col not in schema[qual].get("columns", {}):
+    alias_map = analysis.aliases
+    for qual, col in analysis.qualified_columns:
+        key = index.resolve(qual)
+        if key:
+            if not index.has_column(key, col):
                 issues.append(f"Unknown column {col} in table {qual}")
         elif qual in alias_map:
             real = alias_map[qual]
-            if real not in schema or col not in schema[real].get("columns", {}):
+            real_key = index.resolve(real)
+            if real_key is None or not index.has_column(real_key, col):
                 issues.append(f"Unknown column {col} in table {real} (alias {qual})")
     if issues:
         return False, "; ".join(issues)
@@ -0,0 +1,31 @@
+# tests/test_rule_engine.py
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.services.rule_engine import member_keys, select_members
+
+RULES = {
+    "accum": {
+        "db_fund_pairs": [{"db_code": "ST000", "fund_codes": ["ST100"]}],
+        "criteria": {"basic_insurance": {"required_covers": ["death"], "coverage_type": "Basic"}},
+    }
+}
+
+def _dwh(ids):
+    return {
+        "MEMBER_ID": ids,
+        "DEATH_COVER": [150000.0, 0, 250000.0],
+        "COVERAGE_TYPE": ["Basic", "Basic", "Basic"],
+        "DB_CODE": ["ST000"] * 3,
+        "FUND_CODE": ["ST100"] * 3,
+    }
+
+@pytest.mark.parametrize("pool_ids, dwh_ids", [
+    (["000123", "000124", "000125"], [123, 124, 125]),
+    ([123.0, 124.0, 125.0], ["123", "124", "125"]),
+])
+def test_pool_keys_match_selected_keys(pool_ids, dwh_ids):
+    selected = select_members(_dwh(dwh_ids), RULES, "accum", "basic_insurance", 10, candidate_ids=pool_ids)
+    assert selected == ["123", "125"]
+    assert [k for k in member_keys(pool_ids) if k in selected] == ["123", "125"]